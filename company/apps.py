@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CompanyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'company'
+
+    def ready(self):
+        from mysite.metrics.registry import registry
+        from . import signals  # noqa: F401
+        from .cache import collect_metrics
+
+        registry.register_collector(collect_metrics)
@@ -0,0 +1,162 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.urls import URLPattern
+from django.views import View
+from rest_framework.response import Response
+
+ASYNC_ACTIONS = ("list", "retrieve")
+
+
+class AsyncReadMixin:
+    """
+    Async `list` and `retrieve` for viewsets served through `AsyncReadView`.
+
+    Rows are loaded with the async ORM; serializers then run on the loaded
+    instances, so querysets must select everything the serializer renders.
+    Viewsets also need `SerializerTimingMixin` for `serialize()`.
+    """
+
+    # Query parameters whose validation may query the database.
+    db_filter_params = []
+
+    async def afilter_queryset(self, queryset):
+        params = self.request.query_params
+        if any(param in params for param in self.db_filter_params):
+            return await sync_to_async(self.filter_queryset)(queryset)
+        return self.filter_queryset(queryset)
+
+    async def aget_object(self):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**lookup)
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        self._conditional_object = obj
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(queryset, request, self)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(self.serialize(serializer))
+        rows = [row async for row in queryset]
+        return Response(self.serialize(self.get_serializer(rows, many=True)))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(self.serialize(self.get_serializer(instance)))
+
+
+class AsyncReadView(View):
+    """
+    Serves the JSON `list` and `retrieve` GETs of an `AsyncReadMixin` viewset
+    without leaving the event loop, and hands every other request to the
+    viewset's regular sync view.
+
+    DRF views are sync only, so this view runs the viewset's request handling
+    itself: negotiation, permissions, the conditional and cache wrappers and
+    exception handling behave as in `APIView.dispatch`.
+    """
+
+    fallback = None
+
+    @classmethod
+    def wrap(cls, fallback):
+        view = cls.as_view(fallback=fallback)
+        # csrf_exempt() would wrap the view in a sync function.
+        view.csrf_exempt = True
+        # Schema generation and other introspection look for the viewset here.
+        view.cls, view.initkwargs = fallback.cls, fallback.initkwargs
+        view.actions = fallback.actions
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method == "GET":
+            return await self.get(request, *args, **kwargs)
+        return await self.sync_fallback(request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        response = None
+        if (
+            self.fallback.actions.get("get") in ASYNC_ACTIONS
+            and "format" not in kwargs
+            and "format" not in request.GET
+        ):
+            response = await self.serve(request, *args, **kwargs)
+        if response is None:
+            response = await self.sync_fallback(request, *args, **kwargs)
+        return response
+
+    async def sync_fallback(self, request, *args, **kwargs):
+        return await sync_to_async(self.fallback)(request, *args, **kwargs)
+
+    async def serve(self, request, *args, **kwargs):
+        viewset = self.fallback.cls(**self.fallback.initkwargs)
+        viewset.action_map = self.fallback.actions
+        viewset.args, viewset.kwargs = args, kwargs
+        viewset.request = request = viewset.initialize_request(request, *args, **kwargs)
+        viewset.headers = viewset.default_response_headers
+        viewset.format_kwarg = None
+
+        request.accepted_renderer, request.accepted_media_type = (
+            viewset.perform_content_negotiation(request)
+        )
+        if request.accepted_renderer.format != "json":
+            # Leave the browsable API and other renderers to the sync view.
+            return None
+
+        handler = getattr(viewset, f"a{viewset.action}")
+        try:
+            request.version, request.versioning_scheme = viewset.determine_version(
+                request, *args, **kwargs
+            )
+            if viewset.authentication_classes:
+                await sync_to_async(viewset.perform_authentication)(request)
+            viewset.check_permissions(request)
+            viewset.check_throttles(request)
+            response = await viewset.aconditional_response(
+                request,
+                lambda: viewset.acached_response(
+                    request, lambda: handler(request, *args, **kwargs)
+                ),
+                **kwargs,
+            )
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+
+        response = viewset.finalize_response(request, response, *args, **kwargs)
+        if not isinstance(response, Response):
+            return response
+        # Django renders template responses in a worker thread; hand it a
+        # rendered plain response instead.
+        response.render()
+        return HttpResponse(
+            response.content, status=response.status_code, headers=response.headers
+        )
+
+
+def async_read_patterns(patterns):
+    """Route the `list` and `retrieve` patterns of async-capable viewsets."""
+    routed = []
+    for pattern in patterns:
+        callback = pattern.callback
+        actions = getattr(callback, "actions", None) or {}
+        if (
+            issubclass(getattr(callback, "cls", object), AsyncReadMixin)
+            and actions.get("get") in ASYNC_ACTIONS
+            and getattr(callback, "view_class", None) is not AsyncReadView
+        ):
+            pattern = URLPattern(
+                pattern.pattern,
+                AsyncReadView.wrap(callback),
+                pattern.default_args,
+                pattern.name,
+            )
+        routed.append(pattern)
+    return routed
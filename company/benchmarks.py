@@ -0,0 +1,848 @@
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from threading import Thread
+from urllib.request import urlopen
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from mysite.db.pool import close_pools, pool_stats
+from mysite.metrics.registry import registry as metrics_registry
+from rest_framework.filters import SearchFilter
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from .export import RENDERERS
+from .filters import EmployeeSearchFilter
+from .models import Department, Employee
+from .parsers import FastJSONParser
+from .querylog import log_queries
+from .renderers import FastJSONRenderer, orjson
+from .serializers import (
+    DepartmentRetrieveSerializer,
+    EmployeeRetrieveSerializer,
+    EmployeeSerializer,
+)
+from .summary import batched_summaries
+from .synthetic import generate_company
+from .urls import router_urls
+from .values import compile_serializer
+from .views import EmployeeViewSet
+
+SUITES = {}
+
+
+def suite(name):
+    def register(func):
+        SUITES[name] = func
+        return func
+
+    return register
+
+
+def timed(func, repeat):
+    """Return the mean and best wall time of `func` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"mean_ms": sum(samples) / len(samples), "best_ms": min(samples)}
+
+
+def percentile(samples, share):
+    """The `share` percentile of sorted `samples`."""
+    return samples[min(len(samples) - 1, int(len(samples) * share))]
+
+
+def seed_employees(total, batch_size=10000, seed=0):
+    """Generate synthetic employees until there are at least `total`."""
+    existing = Employee.objects.count()
+    if existing >= total:
+        return 0
+    generate_company(
+        total - existing,
+        departments=1,
+        max_dependents=0,
+        prefix="Benchmark",
+        batch_size=batch_size,
+        seed=seed,
+    )
+    return total - existing
+
+
+@suite("search")
+def search_benchmark(options):
+    seed_employees(options["employees"])
+    view = type("View", (), {"search_fields": ["first_name", "last_name"]})()
+    factory = APIRequestFactory()
+    results = {}
+    for query in ["john", "john smi", "mar", "youssuf shakweh", "zzz"]:
+        request = Request(factory.get("/", {"search": query}))
+        for name, backend in [
+            ("icontains", SearchFilter()),
+            ("indexed", EmployeeSearchFilter()),
+        ]:
+
+            def run():
+                queryset = backend.filter_queryset(
+                    request, Employee.objects.all(), view
+                )
+                queryset.count()
+                list(queryset[:10])
+
+            results[f"{name}:{query}"] = timed(run, options["repeat"])
+    return results
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@suite("export")
+def export_benchmark(options):
+    seed_employees(options["employees"])
+    view = EmployeeViewSet.as_view({"get": "export"})
+    factory = APIRequestFactory()
+
+    def stream(output):
+        request = factory.get("/", {"output": output}, HTTP_HOST="localhost")
+        return sum(len(chunk) for chunk in view(request).streaming_content)
+
+    results = {}
+    for output in RENDERERS:
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        size = stream(output)
+        elapsed = time.perf_counter() - start
+
+        # A second, traced pass measures Python allocations without
+        # tracemalloc's overhead skewing the throughput figures above.
+        tracemalloc.start()
+        stream(output)
+        _, python_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rows = Employee.objects.count()
+        results[output] = {
+            "rows": rows,
+            "bytes": size,
+            "seconds": elapsed,
+            "rows_per_sec": rows / elapsed,
+            "python_peak_mb": python_peak / 1024 / 1024,
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_growth_mb": peak_rss_mb() - rss_before,
+        }
+    return results
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WorkerPoolWSGIServer(WSGIServer):
+    """
+    Serves requests on a fixed set of worker threads, like gunicorn's gthread
+    workers, so persistent connections actually outlive a request.
+    """
+
+    def __init__(self, workers):
+        super().__init__(("127.0.0.1", 0), QuietRequestHandler)
+        self.set_app(get_wsgi_application())
+        self.executor = ThreadPoolExecutor(workers)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_worker, request, client_address)
+
+    def process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown()
+
+
+POOLED_ENGINES = {
+    "django.db.backends.mysql": "mysite.db.mysql",
+    "mysite.db.mysql": "mysite.db.mysql",
+}
+
+
+def serve_requests(path, total, concurrency):
+    """Return the requests per second of `total` GETs of `path`."""
+    server = WorkerPoolWSGIServer(workers=concurrency)
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}{path}"
+
+    def get(_):
+        with urlopen(url) as response:
+            response.read()
+
+    try:
+        with ThreadPoolExecutor(concurrency) as clients:
+            start = time.perf_counter()
+            list(clients.map(get, range(total)))
+            elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+    return total / elapsed
+
+
+@suite("connections")
+def connections_benchmark(options):
+    """
+    Requests/sec of an employee retrieve when every request reconnects,
+    with persistent connections, and with the connection pool.
+    """
+    seed_employees(options["employees"])
+    employee = Employee.objects.order_by("pk").first()
+    path = reverse("employees-detail", args=[employee.pk])
+    db = connections.settings["default"]
+    original = dict(db)
+    concurrency = options["concurrency"]
+    modes = {
+        "reconnect": {"CONN_MAX_AGE": 0},
+        "persistent": {"CONN_MAX_AGE": 60},
+    }
+    if db["ENGINE"] in POOLED_ENGINES:
+        modes["pooled"] = {
+            "ENGINE": POOLED_ENGINES[db["ENGINE"]],
+            "CONN_MAX_AGE": 0,
+            "POOL": {**db.get("POOL", {}), "MAX_SIZE": concurrency},
+        }
+
+    results = {}
+    # Measure connection handling, not the response cache.
+    with override_settings(COMPANY_RESPONSE_CACHE={"ENABLED": False}):
+        for mode, overrides in modes.items():
+            connections.close_all()
+            close_pools()
+            db.update(original, **overrides)
+            try:
+                rps = serve_requests(path, options["requests"], concurrency)
+                results[mode] = {"requests_per_sec": rps, "pool": pool_stats()}
+            finally:
+                close_pools()
+                db.clear()
+                db.update(original)
+    if "pooled" not in modes:
+        results["pooled"] = {"skipped": f"no pooled backend for {db['ENGINE']}"}
+    return results
+
+
+SETTINGS_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.test import Client
+setup = time.perf_counter() - start
+path, total = sys.argv[1], int(sys.argv[2])
+client = Client()
+start = time.perf_counter()
+client.get(path)
+first = time.perf_counter() - start
+start = time.perf_counter()
+for _ in range(total):
+    client.get(path)
+per_request = (time.perf_counter() - start) / total
+print(json.dumps({
+    "setup_ms": setup * 1000,
+    "first_request_ms": first * 1000,
+    "per_request_ms": per_request * 1000,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+@suite("settings")
+def settings_benchmark(options):
+    """
+    Startup time, per-request overhead and memory of the dev and prod
+    settings, each measured in fresh processes.
+    """
+    seed_employees(options["employees"])
+    path = reverse("employees-list")
+    results = {}
+    for environment in ["dev", "prod"]:
+        env = {
+            **os.environ,
+            "DJANGO_ENV": environment,
+            "DJANGO_ALLOWED_HOSTS": "testserver",
+        }
+        env.setdefault("DJANGO_SECRET_KEY", "benchmark-only")
+        samples = []
+        for _ in range(options["repeat"]):
+            output = subprocess.run(
+                [sys.executable, "-c", SETTINGS_PROBE, path, str(options["requests"])],
+                env=env,
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+            samples.append(json.loads(output))
+        results[environment] = {
+            key: sum(sample[key] for sample in samples) / len(samples)
+            for key in samples[0]
+        }
+    return results
+
+
+@suite("metrics")
+def metrics_benchmark(options):
+    """
+    Per-request time of an employee page without the metrics middleware and
+    with it at several sample rates.
+    """
+    seed_employees(options["employees"])
+    path = reverse("employees-list")
+    middleware = "mysite.metrics.middleware.RequestMetricsMiddleware"
+    without = [entry for entry in settings.MIDDLEWARE if entry != middleware]
+    modes = {"off": {"MIDDLEWARE": without}}
+    for rate in [0, 0.1, 1]:
+        modes[f"sample_rate={rate}"] = {"REQUEST_METRICS": {"SAMPLE_RATE": rate}}
+
+    results = {}
+    for mode, overrides in modes.items():
+        with override_settings(
+            COMPANY_RESPONSE_CACHE={"ENABLED": False},
+            ALLOWED_HOSTS=["testserver"],
+            **overrides,
+        ):
+            client = Client()
+            client.get(path)
+
+            def run():
+                for _ in range(options["requests"]):
+                    client.get(path)
+
+            timing = timed(run, options["repeat"])
+            results[mode] = {
+                key: value / options["requests"] for key, value in timing.items()
+            }
+    metrics_registry.clear()
+    return results
+
+
+@suite("json")
+def json_benchmark(options):
+    """
+    Time to render and parse a page of 10,000 employee retrieves with DRF's
+    stdlib JSON classes and with the orjson-backed ones.
+    """
+    if orjson is None:
+        return {"skipped": "orjson is not installed"}
+    seed_employees(10000)
+    employees = Employee.objects.select_related("department").order_by("pk")[:10000]
+    data = EmployeeRetrieveSerializer(employees, many=True).data
+    content = JSONRenderer().render(data)
+
+    results = {"bytes": len(content)}
+    for name, renderer, parser in [
+        ("stdlib", JSONRenderer(), JSONParser()),
+        ("orjson", FastJSONRenderer(), FastJSONParser()),
+    ]:
+        results[name] = {
+            "render": timed(lambda: renderer.render(data), options["repeat"]),
+            "parse": timed(lambda: parser.parse(BytesIO(content)), options["repeat"]),
+            "identical": renderer.render(data) == content,
+        }
+    for step in ["render", "parse"]:
+        results[f"{step}_speedup"] = (
+            results["stdlib"][step]["mean_ms"] / results["orjson"][step]["mean_ms"]
+        )
+    return results
+
+
+@suite("serializers")
+def serializers_benchmark(options):
+    """
+    Per-row cost of rendering 10,000 employees, and their departments with
+    managers, with the model serializers and with their `values_list()`
+    compilations; `serialize` leaves the query out, `total` includes it.
+    """
+    seed_employees(10000)
+    employees = Employee.objects.order_by("pk")[:10000]
+    departments = Department.objects.order_by("pk")
+    results = {}
+    for name, serializer_class, queryset, related in [
+        ("employees_list", EmployeeSerializer, employees, ["department"]),
+        ("employees_retrieve", EmployeeRetrieveSerializer, employees, ["department"]),
+        (
+            "departments_retrieve",
+            DepartmentRetrieveSerializer,
+            departments,
+            ["manager"],
+        ),
+    ]:
+        compiled = compile_serializer(serializer_class())
+        instances = list(queryset.select_related(*related))
+        rows = list(queryset.values_list(*compiled.lookups))
+
+        def model_total():
+            return serializer_class(queryset.select_related(*related), many=True).data
+
+        def values_total():
+            return [
+                compiled.to_representation(row)
+                for row in queryset.values_list(*compiled.lookups)
+            ]
+
+        timings = {
+            "model": {
+                "serialize": timed(
+                    lambda: serializer_class(instances, many=True).data,
+                    options["repeat"],
+                ),
+                "total": timed(model_total, options["repeat"]),
+            },
+            "values": {
+                "serialize": timed(
+                    lambda: [compiled.to_representation(row) for row in rows],
+                    options["repeat"],
+                ),
+                "total": timed(values_total, options["repeat"]),
+            },
+        }
+        for mode in timings.values():
+            for step, timing in list(mode.items()):
+                mode[f"{step}_us_per_row"] = timing["mean_ms"] * 1000 / len(rows)
+        timings["identical"] = model_total() == values_total()
+        timings["speedup"] = (
+            timings["model"]["serialize"]["mean_ms"]
+            / timings["values"]["serialize"]["mean_ms"]
+        )
+        results[name] = timings
+    return results
+
+
+async def load_test(port, paths, total, concurrency):
+    """GET `paths` round robin over `concurrency` keep-alive connections."""
+    latencies = []
+
+    async def client(worker):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            for index in range(worker, total, concurrency):
+                path = paths[index % len(paths)]
+                start = time.perf_counter()
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode())
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode("latin-1").split("\r\n"):
+                    name, _, value = line.partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(worker) for worker in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests_per_sec": total / elapsed,
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+@suite("async")
+def async_benchmark(options):
+    """
+    p50/p99 latency and requests/sec of employee and department reads under
+    uvicorn, served by the async views and by the sync viewsets.
+    """
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        return {"skipped": "uvicorn is not installed"}
+
+    seed_employees(options["employees"])
+    pks = list(Employee.objects.order_by("pk").values_list("pk", flat=True)[:100])
+    paths = [reverse("departments-list")]
+    paths += [f"{reverse('employees-list')}?page={page}" for page in range(1, 11)]
+    paths += [reverse("employees-detail", args=[pk]) for pk in pks]
+
+    results = {}
+    for mode, async_reads in [("async", "true"), ("sync", "false")]:
+        port = free_port()
+        env = {
+            **os.environ,
+            "DJANGO_ENV": "prod",
+            "DJANGO_ALLOWED_HOSTS": "127.0.0.1",
+            "COMPANY_ASYNC_READS": async_reads,
+            # Measure the read path rather than the response cache.
+            "COMPANY_RESPONSE_CACHE": "false",
+        }
+        env.setdefault("DJANGO_SECRET_KEY", "benchmark-only")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "mysite.asgi:application"]
+            + ["--port", str(port), "--log-level", "warning"],
+            env=env,
+            cwd=settings.BASE_DIR,
+        )
+        try:
+            wait_for_port(port)
+            # Warm up every path before measuring.
+            asyncio.run(load_test(port, paths, len(paths), options["concurrency"]))
+            results[mode] = asyncio.run(
+                load_test(port, paths, options["requests"], options["concurrency"])
+            )
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+SCRATCH = "Benchmark scratch"
+BULK_ROWS = 10
+
+
+def routed_actions():
+    """`METHOD ViewSet.action` for every action that company/urls.py routes."""
+    actions = set()
+    for pattern in router_urls:
+        view = pattern.callback
+        for method, action in getattr(view, "actions", {}).items():
+            if method in view.cls.http_method_names:
+                actions.add(f"{method.upper()} {view.cls.__name__}.{action}")
+    return actions
+
+
+class EndpointRequests:
+    """
+    Builds the index-th request of every action of the company API.
+
+    Reads use the seeded employees and a scratch department with dependents.
+    Creates run before the updates and deletes that act on the rows they
+    made, and `drop()` removes the scratch departments, so every run starts
+    from the same data.
+    """
+
+    def __init__(self, run):
+        self.run = run
+        generate_company(100, departments=1, max_dependents=4, prefix=SCRATCH)
+        self.department = Department.objects.get(name=f"{SCRATCH} 1")
+        self.employees = list(
+            self.department.employees.order_by("pk").values_list("pk", flat=True)
+        )
+        self.parent = self.department.employees.order_by("-dependents_count").first()
+        self.dependent = self.parent.dependents.first()
+        self.readable = list(
+            Employee.objects.order_by("pk").values_list("pk", flat=True)[:100]
+        )
+        # `{name: {index: response data}}` of the creates.
+        self.created = {}
+
+    def drop(self):
+        with batched_summaries():
+            Employee.objects.filter(department__name__startswith=SCRATCH).delete()
+        Department.objects.filter(name__startswith=SCRATCH).delete()
+
+    def employee_row(self, kind, index):
+        return {
+            "first_name": "Load",
+            "last_name": f"Test{index}",
+            "gender": "m",
+            "birth_date": "1990-01-01",
+            "email": f"{kind}.{self.run}.{index}@example.com",
+            "salary": 1000,
+            "department": self.department.name,
+        }
+
+    def created_employee(self, index):
+        email = self.employee_row("create", index)["email"]
+        return Employee.objects.filter(email=email).values_list("pk", flat=True).first()
+
+    def created_id(self, name, index):
+        return self.created.get(name, {}).get(index, {}).get("id", 0)
+
+    def bulk_ids(self, index):
+        created = self.created.get("POST EmployeeViewSet.bulk", {}).get(index, {})
+        return [row["id"] for row in created.get("succeeded", [])]
+
+    def requests(self):
+        """`{"METHOD ViewSet.action": request(index) -> (method, path, body)}`."""
+        employees = reverse("employees-list")
+        departments = reverse("departments-list")
+        bulk = reverse("employees-bulk")
+
+        def employee(pk):
+            return reverse("employees-detail", args=[pk or 0])
+
+        def department(pk):
+            return reverse("departments-detail", args=[pk or 0])
+
+        def dependents(index):
+            return reverse("employee-dependents-list", args=[self.employee(index)])
+
+        def dependent(index):
+            pk = self.created_id("POST DependentViewSet.create", index)
+            return reverse(
+                "employee-dependents-detail", args=[self.employee(index), pk]
+            )
+
+        def readable(index):
+            return self.readable[index % len(self.readable)]
+
+        return {
+            "GET EmployeeViewSet.list": lambda i: (
+                "get",
+                f"{employees}?page={i % 10 + 1}",
+                None,
+            ),
+            "GET EmployeeViewSet.retrieve": lambda i: (
+                "get",
+                employee(readable(i)),
+                None,
+            ),
+            "GET EmployeeViewSet.export": lambda i: (
+                "get",
+                f"{reverse('employees-export')}?search=youssuf+shakweh",
+                None,
+            ),
+            "GET EmployeeViewSet.stats": lambda i: (
+                "get",
+                reverse("employees-stats"),
+                None,
+            ),
+            "POST EmployeeViewSet.create": lambda i: (
+                "post",
+                employees,
+                self.employee_row("create", i),
+            ),
+            "PUT EmployeeViewSet.update": lambda i: (
+                "put",
+                employee(self.created_employee(i)),
+                self.employee_row("create", i),
+            ),
+            "DELETE EmployeeViewSet.destroy": lambda i: (
+                "delete",
+                employee(self.created_employee(i)),
+                None,
+            ),
+            "POST EmployeeViewSet.bulk": lambda i: (
+                "post",
+                bulk,
+                [self.employee_row(f"bulk{n}", i) for n in range(BULK_ROWS)],
+            ),
+            "PUT EmployeeViewSet.bulk": lambda i: (
+                "put",
+                bulk,
+                [
+                    {**self.employee_row(f"bulk{n}", i), "id": pk, "salary": 2000}
+                    for n, pk in enumerate(self.bulk_ids(i))
+                ],
+            ),
+            "DELETE EmployeeViewSet.bulk": lambda i: ("delete", bulk, self.bulk_ids(i)),
+            "GET DepartmentViewSet.list": lambda i: ("get", departments, None),
+            "GET DepartmentViewSet.retrieve": lambda i: (
+                "get",
+                department(self.department.pk),
+                None,
+            ),
+            "GET DepartmentViewSet.stats": lambda i: (
+                "get",
+                reverse("departments-stats"),
+                None,
+            ),
+            "POST DepartmentViewSet.create": lambda i: (
+                "post",
+                departments,
+                {"name": f"{SCRATCH} {self.run} {i}"},
+            ),
+            "PUT DepartmentViewSet.update": lambda i: (
+                "put",
+                department(self.created_id("POST DepartmentViewSet.create", i)),
+                {"name": f"{SCRATCH} {self.run} {i} renamed"},
+            ),
+            "DELETE DepartmentViewSet.destroy": lambda i: (
+                "delete",
+                department(self.created_id("POST DepartmentViewSet.create", i)),
+                None,
+            ),
+            "GET DependentViewSet.list": lambda i: (
+                "get",
+                reverse("employee-dependents-list", args=[self.parent.pk]),
+                None,
+            ),
+            "GET DependentViewSet.retrieve": lambda i: (
+                "get",
+                reverse(
+                    "employee-dependents-detail",
+                    args=[self.parent.pk, self.dependent.pk],
+                ),
+                None,
+            ),
+            "POST DependentViewSet.create": lambda i: (
+                "post",
+                dependents(i),
+                self.dependent_row(),
+            ),
+            "PATCH DependentViewSet.partial_update": lambda i: (
+                "patch",
+                dependent(i),
+                {"name": "Load test"},
+            ),
+            "DELETE DependentViewSet.destroy": lambda i: (
+                "delete",
+                dependent(i),
+                None,
+            ),
+            "POST DependentViewSet.bulk": lambda i: (
+                "post",
+                reverse("employee-dependents-bulk", args=[self.employee(i)]),
+                [self.dependent_row() for _ in range(BULK_ROWS)],
+            ),
+            "POST DependentBulkViewSet.bulk": lambda i: (
+                "post",
+                reverse("dependents-bulk"),
+                [
+                    {**self.dependent_row(), "employee": self.employee(i + n)}
+                    for n in range(BULK_ROWS)
+                ],
+            ),
+        }
+
+    def dependent_row(self):
+        return {"name": "Load", "birth_date": "2015-01-01", "relationship": "son"}
+
+    def employee(self, index):
+        return self.employees[index % len(self.employees)]
+
+
+def send(client, method, path, body):
+    """Return the response and the queries of one request."""
+    data = "" if body is None else json.dumps(body)
+    with log_queries() as log:
+        response = client.generic(
+            method.upper(), path, data, content_type="application/json"
+        )
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+    return response, len(log)
+
+
+def drive(name, request, total, concurrency, created):
+    """
+    Send requests `0..total - 2` of `request` from `concurrency` threads,
+    then the last one alone with its Python allocations traced.
+    """
+    latencies, queries, failures = [], [], []
+
+    def worker(offset):
+        # Failed requests count as errors instead of ending the run.
+        client = Client(raise_request_exception=False)
+        try:
+            for index in range(offset, total - 1, concurrency):
+                method, path, body = request(index)
+                start = time.perf_counter()
+                response, count = send(client, method, path, body)
+                latencies.append((time.perf_counter() - start) * 1000)
+                record(index, response, count)
+        finally:
+            connections.close_all()
+
+    def record(index, response, count):
+        queries.append(count)
+        if response.status_code >= 400:
+            failures.append(response.status_code)
+        elif response.status_code == 201:
+            created.setdefault(name, {})[index] = response.json()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as clients:
+        list(clients.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    client = Client(raise_request_exception=False)
+    response, count = send(client, *request(total - 1))
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    record(total - 1, response, count)
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": len(failures),
+        "requests_per_sec": (total - 1) / elapsed,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "queries_mean": sum(queries) / len(queries),
+        "queries_max": max(queries),
+        "python_peak_mb": python_peak / 1024 / 1024,
+    }
+
+
+@suite("endpoints")
+def endpoints_benchmark(options):
+    """
+    Throughput, latency percentiles, queries per request and peak memory of
+    every action of the company API, in-process with `concurrency` clients.
+    """
+    seed_employees(options["employees"])
+    # Two requests at least: the traced one and one timed.
+    total = max(options["requests"], 2)
+    endpoints = EndpointRequests(run=time.time_ns())
+    requests = endpoints.requests()
+    results = {}
+    try:
+        with override_settings(
+            COMPANY_RESPONSE_CACHE={"ENABLED": False}, ALLOWED_HOSTS=["testserver"]
+        ):
+            for name, request in requests.items():
+                results[name] = drive(
+                    name, request, total, options["concurrency"], endpoints.created
+                )
+    finally:
+        endpoints.drop()
+    for name in sorted(routed_actions() - set(requests)):
+        results[name] = {"skipped": "no request defined"}
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
@@ -0,0 +1,354 @@
+from collections import Counter, defaultdict
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from .cache import bump_generation
+from .counters import COUNTER_FIELDS, SPOUSE_COUNTERS
+from .models import Department, Dependent, Employee
+from .search import index_employees
+from .serializers import check_relationship_rules, dependent_gender
+from .summary import adjust_summaries, batched_summaries, employee_deltas
+
+# Reported for rows whose chunk the database rejected, typically because a
+# concurrent write took the same email; database errors are not echoed.
+WRITE_FAILED = "Could not be written with its chunk; retry the row."
+
+
+class EmployeeBulkRowSerializer(serializers.ModelSerializer):
+    # Departments and email uniqueness are resolved for the whole batch at
+    # once by `EmployeeBulkWriter` rather than with one query per row.
+    id = serializers.IntegerField(required=False)
+    department = serializers.CharField(max_length=150)
+
+    class Meta:
+        model = Employee
+        fields = [
+            "id",
+            "first_name",
+            "last_name",
+            "gender",
+            "birth_date",
+            "email",
+            "salary",
+            "department",
+        ]
+        extra_kwargs = {"email": {"validators": []}}
+
+
+class BulkWriter:
+    def __init__(self, chunk_size=500, atomic=False):
+        self.chunk_size = chunk_size
+        self.atomic = atomic
+
+    def result(self, succeeded, errors):
+        return {
+            "succeeded": succeeded,
+            "errors": [
+                {"index": index, "errors": detail}
+                for index, detail in sorted(errors.items())
+            ],
+        }
+
+
+class EmployeeBulkWriter(BulkWriter):
+    """
+    Validates and writes batches of employees.
+
+    Every row is validated up front. With `atomic` set, any invalid row
+    aborts the whole batch; otherwise valid rows are written in chunks of
+    `chunk_size` and the invalid ones are reported by index. All writes
+    happen inside one transaction, with a savepoint per chunk.
+    """
+
+    fields = [
+        "first_name",
+        "last_name",
+        "gender",
+        "birth_date",
+        "email",
+        "salary",
+        "department",
+    ]
+
+    def create(self, rows):
+        valid, errors = self.validate(rows)
+        return self.write(valid, errors, self._create_chunk)
+
+    def update(self, rows):
+        valid, errors = self.validate(rows, update=True)
+        return self.write(valid, errors, self._update_chunk)
+
+    def delete(self, ids):
+        if not isinstance(ids, list):
+            raise serializers.ValidationError("Expected a list of employee ids.")
+        valid, errors = [], {}
+        field = serializers.IntegerField()
+        for index, value in enumerate(ids):
+            try:
+                valid.append((index, field.run_validation(value)))
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+
+        existing = set(
+            Employee.objects.filter(pk__in=[pk for _, pk in valid]).values_list(
+                "pk", flat=True
+            )
+        )
+        for index, pk in valid:
+            if pk not in existing:
+                errors[index] = ["Not found."]
+        valid = [(index, pk) for index, pk in valid if index not in errors]
+        return self.write(valid, errors, self._delete_chunk)
+
+    def validate(self, rows, update=False):
+        if not isinstance(rows, list):
+            raise serializers.ValidationError("Expected a list of employees.")
+
+        valid, errors = [], {}
+        for index, row in enumerate(rows):
+            serializer = EmployeeBulkRowSerializer(data=row)
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+            elif update and "id" not in serializer.validated_data:
+                errors[index] = {"id": ["This field is required."]}
+            elif not update and "id" in serializer.validated_data:
+                errors[index] = {"id": ["Ids are assigned on create."]}
+            else:
+                valid.append((index, dict(serializer.validated_data)))
+
+        names = {data["department"] for _, data in valid}
+        departments = Department.objects.in_bulk(names, field_name="name")
+        emails = [data["email"] for _, data in valid]
+        owners = dict(
+            Employee.objects.filter(email__in=emails).values_list("email", "pk")
+        )
+        instances = {}
+        if update:
+            instances = Employee.objects.in_bulk([data["id"] for _, data in valid])
+
+        seen, seen_ids = set(), set()
+        checked = []
+        for index, data in valid:
+            row_errors = {}
+            name = data["department"]
+            if name not in departments:
+                row_errors["department"] = [f"Object with name={name} does not exist."]
+            owner = owners.get(data["email"])
+            if data["email"] in seen or owner not in (None, data.get("id")):
+                row_errors["email"] = ["employee with this email already exists."]
+            if update and data["id"] in seen_ids:
+                row_errors["id"] = ["Duplicate id in batch."]
+            elif update and data["id"] not in instances:
+                row_errors["id"] = ["Not found."]
+            seen.add(data["email"])
+            seen_ids.add(data.get("id"))
+
+            if row_errors:
+                errors[index] = row_errors
+                continue
+            data["department"] = departments[name]
+            if update:
+                data["instance"] = instances[data["id"]]
+            checked.append((index, data))
+        return checked, errors
+
+    def write(self, valid, errors, write_chunk):
+        succeeded = []
+        if errors and self.atomic:
+            return self.result(succeeded, errors)
+
+        try:
+            with transaction.atomic():
+                for start in range(0, len(valid), self.chunk_size):
+                    chunk = valid[start : start + self.chunk_size]
+                    try:
+                        with transaction.atomic():
+                            ids = write_chunk([data for _, data in chunk])
+                    except IntegrityError:
+                        if self.atomic:
+                            raise
+                        errors.update({index: [WRITE_FAILED] for index, _ in chunk})
+                    else:
+                        succeeded += [
+                            {"index": index, "id": pk}
+                            for (index, _), pk in zip(chunk, ids)
+                        ]
+        except IntegrityError:
+            errors = {index: [WRITE_FAILED] for index, _ in valid}
+            succeeded = []
+        if succeeded:
+            # Bulk writes skip the model signals that invalidate cached responses.
+            bump_generation(Employee)
+        return self.result(succeeded, errors)
+
+    def _create_chunk(self, rows):
+        employees = [Employee(**data) for data in rows]
+        Employee.objects.bulk_create(employees)
+        if any(employee.pk is None for employee in employees):
+            # Backends such as MySQL do not return the ids of bulk inserts.
+            ids = dict(
+                Employee.objects.filter(
+                    email__in=[employee.email for employee in employees]
+                ).values_list("email", "pk")
+            )
+            for employee in employees:
+                employee.pk = ids[employee.email]
+        index_employees(employees)
+        adjust_summaries(employee_deltas(employees, created=True))
+        return [employee.pk for employee in employees]
+
+    def _update_chunk(self, rows):
+        employees = []
+        updated_at = now()
+        for data in rows:
+            employee = data["instance"]
+            for field in self.fields:
+                setattr(employee, field, data[field])
+            # bulk_update does not apply auto_now.
+            employee.updated_at = updated_at
+            employees.append(employee)
+        Employee.objects.bulk_update(employees, [*self.fields, "updated_at"])
+        index_employees(employees)
+        adjust_summaries(employee_deltas(employees))
+        return [employee.pk for employee in employees]
+
+    def _delete_chunk(self, ids):
+        with batched_summaries():
+            Employee.objects.filter(pk__in=ids).delete()
+        return ids
+
+
+class DependentBulkRowSerializer(serializers.ModelSerializer):
+    # Employees and the relationship rules are checked for the whole batch at
+    # once by `DependentBulkWriter` rather than with queries per row.
+    employee = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Dependent
+        fields = ["employee", "name", "birth_date", "relationship"]
+
+
+class DependentBulkWriter(BulkWriter):
+    """
+    Validates and adds batches of dependents, of one employee or of many.
+
+    The employees of the batch are loaded and locked with one query, and the
+    relationship rules are checked in memory against their counters, row
+    after row, so rows of the same batch count against each other. With
+    `atomic` set, any invalid row aborts the whole batch; otherwise valid
+    rows are inserted and the invalid ones are reported by index. Counters
+    are written with one `bulk_update` and summaries with one UPDATE per
+    department.
+    """
+
+    def __init__(self, chunk_size=500, atomic=False, employee_id=None):
+        super().__init__(chunk_size, atomic)
+        # Rows added under /employees/{id}/dependents/ belong to that employee.
+        self.employee_id = employee_id
+
+    def create(self, rows):
+        valid, errors = self.validate(rows)
+        with transaction.atomic():
+            ids = {data["employee"] for _, data in valid}
+            if self.employee_id is not None:
+                ids.add(self.employee_id)
+            employees = (
+                Employee.objects.select_for_update()
+                .only("gender", "department_id", *COUNTER_FIELDS)
+                .in_bulk(ids)
+            )
+            if self.employee_id is not None and self.employee_id not in employees:
+                raise NotFound("Employee not found.")
+            checked = self.check(valid, errors, employees)
+            if errors and self.atomic:
+                return self.result([], errors)
+            dependents = self.insert([dependent for _, dependent in checked])
+            self.count(dependents, employees)
+        if dependents:
+            # Bulk writes skip the model signals that invalidate cached responses.
+            bump_generation(Dependent)
+        succeeded = [
+            {"index": index, "id": dependent.pk} for index, dependent in checked
+        ]
+        return self.result(succeeded, errors)
+
+    def validate(self, rows):
+        if not isinstance(rows, list):
+            raise serializers.ValidationError("Expected a list of dependents.")
+
+        valid, errors = [], {}
+        for index, row in enumerate(rows):
+            serializer = DependentBulkRowSerializer(data=row)
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+                continue
+            data = dict(serializer.validated_data)
+            employee = data.setdefault("employee", self.employee_id)
+            if employee is None:
+                errors[index] = {"employee": ["This field is required."]}
+            elif self.employee_id not in (None, employee):
+                errors[index] = {"employee": ["Does not match the URL."]}
+            else:
+                valid.append((index, data))
+        return valid, errors
+
+    def check(self, valid, errors, employees):
+        """
+        Return `[(index, Dependent)]` for the rows that pass the rules, and
+        keep the counters of `employees` in step with them.
+        """
+        checked = []
+        for index, data in valid:
+            employee = employees.get(data.pop("employee"))
+            if employee is None:
+                errors[index] = {"employee": ["Not found."]}
+                continue
+            relationship = data["relationship"]
+            try:
+                check_relationship_rules(employee, relationship)
+            except serializers.ValidationError as exc:
+                errors[index] = {"relationship": exc.detail}
+                continue
+            employee.dependents_count += 1
+            field = SPOUSE_COUNTERS.get(relationship)
+            if field is not None:
+                setattr(employee, field, getattr(employee, field) + 1)
+            dependent = Dependent(
+                employee=employee, gender=dependent_gender(relationship), **data
+            )
+            checked.append((index, dependent))
+        return checked
+
+    def insert(self, dependents):
+        Dependent.objects.bulk_create(dependents, batch_size=self.chunk_size)
+        if any(dependent.pk is None for dependent in dependents):
+            # Backends such as MySQL do not return the ids of bulk inserts.
+            # The employees are locked, so their newest dependents are these.
+            ids = (
+                Dependent.objects.filter(
+                    employee__in={dependent.employee_id for dependent in dependents}
+                )
+                .order_by("-pk")
+                .values_list("pk", flat=True)[: len(dependents)]
+            )
+            for dependent, pk in zip(dependents, reversed(list(ids))):
+                dependent.pk = pk
+        return dependents
+
+    def count(self, dependents, employees):
+        """Write the counters checked in memory and the department totals."""
+        added = Counter(dependent.employee_id for dependent in dependents)
+        if not added:
+            return
+        changed = [employees[pk] for pk in added]
+        # bulk_update does not apply auto_now.
+        updated_at = now()
+        for employee in changed:
+            employee.updated_at = updated_at
+        Employee.objects.bulk_update(changed, [*COUNTER_FIELDS, "updated_at"])
+
+        deltas = defaultdict(Counter)
+        for pk, total in added.items():
+            deltas[employees[pk].department_id]["dependents_total"] += total
+        adjust_summaries(deltas)
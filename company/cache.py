@@ -0,0 +1,191 @@
+import hashlib
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from uuid import uuid4
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+DEFAULTS = {
+    "ENABLED": True,
+    "ALIAS": "default",
+    "TIMEOUT": 300,
+    "KEY_PREFIX": "company",
+}
+
+stats = Counter()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "COMPANY_RESPONSE_CACHE", {})}
+
+
+def collect_metrics():
+    """Response cache hits and misses for `mysite.metrics`."""
+    name = "company_response_cache_requests_total"
+    yield (
+        name,
+        "counter",
+        "Cacheable responses served from and added to the cache.",
+        [(name, {"result": result}, stats[result]) for result in ("hits", "misses")],
+    )
+
+
+def get_cache():
+    return caches[get_config()["ALIAS"]]
+
+
+def generation_key(model):
+    return f"{get_config()['KEY_PREFIX']}:generation:{model._meta.label_lower}"
+
+
+def new_generation():
+    return f"{time.time_ns()}-{uuid4().hex}"
+
+
+def generation_time(generation):
+    """Return when `generation` was created as an aware datetime."""
+    nanoseconds = int(generation.split("-", 1)[0])
+    return datetime.fromtimestamp(nanoseconds / 1e9, tz=timezone.utc)
+
+
+def get_generations(models):
+    """
+    Return the current generation token of each model, creating missing ones.
+
+    Generations are random, timestamped tokens rather than counters so that an
+    evicted generation can never come back with a value some stale entry was
+    keyed on, and so that they double as per-table last-modified stamps.
+    """
+    cache = get_cache()
+    keys = [generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, new_generation(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+async def aget_generations(models):
+    """`get_generations` through the async cache API."""
+    cache = get_cache()
+    keys = [generation_key(model) for model in models]
+    generations = await cache.aget_many(keys)
+    for key in keys:
+        if key not in generations:
+            await cache.aadd(key, new_generation(), timeout=None)
+            generations[key] = await cache.aget(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(model):
+    """Invalidate every cached response that depends on `model`."""
+
+    def bump():
+        get_cache().set(generation_key(model), new_generation(), timeout=None)
+
+    # Bump now for this process and again once the change is visible to others,
+    # so a response rendered mid-transaction cannot outlive the commit.
+    bump()
+    transaction.on_commit(bump)
+
+
+class CachedResponseMixin:
+    """
+    Caches the data of successful `list` and `retrieve` responses.
+
+    Entries are keyed by path, query string and the generation of every model
+    listed for the action in `cache_dependencies`, so saving or deleting any of
+    those models makes the old entries unreachable.
+    """
+
+    cache_dependencies = {}
+    # Response headers cached with the data.
+    cached_headers = ["X-Count-Exact"]
+
+    def get_cache_key(self, request, generations):
+        query = sorted(request.query_params.lists())
+        # Cached bodies carry absolute pagination links, so the host and
+        # scheme are part of the key.
+        origin = f"{request.scheme}://{request.get_host()}"
+        raw = f"{origin}{request.path}?{query}:{request.accepted_renderer.format}"
+        digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+        return f"{get_config()['KEY_PREFIX']}:response:{digest}:{':'.join(generations)}"
+
+    def cached_response(self, request, render):
+        key = self.get_response_cache_key(request)
+        if key is None:
+            return render()
+        response = self.entry_response(get_cache().get(key))
+        if response is None:
+            response = render()
+            entry = self.response_entry(response)
+            if entry is not None:
+                get_cache().set(key, entry, timeout=get_config()["TIMEOUT"])
+        return response
+
+    async def acached_response(self, request, render):
+        """`cached_response` for an async `render`, with the async cache API."""
+        key = await self.aget_response_cache_key(request)
+        if key is None:
+            return await render()
+        response = self.entry_response(await get_cache().aget(key))
+        if response is None:
+            response = await render()
+            entry = self.response_entry(response)
+            if entry is not None:
+                await get_cache().aset(key, entry, timeout=get_config()["TIMEOUT"])
+        return response
+
+    def get_cache_dependencies(self):
+        return self.cache_dependencies.get(self.action)
+
+    def get_response_cache_key(self, request):
+        dependencies = self.get_cache_dependencies()
+        if not get_config()["ENABLED"] or dependencies is None:
+            return None
+        return self.get_cache_key(request, get_generations(dependencies))
+
+    async def aget_response_cache_key(self, request):
+        dependencies = self.get_cache_dependencies()
+        if not get_config()["ENABLED"] or dependencies is None:
+            return None
+        return self.get_cache_key(request, await aget_generations(dependencies))
+
+    def entry_response(self, entry):
+        """The response of a cache entry, or None on a miss."""
+        if entry is None:
+            return None
+        stats["hits"] += 1
+        data, headers = entry
+        response = Response(data, headers=headers)
+        response["X-Cache"] = "HIT"
+        return response
+
+    def response_entry(self, response):
+        """The cache entry of a freshly rendered response, or None."""
+        stats["misses"] += 1
+        response["X-Cache"] = "MISS"
+        if response.status_code != 200:
+            return None
+        headers = {
+            name: response[name]
+            for name in self.cached_headers
+            if response.has_header(name)
+        }
+        return response.data, headers
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request,
+            lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request,
+            lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs),
+        )
@@ -0,0 +1,161 @@
+import hashlib
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .cache import aget_generations, generation_time, get_generations
+
+
+class ConditionalGetMixin:
+    """
+    Answers `If-None-Match` / `If-Modified-Since` on `list` and `retrieve`
+    with 304 before any serializer runs.
+
+    Validators come from the generations of the models in the action's
+    `cache_dependencies` (see `company.cache`) and, for `retrieve`, from the
+    object's own `updated_at`, so a change to one row does not invalidate
+    the validators of its siblings.
+    """
+
+    def get_object(self):
+        obj = super().get_object()
+        self._conditional_object = obj
+        return obj
+
+    def get_updated_at(self, **kwargs):
+        obj = getattr(self, "_conditional_object", None)
+        if obj is not None:
+            return obj.updated_at
+        return self.updated_at_queryset(**kwargs).first()
+
+    async def aget_updated_at(self, **kwargs):
+        obj = getattr(self, "_conditional_object", None)
+        if obj is not None:
+            return obj.updated_at
+        return await self.updated_at_queryset(**kwargs).afirst()
+
+    def updated_at_queryset(self, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        return (
+            self.get_queryset()
+            .filter(**{self.lookup_field: kwargs[lookup]})
+            .values_list("updated_at", flat=True)
+        )
+
+    def get_validators(self, request, **kwargs):
+        updated_at = None
+        if self.action == "retrieve":
+            updated_at = self.get_updated_at(**kwargs)
+            if updated_at is None:
+                return None, None
+        generations = get_generations(self.get_validator_dependencies())
+        return self.build_validators(request, updated_at, generations)
+
+    async def aget_validators(self, request, **kwargs):
+        updated_at = None
+        if self.action == "retrieve":
+            updated_at = await self.aget_updated_at(**kwargs)
+            if updated_at is None:
+                return None, None
+        generations = await aget_generations(self.get_validator_dependencies())
+        return self.build_validators(request, updated_at, generations)
+
+    def get_rendered_updated_at(self, **kwargs):
+        if self.action == "retrieve":
+            return self.get_updated_at(**kwargs)
+        return None
+
+    async def aget_rendered_updated_at(self, **kwargs):
+        if self.action == "retrieve":
+            return await self.aget_updated_at(**kwargs)
+        return None
+
+    def get_validator_dependencies(self):
+        dependencies = self.get_cache_dependencies()
+        if self.action == "retrieve":
+            # The object's own `updated_at` stands in for its model.
+            model = self.get_queryset().model
+            dependencies = [dep for dep in dependencies if dep is not model]
+        return dependencies
+
+    def build_validators(self, request, updated_at, generations):
+        parts = [request.get_full_path(), request.accepted_renderer.format]
+        stamps = []
+        if updated_at is not None:
+            parts.append(updated_at.isoformat())
+            stamps.append(updated_at)
+
+        parts += generations
+        stamps += [generation_time(generation) for generation in generations]
+        digest = hashlib.md5(":".join(parts).encode(), usedforsecurity=False)
+        return quote_etag(digest.hexdigest()), int(max(stamps).timestamp())
+
+    def conditional_response(self, request, render, **kwargs):
+        if self.get_cache_dependencies() is None:
+            return render()
+
+        if not self.has_conditional_headers(request):
+            # Nothing to compare against: read the generations before the body
+            # so a write committed meanwhile cannot stamp it as current, and
+            # let retrieve take `updated_at` from the object it renders.
+            generations = get_generations(self.get_validator_dependencies())
+            response = render()
+            if response.status_code != 200:
+                return response
+            etag, last_modified = self.build_validators(
+                request, self.get_rendered_updated_at(**kwargs), generations
+            )
+        else:
+            etag, last_modified = self.get_validators(request, **kwargs)
+            response = None
+            if etag is not None:
+                response = get_conditional_response(
+                    request._request, etag=etag, last_modified=last_modified
+                )
+            response = response or render()
+        return self.set_validators(response, etag, last_modified)
+
+    async def aconditional_response(self, request, render, **kwargs):
+        """`conditional_response` for an async `render`."""
+        if self.get_cache_dependencies() is None:
+            return await render()
+
+        if not self.has_conditional_headers(request):
+            generations = await aget_generations(self.get_validator_dependencies())
+            response = await render()
+            if response.status_code != 200:
+                return response
+            etag, last_modified = self.build_validators(
+                request, await self.aget_rendered_updated_at(**kwargs), generations
+            )
+        else:
+            etag, last_modified = await self.aget_validators(request, **kwargs)
+            response = None
+            if etag is not None:
+                response = get_conditional_response(
+                    request._request, etag=etag, last_modified=last_modified
+                )
+            response = response or await render()
+        return self.set_validators(response, etag, last_modified)
+
+    def has_conditional_headers(self, request):
+        headers = request.headers
+        return "If-None-Match" in headers or "If-Modified-Since" in headers
+
+    def set_validators(self, response, etag, last_modified):
+        if etag is not None and response.status_code in (200, 304):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request,
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+            **kwargs,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request,
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+            **kwargs,
+        )
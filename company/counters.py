@@ -0,0 +1,64 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Now
+from .models import Dependent, Employee
+
+SPOUSE_COUNTERS = {
+    Dependent.RELATIONSHIP_CHOICE_WIFE: "wives_count",
+    Dependent.RELATIONSHIP_CHOICE_HUSBAND: "husbands_count",
+}
+COUNTER_FIELDS = ["dependents_count", *SPOUSE_COUNTERS.values()]
+
+
+def counter_updates(relationship, delta):
+    updates = {
+        "dependents_count": F("dependents_count") + delta,
+        "updated_at": Now(),
+    }
+    field = SPOUSE_COUNTERS.get(relationship)
+    if field is not None:
+        updates[field] = F(field) + delta
+    return updates
+
+
+def adjust_counters(employee_id, relationship, delta=1):
+    """Shift an employee's dependent counters in a single UPDATE."""
+    Employee.objects.filter(pk=employee_id).update(
+        **counter_updates(relationship, delta)
+    )
+
+
+def actual_counts():
+    """Subquery expressions computing each counter from the dependents table."""
+
+    def count(condition=Q()):
+        dependents = (
+            Dependent.objects.filter(condition, employee=OuterRef("pk"))
+            .order_by()
+            .values("employee")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        return Coalesce(Subquery(dependents), Value(0))
+
+    counts = {"dependents_count": count()}
+    for relationship, field in SPOUSE_COUNTERS.items():
+        counts[field] = count(Q(relationship=relationship))
+    return counts
+
+
+def find_drift(queryset=None):
+    """Return the employees whose stored counters disagree with the data."""
+    if queryset is None:
+        queryset = Employee.objects.all()
+    annotations = {f"actual_{field}": value for field, value in actual_counts().items()}
+    drifted = Q()
+    for field in COUNTER_FIELDS:
+        drifted |= ~Q(**{field: F(f"actual_{field}")})
+    return queryset.annotate(**annotations).filter(drifted)
+
+
+def rebuild_counters(queryset=None):
+    """Recompute every counter of `queryset` with one UPDATE statement."""
+    if queryset is None:
+        queryset = Employee.objects.all()
+    return queryset.update(**actual_counts())
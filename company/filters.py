@@ -1,16 +1,85 @@
+import time
 from django import forms
+from django.core.cache import cache
 from django_filters.rest_framework import FilterSet, MultipleChoiceFilter
 from rest_framework.filters import SearchFilter
 from .models import Employee, Department
+from .search import search_employees
+
+
+class DepartmentChoices:
+    """
+    Process-local cache of `(pk, name)` department choices.
+
+    Choices are loaded on first use rather than at import time and reloaded
+    once `ttl` seconds have passed or the shared version stamp has been
+    bumped by `invalidate()`.
+    """
+
+    version_key = "company:department-choices:version"
+    ttl = 300
+
+    def __init__(self):
+        self._choices = None
+        self._version = None
+        self._loaded_at = 0.0
+
+    def __call__(self):
+        version = cache.get(self.version_key, 0)
+        expired = time.monotonic() - self._loaded_at > self.ttl
+        if self._choices is None or expired or version != self._version:
+            self.refresh(version)
+        return self._choices
+
+    def __deepcopy__(self, memo):
+        # Form fields deep-copy their choices; every copy must share this cache.
+        return self
+
+    def refresh(self, version=None):
+        if version is None:
+            version = cache.get(self.version_key, 0)
+        self._choices = list(
+            Department.objects.order_by("pk").values_list("pk", "name")
+        )
+        self._version = version
+        self._loaded_at = time.monotonic()
+        return self._choices
+
+    def invalidate(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, 1, timeout=None)
+        self._choices = None
+
+
+department_choices = DepartmentChoices()
+
+
+class DepartmentMultipleChoiceField(forms.MultipleChoiceField):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("choices", department_choices)
+        super().__init__(*args, **kwargs)
+
+    def valid_value(self, value):
+        if super().valid_value(value):
+            return True
+        # The department may have been created by another process since the
+        # choices were cached, so give unknown values one fresh lookup.
+        department_choices.refresh()
+        return super().valid_value(value)
+
+
+class DepartmentFilter(MultipleChoiceFilter):
+    # Choices are supplied by the form field rather than the filter's extra
+    # kwargs, so the API schema does not bake in the current department ids.
+    field_class = DepartmentMultipleChoiceField
 
 
 class EmployeeFilter(FilterSet):
-    department = MultipleChoiceFilter(
-        choices=[
-            (department.pk, department.name) for department in Department.objects.all()
-        ],
-        widget=forms.CheckboxSelectMultiple,
-    )
+    # Filtering on the employee's own foreign key cannot duplicate rows, so
+    # skip the DISTINCT that would wrap the page count in a subquery.
+    department = DepartmentFilter(widget=forms.CheckboxSelectMultiple, distinct=False)
 
     class Meta:
         model = Employee
@@ -19,3 +88,7 @@ class EmployeeFilter(FilterSet):
 
 class EmployeeSearchFilter(SearchFilter):
     search_description = "A search field depends on employee's full name"
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "")
+        return search_employees(queryset, query)
@@ -0,0 +1,37 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from company.benchmarks import SUITES
+
+
+class Command(BaseCommand):
+    help = (
+        "Run benchmark suites against the configured database and print a "
+        "JSON report. Missing synthetic rows are inserted first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("suites", nargs="*", help="Suites to run (default: all).")
+        parser.add_argument("--employees", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--requests", type=int, default=2000, help="HTTP requests per mode."
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=8, help="Server and client threads."
+        )
+        parser.add_argument(
+            "--output", help="Also write the report to this file, to diff later."
+        )
+
+    def handle(self, *args, **options):
+        names = options["suites"] or list(SUITES)
+        unknown = set(names) - set(SUITES)
+        if unknown:
+            raise CommandError(f"Unknown suites: {', '.join(sorted(unknown))}")
+
+        report = {name: SUITES[name](options) for name in names}
+        self.stdout.write(json.dumps(report, indent=2, default=str))
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2, sort_keys=True, default=str)
+                output.write("\n")
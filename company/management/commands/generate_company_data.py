@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from company.synthetic import generate_company
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert synthetic departments, employees and dependents. Dependents "
+        "follow the relationship rules and every counter, summary and search "
+        "term is kept consistent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--departments", type=int, default=10)
+        parser.add_argument("--employees", type=int, default=10000)
+        parser.add_argument(
+            "--max-dependents", type=int, default=4, help="Per employee."
+        )
+        parser.add_argument(
+            "--prefix",
+            default="Department",
+            help="Departments are named '<prefix> <n>'.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        counts = generate_company(
+            options["employees"],
+            departments=options["departments"],
+            max_dependents=options["max_dependents"],
+            prefix=options["prefix"],
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {counts['employees']} employees with "
+                f"{counts['dependents']} dependents in "
+                f"{counts['departments']} departments."
+            )
+        )
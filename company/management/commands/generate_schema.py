@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from company.schema import (
+    DEFAULT_VERSION,
+    SchemaDocument,
+    artifact_path,
+    generate_schema,
+)
+
+
+class Command(BaseCommand):
+    help = "Write the OpenAPI schema artifact served by /company/swagger/."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--api-version", default=None)
+        parser.add_argument(
+            "--yaml", action="store_true", help="Also write a YAML copy."
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Fail if the artifact differs from the schema of the code.",
+        )
+
+    def handle(self, *args, **options):
+        version = options["api_version"] or DEFAULT_VERSION
+        path = artifact_path(version)
+        content = generate_schema(version)
+        if options["check"]:
+            if not path.exists() or path.read_bytes() != content:
+                raise CommandError(
+                    f"{path} is out of date; run manage.py generate_schema."
+                )
+            self.stdout.write(self.style.SUCCESS(f"{path} is up to date."))
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path}."))
+        if options["yaml"]:
+            yaml_path = path.with_suffix(".yaml")
+            yaml_path.write_bytes(SchemaDocument(content).yaml)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {yaml_path}."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from company.counters import COUNTER_FIELDS, find_drift, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Verify and rebuild the denormalized dependent counters on employees."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only report drifted employees and fail if there are any.",
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(find_drift())
+        for employee in drifted:
+            stored = ", ".join(
+                f"{field}={getattr(employee, field)}"
+                f" (actual {getattr(employee, 'actual_' + field)})"
+                for field in COUNTER_FIELDS
+            )
+            self.stdout.write(f"Employee {employee.pk}: {stored}")
+
+        if options["verify"]:
+            if drifted:
+                raise CommandError(f"{len(drifted)} employees have drifted counters.")
+            self.stdout.write(self.style.SUCCESS("All dependent counters are correct."))
+            return
+
+        updated = rebuild_counters()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt counters of {updated} employees ({len(drifted)} drifted)."
+            )
+        )
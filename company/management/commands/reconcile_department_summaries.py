@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from company.summary import (
+    SUMMARY_FIELDS,
+    find_drift,
+    missing_summaries,
+    rebuild_summaries,
+)
+
+
+class Command(BaseCommand):
+    help = "Verify and repair the materialized department summaries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only report drifted departments and fail if there are any.",
+        )
+
+    def handle(self, *args, **options):
+        missing = list(missing_summaries().values_list("pk", flat=True))
+        for pk in missing:
+            self.stdout.write(f"Department {pk}: missing summary")
+        drifted = list(find_drift())
+        for summary in drifted:
+            stored = ", ".join(
+                f"{field}={getattr(summary, field)}"
+                f" (actual {getattr(summary, 'actual_' + field)})"
+                for field in SUMMARY_FIELDS
+            )
+            self.stdout.write(f"Department {summary.pk}: {stored}")
+
+        if options["verify"]:
+            if missing or drifted:
+                raise CommandError(
+                    f"{len(missing) + len(drifted)} departments have drifted summaries."
+                )
+            self.stdout.write(
+                self.style.SUCCESS("All department summaries are correct.")
+            )
+            return
+
+        updated = rebuild_summaries()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt summaries of {updated} departments "
+                f"({len(missing) + len(drifted)} drifted)."
+            )
+        )
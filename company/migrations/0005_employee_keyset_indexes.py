@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0004_department_management_start_date_department_manager'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['first_name', 'id'], name='employee_first_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['last_name', 'id'], name='employee_last_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def index_existing_employees(apps, schema_editor):
+    Employee = apps.get_model('company', 'Employee')
+    EmployeeSearchTerm = apps.get_model('company', 'EmployeeSearchTerm')
+    terms = []
+    for employee in Employee.objects.only('id', 'first_name', 'last_name').iterator():
+        words = f"{employee.first_name} {employee.last_name}".lower().split()
+        terms += [
+            EmployeeSearchTerm(employee_id=employee.pk, position=position, term=term)
+            for position, term in enumerate(words)
+        ]
+        if len(terms) >= 5000:
+            EmployeeSearchTerm.objects.bulk_create(terms)
+            terms = []
+    EmployeeSearchTerm.objects.bulk_create(terms)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0005_employee_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('term', models.CharField(max_length=150)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='company.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'employee'], name='search_term_employee_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='employeesearchterm',
+            constraint=models.UniqueConstraint(fields=('employee', 'position'), name='unique_search_term_position'),
+        ),
+        migrations.RunPython(index_existing_employees, migrations.RunPython.noop),
+    ]
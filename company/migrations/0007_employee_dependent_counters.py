@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:06
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_existing_dependents(apps, schema_editor):
+    Employee = apps.get_model('company', 'Employee')
+    Dependent = apps.get_model('company', 'Dependent')
+
+    def count(condition=Q()):
+        dependents = (
+            Dependent.objects.filter(condition, employee=OuterRef('pk'))
+            .order_by()
+            .values('employee')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return Coalesce(Subquery(dependents), Value(0))
+
+    Employee.objects.update(
+        dependents_count=count(),
+        wives_count=count(Q(relationship='wife')),
+        husbands_count=count(Q(relationship='husband')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0006_employeesearchterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='dependents_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='husbands_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='wives_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing_dependents, migrations.RunPython.noop),
+    ]
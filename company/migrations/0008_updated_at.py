@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("company", "0007_employee_dependent_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="department",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="dependent",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="employee",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+def summarize_existing_departments(apps, schema_editor):
+    Department = apps.get_model("company", "Department")
+    DepartmentSummary = apps.get_model("company", "DepartmentSummary")
+    Employee = apps.get_model("company", "Employee")
+    Dependent = apps.get_model("company", "Dependent")
+
+    employees = {
+        row["department"]: row
+        for row in Employee.objects.order_by()
+        .values("department")
+        .annotate(headcount=Count("pk"), salary_sum=Sum("salary"))
+    }
+    dependents = dict(
+        Dependent.objects.order_by()
+        .values("employee__department")
+        .annotate(total=Count("pk"))
+        .values_list("employee__department", "total")
+    )
+    summaries = []
+    for pk in Department.objects.values_list("pk", flat=True):
+        row = employees.get(pk, {})
+        summaries.append(
+            DepartmentSummary(
+                department_id=pk,
+                headcount=row.get("headcount", 0),
+                salary_sum=row.get("salary_sum") or 0,
+                dependents_total=dependents.get(pk, 0),
+            )
+        )
+    DepartmentSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("company", "0008_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DepartmentSummary",
+            fields=[
+                (
+                    "department",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="summary",
+                        serialize=False,
+                        to="company.department",
+                    ),
+                ),
+                ("headcount", models.PositiveIntegerField(default=0)),
+                (
+                    "salary_sum",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("dependents_total", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(summarize_existing_departments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("company", "0009_departmentsummary"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="dependent",
+            index=models.Index(
+                fields=["employee", "relationship"], name="dependent_employee_rel_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(
+                fields=["gender", "first_name", "id"], name="employee_gender_first_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(
+                fields=["gender", "last_name", "id"], name="employee_gender_last_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(
+                fields=["department", "first_name", "id"],
+                name="employee_dept_first_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(
+                fields=["department", "last_name", "id"], name="employee_dept_last_idx"
+            ),
+        ),
+    ]
@@ -11,6 +11,7 @@ class Department(models.Model):
         null=True,
     )
     management_start_date = models.DateField(null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self) -> str:
         return self.name
@@ -38,6 +39,59 @@ class Employee(models.Model):
         related_name="employees",
         blank=True,
     )
+    dependents_count = models.PositiveIntegerField(default=0, editable=False)
+    wives_count = models.PositiveIntegerField(default=0, editable=False)
+    husbands_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # Ordered listings, optionally filtered by gender or department, read
+        # their page straight off an index; see QueryPlanTests.
+        indexes = [
+            models.Index(
+                fields=["first_name", "id"], name="employee_first_name_id_idx"
+            ),
+            models.Index(fields=["last_name", "id"], name="employee_last_name_id_idx"),
+            models.Index(
+                fields=["gender", "first_name", "id"], name="employee_gender_first_idx"
+            ),
+            models.Index(
+                fields=["gender", "last_name", "id"], name="employee_gender_last_idx"
+            ),
+            models.Index(
+                fields=["department", "first_name", "id"],
+                name="employee_dept_first_idx",
+            ),
+            models.Index(
+                fields=["department", "last_name", "id"], name="employee_dept_last_idx"
+            ),
+        ]
+
+    # Shifted by single UPDATEs in company/counters.py, never by save().
+    counter_fields = ["dependents_count", "wives_count", "husbands_count"]
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not kwargs.get("force_insert")
+            and kwargs.get("update_fields") is None
+        ):
+            # A full save would write back the counters this instance loaded,
+            # undoing the increments made since.
+            skipped = {*self.counter_fields, *self.get_deferred_fields()}
+            kwargs["update_fields"] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored department and salary so summaries can follow updates.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     def __str__(self) -> str:
         return f"{self.first_name} {self.last_name}"
@@ -73,6 +127,61 @@ class Dependent(models.Model):
         related_name="dependents",
         blank=True,
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Counting an employee's dependents of one relationship.
+            models.Index(
+                fields=["employee", "relationship"], name="dependent_employee_rel_idx"
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored relationship so counters can follow updates.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
 
     def __str__(self) -> str:
         return self.name
+
+
+class DepartmentSummary(models.Model):
+    department = models.OneToOneField(
+        Department,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="summary",
+    )
+    headcount = models.PositiveIntegerField(default=0)
+    salary_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    dependents_total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Summary of {self.department_id}"
+
+
+class EmployeeSearchTerm(models.Model):
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name="search_terms",
+    )
+    position = models.PositiveSmallIntegerField()
+    term = models.CharField(max_length=150)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "employee"], name="search_term_employee_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["employee", "position"], name="unique_search_term_position"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return self.term
@@ -1,5 +1,387 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    PageNumberPagination,
+    _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .cache import get_cache, get_generations
+
+DEFAULTS = {
+    "PAGE_SIZE": 10,
+    "MAX_PAGE_SIZE": 100,
+    # Seconds a count is cached for, unless the model changes first.
+    "COUNT_TIMEOUT": 300,
+    # Unfiltered tables that MySQL's statistics put below this size are
+    # counted exactly; the statistics are least accurate for small tables.
+    "ESTIMATE_ABOVE": 10000,
+}
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "COMPANY_PAGINATION", {})}
+
+
+def table_rows(queryset):
+    """MySQL's estimate of the rows in the table of `queryset`, or None."""
+    connection = connections[queryset.db]
+    if connection.vendor != "mysql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def keyset_filter(ordering, values):
+    """
+    Return a `Q` selecting the rows that come after `values` in `ordering`:
+    (a, b, c) > (x, y, z) == a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    """
+    predicate = Q()
+    for index, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        equal = {f.lstrip("-"): v for f, v in zip(ordering[:index], values)}
+        predicate |= Q(**equal, **{f"{name}__{lookup}": values[index]})
+    return predicate
 
 
 class EmployeePagination(PageNumberPagination):
-    page_size = 10
+    """
+    Page numbers with three ways to count the rows, chosen by `?count=`:
+
+    - `estimate` (the default) takes MySQL's table statistics for unfiltered
+      lists of large tables, and otherwise counts exactly, caching the count
+      until the model changes when the only filters are the view's
+      `estimate_count_params`.
+    - `exact` always runs the count.
+    - `false` does not count at all.
+
+    Without an exact count, pages look one row ahead to know if there is a
+    next one. The `X-Count-Exact` header tells whether `count` is exact.
+    """
+
+    page_size_query_param = "page_size"
+    count_query_param = "count"
+    neutral_params = ["ordering", "fields", "expand", "format"]
+
+    def __init__(self):
+        config = get_config()
+        self.page_size = config["PAGE_SIZE"]
+        self.max_page_size = config["MAX_PAGE_SIZE"]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_mode = self.get_count_mode(request)
+        if self.count_mode == COUNT_EXACT:
+            self.count, self.count_exact = None, True
+            return super().paginate_queryset(queryset, request, view)
+
+        window = self.lookahead_window(request)
+        if window is None:
+            return None
+        if self.count_mode == COUNT_ESTIMATE:
+            self.count, self.count_exact = self.estimate_count(queryset, request, view)
+        return self.lookahead_page(list(queryset[window]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset` with the async ORM."""
+        self.count_mode = self.get_count_mode(request)
+        if self.count_mode == COUNT_EXACT:
+            self.count, self.count_exact = None, True
+            return await self.acount_page(queryset, request)
+
+        window = self.lookahead_window(request)
+        if window is None:
+            return None
+        if self.count_mode == COUNT_ESTIMATE:
+            self.count, self.count_exact = await sync_to_async(self.estimate_count)(
+                queryset, request, view
+            )
+        return self.lookahead_page([row async for row in queryset[window]])
+
+    def get_count_mode(self, request):
+        value = request.query_params.get(self.count_query_param, "").lower()
+        if value in ("0", "false", "no"):
+            return None
+        elif value in (COUNT_EXACT, "1", "true", "yes"):
+            return COUNT_EXACT
+        return COUNT_ESTIMATE
+
+    def estimate_count(self, queryset, request, view):
+        """Return the count of `queryset` and whether it is exact."""
+        config = get_config()
+        if not queryset.query.where:
+            rows = table_rows(queryset)
+            if rows is not None and rows >= config["ESTIMATE_ABOVE"]:
+                return rows, False
+
+        allowed = getattr(view, "estimate_count_params", [])
+        params = [
+            (name, values)
+            for name, values in sorted(request.query_params.lists())
+            if name not in self.get_neutral_params()
+        ]
+        if any(name not in allowed for name, _ in params):
+            return queryset.count(), True
+
+        # Keyed on the model's generation, a cached count is still exact.
+        (generation,) = get_generations([queryset.model])
+        raw = f"{request.path}?{params}"
+        digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+        key = f"company:count:{digest}:{generation}"
+        count = get_cache().get(key)
+        if count is None:
+            count = queryset.count()
+            get_cache().set(key, count, timeout=config["COUNT_TIMEOUT"])
+        return count, True
+
+    def get_neutral_params(self):
+        """Query parameters that do not change which rows are counted."""
+        return {
+            self.page_query_param,
+            self.page_size_query_param,
+            self.count_query_param,
+            *self.neutral_params,
+        }
+
+    def lookahead_window(self, request):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        try:
+            self.page_number = _positive_int(
+                request.query_params.get(self.page_query_param, 1), strict=True
+            )
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+        self.request = request
+        offset = (self.page_number - 1) * self.page_size
+        return slice(offset, offset + self.page_size + 1)
+
+    def lookahead_page(self, rows):
+        if not rows and self.page_number != 1:
+            raise NotFound(self.invalid_page_message)
+        self.has_next = len(rows) > self.page_size
+        return rows[: self.page_size]
+
+    async def acount_page(self, queryset, request):
+        # Mirrors PageNumberPagination.paginate_queryset, with the count and
+        # the page rows fetched through the async ORM.
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        bottom = (number - 1) * page_size
+        rows = [row async for row in queryset[bottom : bottom + page_size]]
+        self.page = Page(rows, number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return rows
+
+    def get_next_link(self):
+        if self.count_mode == COUNT_EXACT:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.count_mode == COUNT_EXACT:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.count_mode == COUNT_EXACT:
+            response = super().get_paginated_response(data)
+        else:
+            fields = [
+                ("next", self.get_next_link()),
+                ("previous", self.get_previous_link()),
+                ("results", data),
+            ]
+            if self.count_mode == COUNT_ESTIMATE:
+                fields.insert(0, ("count", self.count))
+            response = Response(OrderedDict(fields))
+        if self.count_mode is not None:
+            response["X-Count-Exact"] = "true" if self.count_exact else "false"
+        return response
+
+
+class EmployeeKeysetPagination(BasePagination):
+    """
+    Keyset pagination over the view's `ordering_fields` with `id` as a
+    tiebreaker, sorted in the direction of the last field so one index serves
+    the whole ordering. Pages are located with a `WHERE (first_name, id) > (...)`
+    style predicate instead of `OFFSET`, and no total count is issued.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    tiebreaker = "id"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self):
+        config = get_config()
+        self.page_size = config["PAGE_SIZE"]
+        self.max_page_size = config["MAX_PAGE_SIZE"]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.seek(queryset, request, view)
+        return self.page_rows(list(queryset[: self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset` with the async ORM."""
+        queryset = self.seek(queryset, request, view)
+        return self.page_rows([row async for row in queryset[: self.page_size + 1]])
+
+    def seek(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+
+        self.values, self.reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self._flip(field) for field in ordering]
+
+        queryset = queryset.order_by(*ordering)
+        if self.values is not None:
+            queryset = queryset.filter(keyset_filter(ordering, self.values))
+        return queryset
+
+    def page_rows(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        seeked = self.values is not None
+        self.has_next = has_more if not self.reverse else seeked
+        self.has_previous = seeked if not self.reverse else has_more
+        self.first = rows[0] if rows else None
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset, view):
+        allowed = getattr(view, "ordering_fields", None) or []
+        ordering = [
+            field
+            for field in queryset.query.order_by
+            if isinstance(field, str) and field.lstrip("-") in allowed
+        ]
+        if ordering and ordering[-1].startswith("-"):
+            return ordering + [f"-{self.tiebreaker}"]
+        return ordering + [self.tiebreaker]
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(self.first, reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        values = [getattr(row, field.lstrip("-")) for field in self.ordering]
+        payload = json.dumps({"v": values, "r": reverse}, separators=(",", ":"))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values, reverse = payload["v"], bool(payload["r"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Cursors come from clients: each value must be one its column holds.
+        try:
+            values = [
+                model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
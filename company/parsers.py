@@ -0,0 +1,60 @@
+import codecs
+import io
+import json
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from .renderers import FastJSONRenderer, fast_json_enabled, orjson
+
+
+def loads(data):
+    """`json.loads()`, by orjson when enabled. What orjson rejects is retried."""
+    if fast_json_enabled():
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+class FastJSONParser(JSONParser):
+    """
+    `JSONParser` that decodes UTF-8 bodies with orjson when it is installed
+    and `COMPANY_FAST_JSON` is on. Bodies orjson rejects are parsed again by
+    `JSONParser`, so errors and edge cases such as NaN read the same.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if not fast_json_enabled() or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON into a list with one item per line.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        rows = []
+        for number, line in enumerate(codecs.getreader(encoding)(stream), 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(loads(line))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON parse error on line {number} - {exc}")
+        return rows
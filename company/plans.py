@@ -0,0 +1,53 @@
+import re
+from django.db import connections
+
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\S+)$")
+
+
+def explain(sql, using="default"):
+    """Return the plan of `sql` as rows of `{column: value}`."""
+    connection = connections[using]
+    prefix = "EXPLAIN QUERY PLAN" if connection.vendor == "sqlite" else "EXPLAIN"
+    with connection.cursor() as cursor:
+        cursor.execute(f"{prefix} {sql}")
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def plan_problems(plan, vendor):
+    """
+    Return `("scan", table)` for every full table scan in `plan` and
+    `("sort", None)` for every sort that no index serves.
+    """
+    problems = []
+    # Scans of subquery results are not table scans.
+    derived = set()
+    for row in plan:
+        if vendor == "sqlite":
+            detail = row["detail"]
+            scan = SQLITE_SCAN.match(detail)
+            if detail.startswith(("CO-ROUTINE ", "MATERIALIZE ")):
+                derived.add(detail.split(" ", 1)[1])
+            elif scan and scan.group(1) not in derived:
+                problems.append(("scan", scan.group(1)))
+            elif detail.startswith("USE TEMP B-TREE FOR") and "ORDER BY" in detail:
+                problems.append(("sort", None))
+        elif vendor == "mysql":
+            if row["type"] == "ALL" and not row["table"].startswith("<"):
+                problems.append(("scan", row["table"]))
+            if "Using filesort" in (row["Extra"] or ""):
+                problems.append(("sort", None))
+    return problems
+
+
+def explain_queries(queries, using="default"):
+    """Explain the SELECTs among `queries` captured by `CaptureQueriesContext`."""
+    vendor = connections[using].vendor
+    explained = []
+    for query in queries:
+        sql = query["sql"]
+        if not sql.lstrip().upper().startswith("SELECT"):
+            continue
+        plan = explain(sql, using)
+        explained.append((sql, plan, plan_problems(plan, vendor)))
+    return explained
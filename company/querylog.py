@@ -0,0 +1,84 @@
+"""
+Finds queries that run once per row: log the queries of an action run
+against a few rows and against ten times as many, and compare.
+"""
+
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from django.conf import settings
+from django.db import connections
+
+# Placeholder lists grow with the rows they name; one shape covers them all.
+PLACEHOLDER_LIST = re.compile(r"\((?:%s, )+%s\)")
+VALUES_LIST = re.compile(r"(?:\(\.\.\.\), )+\(\.\.\.\)")
+# bulk_update() sets each field with a CASE of one WHEN per row.
+CASE_BRANCHES = re.compile(r"(WHEN .+? THEN .+? )\1+")
+# Django inlines limits, which follow page sizes.
+LIMIT = re.compile(r"\b(LIMIT|OFFSET) \d+")
+# Savepoints are named after the thread and a counter, and quoted with
+# double quotes or, on MySQL, backticks.
+SAVEPOINT = re.compile(r'SAVEPOINT [`"]?\w+[`"]?')
+
+
+def query_shape(sql):
+    sql = VALUES_LIST.sub("(...)", PLACEHOLDER_LIST.sub("(...)", sql))
+    sql = CASE_BRANCHES.sub(r"\1", LIMIT.sub(r"\1 %s", sql))
+    return SAVEPOINT.sub("SAVEPOINT ...", sql)
+
+
+def project_stack():
+    """The calling frames that belong to this project, innermost last."""
+    root = Path(settings.BASE_DIR).resolve()
+    frames = [
+        frame
+        for frame in traceback.extract_stack()[:-3]
+        # Skip manage.py and the like, which run everything.
+        if root in Path(frame.filename).parents[1:]
+        and "site-packages" not in frame.filename
+    ]
+    return "".join(traceback.format_list(frames))
+
+
+class QueryLog:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((query_shape(sql), project_stack()))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def counts(self):
+        return Counter(shape for shape, _ in self.queries)
+
+    def stack(self, shape):
+        return next(stack for logged, stack in self.queries if logged == shape)
+
+
+@contextmanager
+def log_queries(using="default"):
+    log = QueryLog()
+    with connections[using].execute_wrapper(log):
+        yield log
+
+
+def scaling_queries(small, large):
+    """Return `{shape: (small count, large count)}` for the shapes that grew."""
+    before = small.counts()
+    return {
+        shape: (before[shape], count)
+        for shape, count in large.counts().items()
+        if count > before[shape]
+    }
+
+
+def describe_scaling(small, large):
+    lines = [f"{len(small)} queries with N rows, {len(large)} with 10N rows."]
+    for shape, (before, after) in scaling_queries(small, large).items():
+        lines += [f"\n{before} -> {after} times: {shape}", large.stack(shape)]
+    return "\n".join(lines)
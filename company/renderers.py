@@ -0,0 +1,50 @@
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Dates and times go through DRF's encoder, which writes UTC as "Z" where
+# orjson would write "+00:00".
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS if orjson else 0
+)
+# The stdlib renderer escapes these so the output is also valid JavaScript.
+LINE_SEPARATORS = [("\u2028".encode(), b"\\u2028"), ("\u2029".encode(), b"\\u2029")]
+
+
+def fast_json_enabled():
+    return orjson is not None and getattr(settings, "COMPANY_FAST_JSON", True)
+
+
+def encode_default(obj):
+    return JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` that encodes with orjson when it is installed and
+    `COMPANY_FAST_JSON` is on, producing the same bytes.
+
+    Indented or ASCII-only output and anything orjson rejects, such as
+    integers beyond 64 bits, are left to `JSONRenderer`. Unlike it, orjson
+    writes NaN and infinities as null instead of failing.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or not fast_json_enabled():
+            return super().render(data, accepted_media_type, renderer_context)
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
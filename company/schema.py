@@ -0,0 +1,139 @@
+import hashlib
+import json
+from collections import OrderedDict
+from importlib import import_module
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.test import RequestFactory
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, yaml_sane_dump
+from drf_yasg.renderers import SwaggerYAMLRenderer, _SpecRenderer
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+from rest_framework.request import Request
+
+SCHEMA_INFO = openapi.Info(
+    title="Company Database API Documentation",
+    default_version="v1.1",
+    license=openapi.License(name="BSD License"),
+)
+DEFAULT_VERSION = SCHEMA_INFO._default_version
+
+DEFAULTS = {
+    "DIRECTORY": Path(settings.BASE_DIR) / "openapi",
+    "URL": None,
+    "REGENERATE": False,
+    "MAX_AGE": 300,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "COMPANY_SCHEMA", {})}
+
+
+def artifact_path(version=DEFAULT_VERSION):
+    return Path(get_config()["DIRECTORY"]) / f"openapi-{version}.json"
+
+
+def code_modified():
+    """When the newest module of this app or the project last changed."""
+    roots = [
+        Path(apps.get_app_config("company").path),
+        Path(import_module(settings.ROOT_URLCONF).__file__).parent,
+    ]
+    return max(path.stat().st_mtime for root in roots for path in root.rglob("*.py"))
+
+
+def is_stale(path):
+    """Whether the artifact at `path` predates the code it documents."""
+    return path.stat().st_mtime < code_modified()
+
+
+def etag_matches(header, etag):
+    """Weak comparison of `etag` with an If-None-Match header."""
+    etags = parse_etags(header)
+    return "*" in etags or etag in [tag.removeprefix("W/") for tag in etags]
+
+
+def generate_schema(version=DEFAULT_VERSION):
+    """Generate the public schema as JSON bytes, independent of any request."""
+    url = get_config()["URL"]
+    generator = schema_view.generator_class(
+        SCHEMA_INFO, version, url=url or "http://localhost"
+    )
+    # Views pick their serializers by request method, so they need a request.
+    request = Request(RequestFactory().get("/"))
+    swagger = generator.get_schema(request=request, public=True)
+    if not url:
+        # Let clients resolve paths against whichever host served the schema.
+        del swagger["host"], swagger["schemes"]
+    return OpenAPICodecJson(validators=[]).encode(swagger)
+
+
+class SchemaDocument:
+    def __init__(self, content):
+        self.json = content
+        spec = json.loads(content, object_pairs_hook=OrderedDict)
+        self.yaml = yaml_sane_dump(spec, binary=True)
+        self.etag = quote_etag(hashlib.md5(content, usedforsecurity=False).hexdigest())
+
+
+class SchemaStore:
+    """
+    Keeps the schema document in memory, loading it from the artifact written
+    by `manage.py generate_schema` or, when it is missing or older than the
+    code, generating it once.
+    """
+
+    def __init__(self):
+        self._documents = {}
+
+    def get(self, version=DEFAULT_VERSION):
+        if get_config()["REGENERATE"]:
+            return SchemaDocument(generate_schema(version))
+        if version not in self._documents:
+            path = artifact_path(version)
+            if path.exists() and not is_stale(path):
+                content = path.read_bytes()
+            else:
+                content = generate_schema(version)
+            self._documents[version] = SchemaDocument(content)
+        return self._documents[version]
+
+    def clear(self):
+        self._documents.clear()
+
+
+schema_store = SchemaStore()
+
+
+class PrecomputedSchemaView(
+    get_schema_view(
+        SCHEMA_INFO,
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+    )
+):
+    def get(self, request, version="", format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            # The UI pages fetch the spec separately and are cheap to render.
+            return super().get(request, version, format)
+
+        document = schema_store.get(request.version or DEFAULT_VERSION)
+        if etag_matches(request.headers.get("If-None-Match", ""), document.etag):
+            response = HttpResponseNotModified()
+        elif isinstance(renderer, SwaggerYAMLRenderer):
+            response = HttpResponse(document.yaml, content_type=renderer.media_type)
+        else:
+            response = HttpResponse(document.json, content_type=renderer.media_type)
+        response["ETag"] = document.etag
+        patch_cache_control(response, public=True, max_age=get_config()["MAX_AGE"])
+        return response
+
+
+schema_view = PrecomputedSchemaView
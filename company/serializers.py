@@ -1,10 +1,41 @@
+from django.db import transaction
+from django.shortcuts import get_object_or_404
 from django.utils.timezone import now
 from rest_framework import serializers
 from .models import Department, Employee, Dependent
 
 
+class SparseFieldsSerializerMixin:
+    """
+    Renders only the fields named in `context["fields"]`, when it is set, and
+    adds the fields built by `context["expand"]`, replacing any field of the
+    same name. Nested serializers render in full.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        expand = self.context.get("expand", {})
+        for name, build in expand.items():
+            fields[name] = build()
+        selected = self.context.get("fields")
+        if selected is not None:
+            fields = {
+                name: field
+                for name, field in fields.items()
+                if name in selected or name in expand
+            }
+        return fields
+
+
 class SimpleEmployeeSerializer(serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
+    # What `full_name` reads, for `company.values`.
+    values_lookups = {"full_name": ["first_name", "last_name"]}
 
     def get_full_name(self, employee: Employee):
         return f"{employee.first_name} {employee.last_name}"
@@ -14,21 +45,35 @@ class SimpleEmployeeSerializer(serializers.ModelSerializer):
         fields = ["id", "full_name", "email"]
 
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class SimpleDepartmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Department
         fields = ["id", "name"]
 
 
+class DepartmentSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    headcount = serializers.IntegerField(source="summary.headcount", read_only=True)
+    salary_sum = serializers.DecimalField(
+        source="summary.salary_sum", max_digits=14, decimal_places=2, read_only=True
+    )
+    dependents_total = serializers.IntegerField(
+        source="summary.dependents_total", read_only=True
+    )
+
+    class Meta:
+        model = Department
+        fields = ["id", "name", "headcount", "salary_sum", "dependents_total"]
+
+
 class DepartmentUpdateSerializer(serializers.ModelSerializer):
     def validate(self, data):
         manager = data.get("manager")
         if manager is not None:
-            if manager.department != self.instance:
+            if manager.department_id != self.instance.pk:
                 raise serializers.ValidationError(
                     "Employee not allowed to be manager of a department that he does not work in."
                 )
-            if manager != self.instance.manager:
+            if manager.pk != self.instance.manager_id:
                 self.instance.management_start_date = now().date()
         else:
             self.instance.management_start_date = None
@@ -40,7 +85,9 @@ class DepartmentUpdateSerializer(serializers.ModelSerializer):
         fields = ["name", "manager"]
 
 
-class DepartmentRetrieveSerializer(serializers.ModelSerializer):
+class DepartmentRetrieveSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     manager = SimpleEmployeeSerializer()
 
     class Meta:
@@ -48,16 +95,20 @@ class DepartmentRetrieveSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "manager", "management_start_date"]
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     department = serializers.StringRelatedField()
+    values_lookups = {"department": ["department__name"]}
 
     class Meta:
         model = Employee
         fields = ["id", "first_name", "last_name", "gender", "email", "department"]
 
 
-class EmployeeRetrieveSerializer(serializers.ModelSerializer):
+class EmployeeRetrieveSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     department = serializers.StringRelatedField()
+    values_lookups = {"department": ["department__name"]}
     dependents_count = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -93,43 +144,68 @@ class EmployeeCreateUpdateSerializer(serializers.ModelSerializer):
         ]
 
 
+def check_relationship_rules(employee: Employee, relationship, current=None):
+    """
+    Raise a `ValidationError` if `employee` cannot take on a dependent with
+    this `relationship`. `current` is the relationship the dependent already
+    has when it is being updated, so it does not count against the limits.
+    """
+    wives_count = employee.wives_count
+    husbands_count = employee.husbands_count
+    if current == Dependent.RELATIONSHIP_CHOICE_WIFE:
+        wives_count -= 1
+    elif current == Dependent.RELATIONSHIP_CHOICE_HUSBAND:
+        husbands_count -= 1
+
+    if employee.gender == Employee.GENDER_CHOICE_MALE:
+        if relationship == Dependent.RELATIONSHIP_CHOICE_HUSBAND:
+            raise serializers.ValidationError("How a man can be married from a man?")
+        elif wives_count >= 4 and relationship == Dependent.RELATIONSHIP_CHOICE_WIFE:
+            raise serializers.ValidationError(
+                "A man cannot be married from more than 4 wives."
+            )
+    else:
+        if relationship == Dependent.RELATIONSHIP_CHOICE_WIFE:
+            raise serializers.ValidationError(
+                "How a woman can be married from a woman?"
+            )
+        elif (
+            husbands_count >= 1
+            and relationship == Dependent.RELATIONSHIP_CHOICE_HUSBAND
+        ):
+            raise serializers.ValidationError(
+                "How a woman can be married from more than one man?"
+            )
+
+
+def dependent_gender(relationship):
+    if relationship in [
+        Dependent.RELATIONSHIP_CHOICE_WIFE,
+        Dependent.RELATIONSHIP_CHOICE_DAUGHTER,
+    ]:
+        return Dependent.GENDER_CHOICE_FEMALE
+    return Dependent.GENDER_CHOICE_MALE
+
+
+def lock_employee(employee_id):
+    # Concurrent writers for the same employee queue on this row lock, so
+    # the counters checked below cannot change until the transaction ends.
+    return get_object_or_404(Employee.objects.select_for_update(), pk=employee_id)
+
+
 class DependentSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         employee_id = self.context["employee_id"]
-        employee = Employee.objects.get(pk=employee_id)
-        relationship = self.validated_data["relationship"]
+        relationship = validated_data["relationship"]
 
-        if employee.gender == "m":
-            if relationship == "husband":
-                raise serializers.ValidationError(
-                    "How a man can be married from a man?"
-                )
-            elif (
-                employee.dependents.filter(relationship="wife").count() == 4
-                and relationship == "wife"
-            ):
-                raise serializers.ValidationError(
-                    "A man cannot be married from more than 4 wives."
-                )
-        else:
-            if relationship == "wife":
-                raise serializers.ValidationError(
-                    "How a woman can be married from a woman?"
-                )
-            elif (
-                employee.dependents.filter(relationship="husband").count() == 1
-                and relationship == "husband"
-            ):
-                raise serializers.ValidationError(
-                    "How a woman can be married from more than one man?"
-                )
-
-        gender = "f" if relationship in ["wife", "daughter"] else "m"
-        return Dependent.objects.create(
-            employee_id=employee_id,
-            gender=gender,
-            **validated_data,
-        )
+        with transaction.atomic():
+            employee = lock_employee(employee_id)
+            check_relationship_rules(employee, relationship)
+            return Dependent.objects.create(
+                employee_id=employee_id,
+                gender=dependent_gender(relationship),
+                **validated_data,
+            )
 
     class Meta:
         model = Dependent
@@ -140,38 +216,21 @@ class DependentSerializer(serializers.ModelSerializer):
 class DependentUpdateSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         employee_id = self.context["employee_id"]
-        relationship = self.validated_data["relationship"]
-        employee = Employee.objects.get(pk=employee_id)
-
-        if employee.gender == "m":
-            if relationship == "husband":
-                raise serializers.ValidationError(
-                    "How a man can be married from a man?"
-                )
-            elif (
-                employee.dependents.filter(relationship="wife").count() == 4
-                and relationship == "wife"
-            ):
-                raise serializers.ValidationError(
-                    "A man cannot be married from more than 4 wives."
-                )
-        else:
-            if relationship == "wife":
-                raise serializers.ValidationError(
-                    "How a woman can be married from a woman?"
-                )
-            elif (
-                employee.dependents.filter(relationship="husband").count() == 1
-                and relationship == "husband"
-            ):
-                raise serializers.ValidationError(
-                    "How a woman can be married from more than one man?"
-                )
 
-        gender = "f" if relationship in ["wife", "daughter"] else "m"
-        instance.__dict__.update(**validated_data)
-        instance.gender = gender
-        instance.save()
+        with transaction.atomic():
+            employee = lock_employee(employee_id)
+            # Re-read under the lock: the relationship loaded with `instance`
+            # may have changed since, and the counters follow the stored one.
+            instance = get_object_or_404(
+                Dependent.objects.select_for_update(), pk=instance.pk
+            )
+            relationship = validated_data.get("relationship", instance.relationship)
+            check_relationship_rules(
+                employee, relationship, current=instance.relationship
+            )
+            instance.__dict__.update(**validated_data)
+            instance.gender = dependent_gender(relationship)
+            instance.save()
         return instance
 
     class Meta:
@@ -0,0 +1,74 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import bump_generation
+from .counters import adjust_counters
+from .models import Department, DepartmentSummary, Dependent, Employee
+from .search import index_employee
+from .summary import adjust_employee_summary, adjust_summaries, employee_deltas
+
+
+@receiver(post_save, sender=Employee)
+def update_employee_search_terms(sender, instance, created, update_fields, **kwargs):
+    if update_fields is not None and not {"first_name", "last_name"} & set(
+        update_fields
+    ):
+        return
+    index_employee(instance)
+
+
+@receiver(post_save, sender=Dependent)
+def count_saved_dependent(sender, instance, created, **kwargs):
+    current = {
+        "employee_id": instance.employee_id,
+        "relationship": instance.relationship,
+    }
+    loaded = getattr(instance, "_loaded_values", None)
+    if created:
+        adjust_counters(instance.employee_id, instance.relationship, 1)
+        adjust_employee_summary(instance.employee_id, 1)
+    elif loaded is not None:
+        previous = {field: loaded.get(field) for field in current}
+        if previous != current:
+            adjust_counters(previous["employee_id"], previous["relationship"], -1)
+            adjust_counters(instance.employee_id, instance.relationship, 1)
+        if previous["employee_id"] != instance.employee_id:
+            adjust_employee_summary(previous["employee_id"], -1)
+            adjust_employee_summary(instance.employee_id, 1)
+    instance._loaded_values = current
+
+
+@receiver(post_delete, sender=Dependent)
+def count_deleted_dependent(sender, instance, origin=None, **kwargs):
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if model is Employee:
+        # The dependent's employee is being deleted along with it.
+        return
+    adjust_counters(instance.employee_id, instance.relationship, -1)
+    adjust_employee_summary(instance.employee_id, -1)
+
+
+@receiver(post_save, sender=Department)
+def create_department_summary(sender, instance, created, **kwargs):
+    if created:
+        DepartmentSummary.objects.get_or_create(department=instance)
+
+
+@receiver(post_save, sender=Employee)
+def summarize_saved_employee(sender, instance, created, **kwargs):
+    adjust_summaries(employee_deltas([instance], created=created))
+
+
+@receiver(post_delete, sender=Employee)
+def summarize_deleted_employee(sender, instance, **kwargs):
+    adjust_summaries(employee_deltas([instance], deleted=True))
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Dependent)
+@receiver(post_delete, sender=Dependent)
+def invalidate_cached_responses(sender, **kwargs):
+    bump_generation(sender)
@@ -0,0 +1,115 @@
+from collections import namedtuple
+from rest_framework.exceptions import ValidationError
+
+# What rendering a field takes: the columns to load with `only()`, the
+# relations to join or prefetch, and the models its data comes from.
+Reads = namedtuple(
+    "Reads",
+    ["columns", "select_related", "prefetch_related", "models"],
+    defaults=[(), (), (), ()],
+)
+
+
+def split_param(request, name):
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+class SparseFieldsMixin:
+    """
+    `?fields=a,b` renders only the named fields of `list` and `retrieve`, and
+    `?expand=x,y` embeds the related objects of `expansions`, in place of the
+    field of the same name if there is one.
+
+    The queryset follows the request: only the columns behind the rendered
+    fields are loaded, only expanded relations are joined or prefetched, and
+    the models an expansion reads join the action's `cache_dependencies`.
+    Serializers apply the selection through `SparseFieldsSerializerMixin`.
+    """
+
+    sparse_actions = ("list", "retrieve")
+    # `{field: Reads}` for every field the actions' serializers render.
+    field_reads = {}
+    # `{name: (build the serializer field, Reads)}`.
+    expansions = {}
+    # `{action: [column]}` loaded whatever the fields, such as `updated_at`
+    # for the validators of `ConditionalGetMixin`.
+    always_read = {}
+
+    def get_sparse_params(self):
+        """Return the requested `(fields or None, expansions)` of the action."""
+        if self.action not in self.sparse_actions:
+            return None, []
+        if not hasattr(self, "_sparse_params"):
+            fields = split_param(self.request, "fields")
+            expand = split_param(self.request, "expand") or []
+            unknown = [name for name in expand if name not in self.expansions]
+            if unknown:
+                raise ValidationError(
+                    {"expand": [f"Choose from: {', '.join(self.expansions)}."]}
+                )
+            if fields is not None:
+                available = [*self.get_serializer_class()().fields, *self.expansions]
+                unknown = [name for name in fields if name not in available]
+                if unknown:
+                    raise ValidationError(
+                        {"fields": [f"Unknown fields: {', '.join(unknown)}."]}
+                    )
+            self._sparse_params = fields, expand
+        return self._sparse_params
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields, expand = self.get_sparse_params()
+        context["fields"] = fields
+        context["expand"] = {name: self.expansions[name][0] for name in expand}
+        return context
+
+    def select_fields(self, queryset):
+        """Load what the rendered fields and expansions read, and nothing else."""
+        fields, expand = self.get_sparse_params()
+        if fields is None:
+            fields = list(self.get_serializer_class()().fields)
+        reads = [
+            self.field_reads[name]
+            for name in fields
+            if name in self.field_reads and name not in expand
+        ]
+        reads += [self.expansions[name][1] for name in expand]
+
+        columns = self.get_read_columns()
+        select_related, prefetch_related = [], []
+        for read in reads:
+            columns += read.columns
+            select_related += read.select_related
+            prefetch_related += read.prefetch_related
+        # select_related() without arguments would follow every relation.
+        if select_related:
+            queryset = queryset.select_related(*dict.fromkeys(select_related))
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset.only(*dict.fromkeys(columns))
+
+    def get_read_columns(self):
+        """The columns loaded whatever fields are rendered."""
+        columns = [self.queryset.model._meta.pk.name]
+        columns += self.always_read.get(self.action, [])
+        # Keyset pages read the ordering columns of their last row.
+        ordering = split_param(self.request, "ordering") or []
+        columns += [
+            name.lstrip("-")
+            for name in ordering
+            if name.lstrip("-") in getattr(self, "ordering_fields", [])
+        ]
+        return columns
+
+    def get_cache_dependencies(self):
+        dependencies = super().get_cache_dependencies()
+        _, expand = self.get_sparse_params()
+        for name in expand:
+            for model in self.expansions[name][1].models:
+                if dependencies is not None and model not in dependencies:
+                    dependencies = [*dependencies, model]
+        return dependencies
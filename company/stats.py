@@ -0,0 +1,92 @@
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+from rest_framework import serializers
+from .models import Employee
+
+
+def salary_aggregates(prefix=""):
+    """Aggregates over the employees reached through `prefix`."""
+    pk, salary, gender = f"{prefix}id", f"{prefix}salary", f"{prefix}gender"
+    return {
+        "headcount": Count(pk),
+        "payroll": Sum(salary),
+        "average_salary": Avg(salary),
+        "min_salary": Min(salary),
+        "max_salary": Max(salary),
+        "male_count": Count(pk, filter=Q(**{gender: Employee.GENDER_CHOICE_MALE})),
+        "female_count": Count(pk, filter=Q(**{gender: Employee.GENDER_CHOICE_FEMALE})),
+    }
+
+
+def department_stats(queryset):
+    """One row per department in `queryset`, empty departments included."""
+    return list(
+        queryset.order_by("pk")
+        .values("id", "name")
+        .annotate(**salary_aggregates("employees__"))
+    )
+
+
+def employee_stats(queryset):
+    """One row per department that has employees in `queryset`."""
+    rows = (
+        queryset.order_by("department_id")
+        .values("department_id", "department__name")
+        .annotate(**salary_aggregates())
+    )
+    return [
+        {
+            "id": row.pop("department_id"),
+            "name": row.pop("department__name"),
+            **row,
+        }
+        for row in rows
+    ]
+
+
+def summarize(rows):
+    """Combine per-department rows into totals without another query."""
+    headcount = sum(row["headcount"] for row in rows)
+    payroll = sum(row["payroll"] for row in rows if row["headcount"])
+    salaries = [row for row in rows if row["headcount"]]
+    return {
+        "headcount": headcount,
+        "payroll": payroll,
+        "average_salary": payroll / headcount if headcount else None,
+        "min_salary": min((row["min_salary"] for row in salaries), default=None),
+        "max_salary": max((row["max_salary"] for row in salaries), default=None),
+        "male_count": sum(row["male_count"] for row in rows),
+        "female_count": sum(row["female_count"] for row in rows),
+    }
+
+
+class SalaryStatsSerializer(serializers.Serializer):
+    headcount = serializers.IntegerField()
+    payroll = serializers.DecimalField(max_digits=None, decimal_places=2)
+    average_salary = serializers.DecimalField(
+        max_digits=None, decimal_places=2, allow_null=True
+    )
+    min_salary = serializers.DecimalField(
+        max_digits=8, decimal_places=2, allow_null=True
+    )
+    max_salary = serializers.DecimalField(
+        max_digits=8, decimal_places=2, allow_null=True
+    )
+    male_count = serializers.IntegerField()
+    female_count = serializers.IntegerField()
+
+
+class DepartmentStatsSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
+    def get_fields(self):
+        return {**super().get_fields(), **SalaryStatsSerializer().get_fields()}
+
+
+class StatsSerializer(serializers.Serializer):
+    total = SalaryStatsSerializer()
+    departments = DepartmentStatsSerializer(many=True)
+
+
+def stats_data(rows):
+    return StatsSerializer({"total": summarize(rows), "departments": rows}).data
@@ -0,0 +1,146 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
+from .models import Department, DepartmentSummary, Dependent, Employee
+
+SUMMARY_FIELDS = ["headcount", "salary_sum", "dependents_total"]
+
+salary_field = Employee._meta.get_field("salary")
+
+# Deltas merged by `batched_summaries()` until its block ends.
+pending_deltas = ContextVar("pending_summary_deltas", default=None)
+
+
+def summary_updates(deltas):
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if updates:
+        updates["updated_at"] = Now()
+    return updates
+
+
+def adjust_summaries(deltas):
+    """Apply `{department_id: Counter}` deltas with one UPDATE per department."""
+    pending = pending_deltas.get()
+    if pending is not None:
+        for department_id, delta in deltas.items():
+            pending[department_id].update(delta)
+        return
+    for department_id, delta in deltas.items():
+        updates = summary_updates(delta)
+        if updates:
+            DepartmentSummary.objects.filter(department_id=department_id).update(
+                **updates
+            )
+
+
+@contextmanager
+def batched_summaries():
+    """
+    Merge the deltas applied inside the block, such as those of the signal
+    handler of each deleted employee, and apply them once it ends.
+    """
+    if pending_deltas.get() is not None:
+        yield
+        return
+    pending = defaultdict(Counter)
+    token = pending_deltas.set(pending)
+    try:
+        yield
+    finally:
+        pending_deltas.reset(token)
+    adjust_summaries(pending)
+
+
+def adjust_employee_summary(employee_id, dependents_total):
+    """Shift the dependents total of the department `employee_id` works in."""
+    department = Employee.objects.filter(pk=employee_id).values("department_id")
+    DepartmentSummary.objects.filter(department_id=Subquery(department)).update(
+        **summary_updates({"dependents_total": dependents_total})
+    )
+
+
+def employee_deltas(employees, created=False, deleted=False):
+    """
+    Return the summary deltas of creating, deleting or saving `employees`.
+
+    Saved employees are compared with the values they were loaded with, so
+    only a change of department or salary moves anything.
+    """
+    deltas = defaultdict(Counter)
+
+    def add(department_id, salary, dependents_count, sign):
+        delta = deltas[department_id]
+        delta["headcount"] += sign
+        delta["salary_sum"] += sign * salary_field.to_python(salary)
+        delta["dependents_total"] += sign * dependents_count
+
+    for employee in employees:
+        current = {
+            "department_id": employee.department_id,
+            "salary": salary_field.to_python(employee.salary),
+        }
+        loaded = getattr(employee, "_loaded_values", None)
+        if created or deleted:
+            add(*current.values(), employee.dependents_count, -1 if deleted else 1)
+        elif loaded is not None and all(field in loaded for field in current):
+            previous = {field: loaded[field] for field in current}
+            if previous != current:
+                add(*previous.values(), employee.dependents_count, -1)
+                add(*current.values(), employee.dependents_count, 1)
+        employee._loaded_values = {**(loaded or {}), **current}
+    return deltas
+
+
+def actual_summary():
+    """Subquery expressions computing each summary field from the base tables."""
+
+    def total(queryset, field, aggregate, **kwargs):
+        totals = (
+            queryset.order_by().values(field).annotate(total=aggregate).values("total")
+        )
+        return Coalesce(Subquery(totals), Value(0), **kwargs)
+
+    employees = Employee.objects.filter(department=OuterRef("department"))
+    dependents = Dependent.objects.filter(employee__department=OuterRef("department"))
+    return {
+        "headcount": total(employees, "department", Count("pk")),
+        "salary_sum": total(
+            employees,
+            "department",
+            Sum("salary"),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+        "dependents_total": total(dependents, "employee__department", Count("pk")),
+    }
+
+
+def find_drift(queryset=None):
+    """Return the summaries that disagree with the data."""
+    if queryset is None:
+        queryset = DepartmentSummary.objects.all()
+    annotations = {
+        f"actual_{field}": value for field, value in actual_summary().items()
+    }
+    drifted = Q()
+    for field in SUMMARY_FIELDS:
+        drifted |= ~Q(**{field: F(f"actual_{field}")})
+    return queryset.annotate(**annotations).filter(drifted)
+
+
+def missing_summaries():
+    return Department.objects.filter(summary__isnull=True)
+
+
+def rebuild_summaries(queryset=None):
+    """Create missing summaries and recompute every field with one UPDATE."""
+    DepartmentSummary.objects.bulk_create(
+        [
+            DepartmentSummary(department_id=pk)
+            for pk in missing_summaries().values_list("pk", flat=True)
+        ]
+    )
+    if queryset is None:
+        queryset = DepartmentSummary.objects.all()
+    return queryset.update(**actual_summary(), updated_at=Now())
@@ -0,0 +1,176 @@
+"""
+Synthetic company data for benchmarks and load tests.
+
+Rows are inserted with `bulk_create`, which skips the model signals, so the
+counters, summaries and search terms those signals maintain are rebuilt for
+the new rows afterwards.
+"""
+
+import random
+from datetime import date, timedelta
+from django.db import transaction
+from rest_framework.serializers import ValidationError
+from .models import Department, DepartmentSummary, Dependent, Employee
+from .search import rebuild_index
+from .serializers import check_relationship_rules, dependent_gender
+from .summary import rebuild_summaries
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael",
+    "Linda", "William", "Elizabeth", "David", "Barbara", "Richard", "Susan",
+    "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen", "Ahmad",
+    "Fatima", "Omar", "Layla", "Youssuf", "Mariam", "Ali", "Nour",
+]  # fmt: skip
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
+    "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez",
+    "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Haddad", "Khoury", "Shakweh", "Nasser", "Saleh", "Mansour",
+]  # fmt: skip
+
+# Most dependents are children; spouses are drawn as often as the rules allow.
+RELATIONSHIP_WEIGHTS = {
+    Dependent.RELATIONSHIP_CHOICE_SON: 4,
+    Dependent.RELATIONSHIP_CHOICE_DAUGHTER: 4,
+    Dependent.RELATIONSHIP_CHOICE_WIFE: 2,
+    Dependent.RELATIONSHIP_CHOICE_HUSBAND: 2,
+}
+# Fixed, so a seed always draws the same data.
+LATEST_DATE = date(2024, 12, 31)
+
+
+def random_date(rng, start, end):
+    return start + timedelta(days=rng.randrange(max((end - start).days, 1)))
+
+
+def get_departments(count, prefix="Department"):
+    """Return `count` departments named `<prefix> <n>`, creating the missing."""
+    names = [f"{prefix} {number}" for number in range(1, count + 1)]
+    existing = Department.objects.in_bulk(names, field_name="name")
+    missing = [Department(name=name) for name in names if name not in existing]
+    Department.objects.bulk_create(missing)
+    if missing:
+        existing = Department.objects.in_bulk(names, field_name="name")
+    return [existing[name] for name in names]
+
+
+def make_employee(rng, department, email):
+    return Employee(
+        first_name=rng.choice(FIRST_NAMES),
+        last_name=rng.choice(LAST_NAMES),
+        gender=rng.choice([Employee.GENDER_CHOICE_MALE, Employee.GENDER_CHOICE_FEMALE]),
+        email=email,
+        birth_date=random_date(rng, date(1960, 1, 1), date(2000, 12, 31)),
+        salary=rng.randrange(30000, 200000) / 100,
+        department=department,
+    )
+
+
+def make_dependents(rng, employee, count):
+    """
+    Draw up to `count` dependents that `check_relationship_rules()` accepts,
+    keeping the employee's counters in step with them.
+    """
+    dependents = []
+    relationships = list(RELATIONSHIP_WEIGHTS)
+    weights = list(RELATIONSHIP_WEIGHTS.values())
+    for _ in range(count):
+        relationship = rng.choices(relationships, weights)[0]
+        try:
+            check_relationship_rules(employee, relationship)
+        except ValidationError:
+            relationship = rng.choice(
+                [
+                    Dependent.RELATIONSHIP_CHOICE_SON,
+                    Dependent.RELATIONSHIP_CHOICE_DAUGHTER,
+                ]
+            )
+        if relationship == Dependent.RELATIONSHIP_CHOICE_WIFE:
+            employee.wives_count += 1
+            born = random_date(rng, date(1960, 1, 1), date(2000, 12, 31))
+        elif relationship == Dependent.RELATIONSHIP_CHOICE_HUSBAND:
+            employee.husbands_count += 1
+            born = random_date(rng, date(1960, 1, 1), date(2000, 12, 31))
+        else:
+            born = random_date(
+                rng, employee.birth_date + timedelta(days=18 * 365), LATEST_DATE
+            )
+        employee.dependents_count += 1
+        dependents.append(
+            Dependent(
+                name=f"{rng.choice(FIRST_NAMES)} {employee.last_name}",
+                gender=dependent_gender(relationship),
+                birth_date=born,
+                relationship=relationship,
+                employee=employee,
+            )
+        )
+    return dependents
+
+
+def insert_employees(employees):
+    Employee.objects.bulk_create(employees)
+    if any(employee.pk is None for employee in employees):
+        # Backends such as MySQL do not return the ids of bulk inserts.
+        ids = dict(
+            Employee.objects.filter(
+                email__in=[employee.email for employee in employees]
+            ).values_list("email", "pk")
+        )
+        for employee in employees:
+            employee.pk = ids[employee.email]
+
+
+def generate_company(
+    employees,
+    departments=10,
+    max_dependents=4,
+    prefix="Department",
+    batch_size=5000,
+    seed=0,
+):
+    """
+    Spread `employees` new employees over `departments` departments and give
+    each up to `max_dependents` dependents. Return the row counts of each.
+    """
+    rng = random.Random(seed)
+    targets = get_departments(departments, prefix)
+    first_pk = (
+        Employee.objects.order_by("-pk").values_list("pk", flat=True).first()
+    ) or 0
+    slug = prefix.lower().replace(" ", "-")
+
+    dependents_total = 0
+    for start in range(0, employees, batch_size):
+        batch = [
+            make_employee(
+                rng,
+                targets[index % len(targets)],
+                # Ids only grow, so emails past the largest id are unused.
+                f"{slug}.{first_pk + index + 1}@example.com",
+            )
+            for index in range(start, min(start + batch_size, employees))
+        ]
+        # Dependents are drawn first so the counters go in with the employees.
+        dependents = [
+            dependent
+            for employee in batch
+            for dependent in make_dependents(
+                rng, employee, rng.randint(0, max_dependents)
+            )
+        ]
+        with transaction.atomic():
+            insert_employees(batch)
+            Dependent.objects.bulk_create(dependents)
+        dependents_total += len(dependents)
+
+    added = Employee.objects.filter(pk__gt=first_pk)
+    rebuild_index(added, batch_size=batch_size)
+    rebuild_summaries(
+        DepartmentSummary.objects.filter(department__in=[d.pk for d in targets])
+    )
+    return {
+        "departments": len(targets),
+        "employees": employees,
+        "dependents": dependents_total,
+    }
@@ -1,3 +1,2234 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+from io import BytesIO, StringIO
+from urllib.parse import urlencode
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import (
+    AsyncRequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from drf_yasg.generators import EndpointEnumerator
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from mysite.db.pool import (
+    ConnectionPool,
+    PooledDatabaseWrapperMixin,
+    PoolTimeout,
+    close_pools,
+    pool_stats,
+)
+from mysite.metrics.registry import registry as metrics_registry
+from . import cache as response_cache
+from .cache import CachedResponseMixin
+from .async_views import AsyncReadView, async_read_patterns
+from .benchmarks import routed_actions
+from .filters import EmployeeFilter, department_choices
+from .models import Department, DepartmentSummary, Dependent, Employee
+from .parsers import FastJSONParser
+from .plans import explain_queries
+from .querylog import describe_scaling, log_queries, query_shape, scaling_queries
+from .renderers import FastJSONRenderer, orjson
+from .schema import artifact_path, generate_schema, schema_store
+from .serializers import DependentUpdateSerializer
+from .urls import router_urls
+from .views import EmployeeViewSet
 
-# Create your tests here.
+
+def quoted(table, column=None):
+    """`table` or `table.column` quoted the way the test database writes them."""
+    quote = connection.ops.quote_name
+    return quote(table) if column is None else f"{quote(table)}.{quote(column)}"
+
+
+def is_savepoint(sql):
+    return sql.startswith(("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT"))
+
+
+def make_department(name="Research"):
+    return Department.objects.create(name=name)
+
+
+def make_employee(department, first_name="John", last_name="Smith", **kwargs):
+    index = Employee.objects.count()
+    defaults = {
+        "gender": Employee.GENDER_CHOICE_MALE,
+        "email": f"{first_name}.{last_name}.{index}@example.com".lower(),
+        "birth_date": date(1990, 1, 1),
+        "salary": "1000.00",
+    }
+    defaults.update(kwargs)
+    return Employee.objects.create(
+        first_name=first_name,
+        last_name=last_name,
+        department=department,
+        **defaults,
+    )
+
+
+class CompanyTestCase(TestCase):
+    def setUp(self):
+        # Cached responses outlive the rolled back data of earlier tests.
+        cache.clear()
+
+
+class EmployeePaginationTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department()
+        for first_name in ["Eve", "Adam", "Carl", "Adam", "Bob", "Dana", "Carl"]:
+            make_employee(cls.department, first_name=first_name)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse("employees-list")
+
+    def walk(self, params):
+        names, url = [], self.url
+        while url:
+            response = self.client.get(url, params if url == self.url else None)
+            self.assertEqual(response.status_code, 200)
+            names += [
+                (row["first_name"], row["id"]) for row in response.data["results"]
+            ]
+            url = response.data["next"]
+        return names, response
+
+    def test_cursor_mode_walks_every_row_in_order_without_count(self):
+        names, response = self.walk(
+            {"pagination": "cursor", "ordering": "first_name", "page_size": 2}
+        )
+        expected = list(
+            Employee.objects.order_by("first_name", "id").values_list(
+                "first_name", "id"
+            )
+        )
+        self.assertEqual(names, expected)
+        self.assertNotIn("count", response.data)
+
+    def test_cursor_mode_descending_ordering(self):
+        names, _ = self.walk(
+            {"pagination": "cursor", "ordering": "-first_name", "page_size": 3}
+        )
+        expected = list(
+            Employee.objects.order_by("-first_name", "-id").values_list(
+                "first_name", "id"
+            )
+        )
+        self.assertEqual(names, expected)
+
+    def test_cursor_mode_previous_link(self):
+        params = {"pagination": "cursor", "ordering": "first_name", "page_size": 3}
+        first = self.client.get(self.url, params).data
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        self.assertEqual(back["results"], first["results"])
+        self.assertIsNone(back["previous"])
+
+    def test_cursor_mode_rejects_bad_cursor(self):
+        response = self.client.get(self.url, {"pagination": "cursor", "cursor": "x"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_mode_rejects_cursor_values_of_the_wrong_type(self):
+        for values in [["abc"], [{"a": 1}], [[1, 2]], [None], ["John", "abc"]]:
+            ordering = "first_name" if len(values) == 2 else ""
+            payload = json.dumps({"v": values, "r": False}).encode()
+            cursor = base64.urlsafe_b64encode(payload).decode()
+            with self.subTest(values=values):
+                response = self.client.get(
+                    self.url,
+                    {"pagination": "cursor", "cursor": cursor, "ordering": ordering},
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_cursor_mode_rejects_search(self):
+        response = self.client.get(self.url, {"pagination": "cursor", "search": "john"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("pagination", response.data)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(self.url, {"page_size": 1000})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 7)
+
+    def test_page_number_mode_can_skip_count(self):
+        names, response = self.walk({"count": "false", "page_size": 3})
+        self.assertEqual(len(names), 7)
+        self.assertNotIn("count", response.data)
+        self.assertNotIn("X-Count-Exact", response)
+
+    @override_settings(COMPANY_PAGINATION={"PAGE_SIZE": 2, "MAX_PAGE_SIZE": 3})
+    def test_page_sizes_are_configurable(self):
+        self.assertEqual(len(self.client.get(self.url).data["results"]), 2)
+        response = self.client.get(self.url, {"page_size": 1000})
+        self.assertEqual(len(response.data["results"]), 3)
+        params = {"pagination": "cursor", "page_size": 1000}
+        self.assertEqual(len(self.client.get(self.url, params).data["results"]), 3)
+
+    def test_exact_count_on_request(self):
+        for params in [{"count": "exact"}, {"count": "true"}]:
+            response = self.client.get(self.url, {**params, "page_size": 3})
+            self.assertEqual(response.data["count"], 7)
+            self.assertEqual(response["X-Count-Exact"], "true")
+        # Unlike the estimate, the exact count bounds the page numbers.
+        response = self.client.get(self.url, {"count": "exact", "page": 9})
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(COMPANY_RESPONSE_CACHE={"ENABLED": False})
+    def test_estimate_reuses_the_count_until_employees_change(self):
+        response = self.client.get(self.url, {"gender": "m"})
+        self.assertEqual(response.data["count"], 7)
+        self.assertEqual(response["X-Count-Exact"], "true")
+        # Other pages, sizes and orderings share the count.
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.url,
+                {"gender": "m", "page": 2, "page_size": 3, "ordering": "first_name"},
+            )
+        self.assertEqual(response.data["count"], 7)
+        self.assertEqual(response["X-Count-Exact"], "true")
+
+        make_employee(self.department, "Fay")
+        self.assertEqual(self.client.get(self.url, {"gender": "m"}).data["count"], 8)
+
+    @override_settings(COMPANY_RESPONSE_CACHE={"ENABLED": False})
+    def test_estimate_uses_table_statistics_when_unfiltered(self):
+        with patch("company.pagination.table_rows", return_value=25000) as stats:
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url, {"page_size": 3})
+            self.assertEqual(response.data["count"], 25000)
+            self.assertEqual(response["X-Count-Exact"], "false")
+            # Pages end with the rows, not with the estimate.
+            response = self.client.get(self.url, {"page_size": 3, "page": 3})
+            self.assertEqual(len(response.data["results"]), 1)
+            self.assertIsNone(response.data["next"])
+            response = self.client.get(self.url, {"page_size": 3, "page": 4})
+            self.assertEqual(response.status_code, 404)
+            stats.reset_mock()
+            response = self.client.get(self.url, {"search": "adam"})
+        stats.assert_not_called()
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response["X-Count-Exact"], "true")
+
+    @override_settings(COMPANY_RESPONSE_CACHE={"ENABLED": True})
+    def test_count_header_is_cached_with_the_response(self):
+        with patch("company.pagination.table_rows", return_value=25000):
+            self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.data["count"], 25000)
+        self.assertEqual(response["X-Count-Exact"], "false")
+
+
+class EmployeeSearchTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = make_department()
+        cls.john_smith = make_employee(department, "John", "Smith")
+        cls.john_smithers = make_employee(department, "John", "Smithers")
+        cls.smith_john = make_employee(department, "Smith", "Johnson")
+        cls.mary_jones = make_employee(department, "Mary Ann", "Jones")
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse("employees-list")
+
+    def search(self, query):
+        response = self.client.get(self.url, {"search": query})
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_full_name_prefix_query_is_ranked(self):
+        self.assertEqual(
+            self.search("john smi"),
+            [self.john_smith.pk, self.john_smithers.pk, self.smith_john.pk],
+        )
+
+    def test_exact_full_name_ranks_first(self):
+        self.assertEqual(self.search("John Smith")[0], self.john_smith.pk)
+
+    def test_multi_word_first_name(self):
+        self.assertEqual(self.search("ann jon"), [self.mary_jones.pk])
+
+    def test_no_match(self):
+        self.assertEqual(self.search("zed"), [])
+
+    def test_prefix_ending_in_z(self):
+        lizzy = make_employee(self.john_smith.department, "Lizzy", "Ortiz")
+        self.assertEqual(self.search("liz"), [lizzy.pk])
+        self.assertEqual(self.search("ortiz"), [lizzy.pk])
+
+    def test_index_follows_renames_and_deletes(self):
+        self.mary_jones.last_name = "Brown"
+        self.mary_jones.save()
+        self.assertEqual(self.search("jones"), [])
+        self.assertEqual(self.search("mary brown"), [self.mary_jones.pk])
+
+        self.mary_jones.delete()
+        self.assertEqual(self.search("mary"), [])
+
+
+class EmployeeDepartmentFilterTests(CompanyTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse("employees-list")
+        department_choices.invalidate()
+
+    def test_department_created_through_the_api_is_accepted(self):
+        self.client.get(self.url)
+        response = self.client.post(reverse("departments-list"), {"name": "Sales"})
+        department = Department.objects.get(pk=response.data["id"])
+        employee = make_employee(department)
+
+        response = self.client.get(self.url, {"department": department.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.data["results"]], [employee.pk])
+
+    def test_department_created_elsewhere_is_accepted(self):
+        self.client.get(self.url, {"department": 0})
+        department = make_department()
+        response = self.client.get(self.url, {"department": department.pk})
+        self.assertEqual(response.status_code, 200)
+
+    def test_cached_choices_cost_no_query(self):
+        department = make_department()
+        department_choices()
+        with self.assertNumQueries(0):
+            form = EmployeeFilter({"department": [department.pk]}).form
+            self.assertTrue(form.is_valid())
+
+    def test_unknown_department_is_rejected(self):
+        response = self.client.get(self.url, {"department": 999})
+        self.assertEqual(response.status_code, 400)
+
+
+class EmployeeQueryShapeTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department()
+        cls.employee = make_employee(cls.department)
+        make_employee(cls.department, "Jane", "Doe")
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def capture(self, method, url, data=None, expected=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 300)
+        # Savepoints depend on the backend, not on the action.
+        queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if not is_savepoint(query["sql"])
+        ]
+        self.assertEqual(len(queries), expected, "\n".join(queries))
+        return queries
+
+    def test_list(self):
+        count, page = self.capture("get", reverse("employees-list"), expected=2)
+        self.assertNotIn("GROUP BY", count)
+        self.assertNotIn("company_dependent", count)
+        self.assertNotIn("company_department", count)
+        self.assertNotIn("GROUP BY", page)
+        self.assertNotIn("company_dependent", page)
+        self.assertNotIn(quoted("company_employee", "salary"), page)
+        self.assertNotIn(quoted("company_employee", "birth_date"), page)
+        self.assertIn(quoted("company_department", "name"), page)
+
+    def test_retrieve(self):
+        url = reverse("employees-detail", args=[self.employee.pk])
+        (query,) = self.capture("get", url, expected=1)
+        self.assertNotIn("GROUP BY", query)
+        self.assertNotIn("company_dependent", query)
+        self.assertIn(quoted("company_employee", "salary"), query)
+        self.assertIn(quoted("company_employee", "dependents_count"), query)
+        self.assertNotIn(quoted("company_department", "manager_id"), query)
+
+    def test_update(self):
+        url = reverse("employees-detail", args=[self.employee.pk])
+        data = {
+            "first_name": "John",
+            "last_name": "Smith",
+            "gender": "m",
+            "birth_date": "1990-01-01",
+            "email": "john.smith@example.com",
+            "salary": 1200,
+            "department": self.department.name,
+        }
+        # Lookup, unique email check, department by name, update, the
+        # search index refresh (delete, insert) and the department summary.
+        queries = self.capture("put", url, data, expected=7)
+        self.assertFalse(any("GROUP BY" in query for query in queries))
+        self.assertNotIn("JOIN", queries[0])
+
+    def test_destroy_lookup(self):
+        url = reverse("employees-detail", args=[self.employee.pk])
+        # Lookup, managed departments, dependents (fetched for their signals),
+        # search terms, the delete itself and the department summary.
+        queries = self.capture("delete", url, expected=6)
+        self.assertNotIn("GROUP BY", queries[0])
+        self.assertNotIn("JOIN", queries[0])
+
+
+class DependentCounterTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department()
+        cls.employee = make_employee(cls.department)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse("employee-dependents-list", args=[self.employee.pk])
+
+    def add(self, relationship, name="Dependent"):
+        return self.client.post(
+            self.url,
+            {"name": name, "birth_date": "2000-01-01", "relationship": relationship},
+        )
+
+    def assertCounters(self, dependents, wives, husbands=0):
+        self.employee.refresh_from_db()
+        self.assertEqual(
+            (
+                self.employee.dependents_count,
+                self.employee.wives_count,
+                self.employee.husbands_count,
+            ),
+            (dependents, wives, husbands),
+        )
+
+    def test_counters_follow_create_update_and_delete(self):
+        self.add("wife")
+        son = self.add("son").data
+        self.assertCounters(2, 1)
+
+        url = reverse("employee-dependents-detail", args=[self.employee.pk, son["id"]])
+        self.client.patch(url, {"relationship": "wife"})
+        self.assertCounters(2, 2)
+
+        self.client.delete(url)
+        self.assertCounters(1, 1)
+
+    def test_missing_employee_is_not_found(self):
+        url = reverse("employee-dependents-list", args=[self.employee.pk + 100])
+        response = self.client.post(
+            url, {"name": "Son", "birth_date": "2000-01-01", "relationship": "son"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_wife_limit_uses_counters(self):
+        for _ in range(4):
+            self.assertEqual(self.add("wife").status_code, 201)
+        self.assertEqual(self.add("wife").status_code, 400)
+        self.assertCounters(4, 4)
+
+    def test_renaming_a_wife_at_the_limit_is_allowed(self):
+        wives = [self.add("wife").data for _ in range(4)]
+        url = reverse(
+            "employee-dependents-detail", args=[self.employee.pk, wives[0]["id"]]
+        )
+        response = self.client.patch(url, {"name": "Renamed"})
+        self.assertEqual(response.status_code, 200)
+        self.assertCounters(4, 4)
+
+    def test_update_rereads_the_relationship_under_the_lock(self):
+        wives = [self.add("wife").data for _ in range(4)]
+        stale = Dependent.objects.get(pk=wives[0]["id"])
+        changed = Dependent.objects.get(pk=stale.pk)
+        changed.relationship = "son"
+        changed.save()
+        self.assertCounters(4, 3)
+
+        serializer = DependentUpdateSerializer(
+            stale,
+            data={"relationship": "wife"},
+            partial=True,
+            context={"employee_id": self.employee.pk},
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertCounters(4, 4)
+
+    def test_retrieve_reads_the_counter(self):
+        self.add("son")
+        url = reverse("employees-detail", args=[self.employee.pk])
+        self.assertEqual(self.client.get(url).data["dependents_count"], 1)
+
+    def test_saving_an_employee_keeps_newer_counters(self):
+        stale = Employee.objects.get(pk=self.employee.pk)
+        self.add("wife")
+        stale.salary = "2000.00"
+        stale.save()
+        self.assertCounters(1, 1)
+        response = self.client.put(
+            reverse("employees-detail", args=[self.employee.pk]),
+            {
+                "first_name": "John",
+                "last_name": "Smith",
+                "gender": "m",
+                "email": self.employee.email,
+                "birth_date": "1990-01-01",
+                "salary": 3000,
+                "department": self.department.name,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertCounters(1, 1)
+
+    def test_rebuild_command_repairs_drift(self):
+        self.add("wife")
+        Employee.objects.filter(pk=self.employee.pk).update(
+            dependents_count=7, wives_count=0
+        )
+        with self.assertRaises(CommandError):
+            call_command("rebuild_dependent_counters", "--verify", stdout=StringIO())
+
+        call_command("rebuild_dependent_counters", stdout=StringIO())
+        self.assertCounters(1, 1)
+        call_command("rebuild_dependent_counters", "--verify", stdout=StringIO())
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class DependentConcurrencyTests(TransactionTestCase):
+    workers = 8
+
+    def post_concurrently(self, employee, relationship, attempts):
+        url = reverse("employee-dependents-list", args=[employee.pk])
+        data = {"name": "Spouse", "birth_date": "2000-01-01"}
+
+        def post(_):
+            try:
+                return APIClient().post(url, {**data, "relationship": relationship})
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return [r.status_code for r in executor.map(post, range(attempts))]
+
+    def test_wife_limit_holds_under_concurrency(self):
+        employee = make_employee(make_department())
+        statuses = self.post_concurrently(employee, "wife", attempts=20)
+
+        self.assertEqual(statuses.count(201), 4)
+        self.assertEqual(statuses.count(400), 16)
+        self.assertEqual(employee.dependents.filter(relationship="wife").count(), 4)
+        employee.refresh_from_db()
+        self.assertEqual((employee.wives_count, employee.dependents_count), (4, 4))
+
+    def test_husband_limit_holds_under_concurrency(self):
+        employee = make_employee(
+            make_department(), gender=Employee.GENDER_CHOICE_FEMALE
+        )
+        statuses = self.post_concurrently(employee, "husband", attempts=10)
+
+        self.assertEqual(statuses.count(201), 1)
+        self.assertEqual(employee.dependents.count(), 1)
+        employee.refresh_from_db()
+        self.assertEqual(employee.husbands_count, 1)
+
+
+class EmployeeBulkTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.research = make_department("Research")
+        cls.sales = make_department("Sales")
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse("employees-bulk")
+
+    def row(self, index, department="Research", **kwargs):
+        return {
+            "first_name": f"First{index}",
+            "last_name": "Bulk",
+            "gender": "m",
+            "birth_date": "1990-01-01",
+            "email": f"bulk{index}@example.com",
+            "salary": 1000,
+            "department": department,
+            **kwargs,
+        }
+
+    def test_create_resolves_departments_in_one_query(self):
+        rows = [self.row(i, "Research" if i % 2 else "Sales") for i in range(20)]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url + "?chunk_size=7", rows, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["succeeded"]), 20)
+        department_queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith(f"SELECT {quoted('company_department')}")
+        ]
+        self.assertEqual(len(department_queries), 1)
+        self.assertEqual(self.sales.employees.count(), 10)
+        # Bulk inserts skip post_save, so the writer indexes names itself.
+        search = self.client.get(reverse("employees-list"), {"search": "first19"})
+        self.assertEqual(
+            [row["id"] for row in search.data["results"]],
+            [response.data["succeeded"][19]["id"]],
+        )
+
+    def test_create_reports_per_row_errors(self):
+        make_employee(self.research, email="taken@example.com")
+        rows = [
+            self.row(0),
+            self.row(1, department="Nowhere"),
+            self.row(2, email="taken@example.com"),
+            self.row(3, email="bulk0@example.com"),
+            self.row(4, gender="x"),
+        ]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([row["index"] for row in response.data["succeeded"]], [0])
+        errors = {row["index"]: row["errors"] for row in response.data["errors"]}
+        self.assertEqual(set(errors), {1, 2, 3, 4})
+        self.assertIn("department", errors[1])
+        self.assertIn("email", errors[2])
+        self.assertIn("email", errors[3])
+        self.assertIn("gender", errors[4])
+
+    def test_atomic_batch_writes_nothing_on_error(self):
+        rows = [self.row(0), self.row(1, department="Nowhere")]
+        response = self.client.post(self.url + "?atomic=true", rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Employee.objects.exists())
+
+    def test_create_rejects_ids(self):
+        taken = make_employee(self.research)
+        rows = [self.row(0, id=taken.pk), self.row(1, id=taken.pk + 100)]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [row["errors"] for row in response.data["errors"]],
+            [{"id": ["Ids are assigned on create."]}] * 2,
+        )
+        self.assertEqual(Employee.objects.count(), 1)
+
+    def test_failed_chunks_do_not_expose_database_errors(self):
+        rows = [self.row(i) for i in range(3)]
+        with patch.object(
+            Employee.objects, "bulk_create", side_effect=IntegrityError("secret")
+        ):
+            response = self.client.post(self.url + "?chunk_size=2", rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [row["errors"] for row in response.data["errors"]],
+            [["Could not be written with its chunk; retry the row."]] * 3,
+        )
+
+    def test_update_rejects_duplicate_ids(self):
+        first = make_employee(self.research)
+        second = make_employee(self.research, "Jane", "Doe")
+        rows = [
+            self.row(0, id=first.pk),
+            self.row(1, id=second.pk, salary=2000),
+            self.row(2, id=first.pk),
+        ]
+        for params in ["", "?atomic=true"]:
+            with self.subTest(params):
+                response = self.client.put(self.url + params, rows, format="json")
+                self.assertEqual(
+                    response.data["errors"],
+                    [{"index": 2, "errors": {"id": ["Duplicate id in batch."]}}],
+                )
+        second.refresh_from_db()
+        self.assertEqual(second.salary, 2000)
+
+    def test_create_from_ndjson(self):
+        body = "\n".join(json.dumps(self.row(i)) for i in range(3)) + "\n"
+        response = self.client.post(self.url, body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Employee.objects.count(), 3)
+
+    def test_update_and_delete(self):
+        first = make_employee(self.research)
+        second = make_employee(self.research, "Jane", "Doe")
+        rows = [
+            self.row(0, id=first.pk, department="Sales", salary=2000),
+            self.row(1, id=0),
+        ]
+        response = self.client.put(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 207)
+        first.refresh_from_db()
+        self.assertEqual((first.department, first.salary), (self.sales, 2000))
+
+        response = self.client.delete(self.url, [first.pk, second.pk, 0], format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            response.data["errors"], [{"index": 2, "errors": ["Not found."]}]
+        )
+        self.assertFalse(Employee.objects.exists())
+
+
+class DependentBulkTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.research = make_department("Research")
+        cls.sales = make_department("Sales")
+        cls.man = make_employee(cls.research)
+        cls.woman = make_employee(
+            cls.sales, "Jane", "Doe", gender=Employee.GENDER_CHOICE_FEMALE
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse("dependents-bulk")
+
+    def nested_url(self, employee):
+        return reverse("employee-dependents-bulk", args=[employee.pk])
+
+    def row(self, relationship="son", **kwargs):
+        return {
+            "name": "Child",
+            "birth_date": "2015-01-01",
+            "relationship": relationship,
+            **kwargs,
+        }
+
+    def test_nested_create_checks_rows_against_each_other(self):
+        rows = [self.row("wife") for _ in range(5)] + [self.row(), self.row("husband")]
+        response = self.client.post(self.nested_url(self.man), rows, format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [row["index"] for row in response.data["succeeded"]], [0, 1, 2, 3, 5]
+        )
+        self.assertEqual([row["index"] for row in response.data["errors"]], [4, 6])
+        self.assertEqual(
+            sorted(self.man.dependents.values_list("pk", flat=True)),
+            [row["id"] for row in response.data["succeeded"]],
+        )
+        self.man.refresh_from_db()
+        self.assertEqual((self.man.dependents_count, self.man.wives_count), (5, 4))
+        self.assertEqual(
+            set(
+                self.man.dependents.filter(relationship="wife").values_list(
+                    "gender", flat=True
+                )
+            ),
+            {Dependent.GENDER_CHOICE_FEMALE},
+        )
+
+    def test_create_for_many_employees_in_constant_queries(self):
+        rows = [
+            self.row("husband", employee=self.woman.pk),
+            self.row("wife", employee=self.woman.pk),
+            self.row("daughter", employee=self.man.pk),
+            self.row(employee=0),
+            self.row(),
+            self.row("cousin", employee=self.man.pk),
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 207)
+        employee_queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith(f"SELECT {quoted('company_employee')}")
+        ]
+        self.assertEqual(len(employee_queries), 1)
+        self.assertEqual([row["index"] for row in response.data["succeeded"]], [0, 2])
+        errors = {row["index"]: row["errors"] for row in response.data["errors"]}
+        self.assertEqual(set(errors), {1, 3, 4, 5})
+        self.assertIn("relationship", errors[1])
+        self.assertEqual(errors[3], {"employee": ["Not found."]})
+        self.assertEqual(errors[4], {"employee": ["This field is required."]})
+        self.assertIn("relationship", errors[5])
+
+        self.woman.refresh_from_db()
+        self.assertEqual(
+            (self.woman.dependents_count, self.woman.husbands_count), (1, 1)
+        )
+        totals = dict(
+            DepartmentSummary.objects.values_list("department", "dependents_total")
+        )
+        self.assertEqual(totals, {self.research.pk: 1, self.sales.pk: 1})
+
+    def test_nested_rows_cannot_name_another_employee(self):
+        rows = [self.row(employee=self.woman.pk), self.row(employee=self.man.pk)]
+        response = self.client.post(self.nested_url(self.man), rows, format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            response.data["errors"],
+            [{"index": 0, "errors": {"employee": ["Does not match the URL."]}}],
+        )
+
+    def test_unknown_nested_employee_is_not_found(self):
+        url = reverse("employee-dependents-bulk", args=[0])
+        response = self.client.post(url, [self.row()], format="json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_atomic_batch_writes_nothing_on_error(self):
+        rows = [self.row(), self.row("husband")]
+        url = self.nested_url(self.man) + "?atomic=true"
+        response = self.client.post(url, rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Dependent.objects.exists())
+        self.man.refresh_from_db()
+        self.assertEqual(self.man.dependents_count, 0)
+
+    def test_create_invalidates_cached_reads(self):
+        url = reverse("employee-dependents-list", args=[self.man.pk])
+        self.assertEqual(len(self.client.get(url).data), 0)
+        response = self.client.post(
+            self.nested_url(self.man), [self.row(), self.row()], format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.client.get(url).data), 2)
+
+
+class EmployeeExportTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.research = make_department("Research")
+        cls.sales = make_department("Sales")
+        for index, name in enumerate(["Eve", "Adam", "Carl", "Adam", "Bob"]):
+            make_employee(cls.sales if index % 2 else cls.research, first_name=name)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse("employees-export")
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_matches_list_serializer_in_small_chunks(self):
+        with patch.object(EmployeeViewSet, "export_chunk_size", 2):
+            lines = self.export(ordering="first_name").splitlines()
+        expected = self.client.get(
+            reverse("employees-list"), {"ordering": "first_name", "page_size": 100}
+        ).data["results"]
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    def test_csv_honors_filters(self):
+        rows = list(
+            csv.reader(self.export(output="csv", department=self.sales.pk).splitlines())
+        )
+        self.assertEqual(
+            rows[0], ["id", "first_name", "last_name", "gender", "email", "department"]
+        )
+        self.assertEqual({row[5] for row in rows[1:]}, {"Sales"})
+        self.assertEqual(len(rows), 3)
+
+    def test_search_order_is_kept(self):
+        make_employee(self.research, "Adamson", "Smith")
+        lines = self.export(search="adam").splitlines()
+        self.assertEqual(
+            [json.loads(line)["first_name"] for line in lines],
+            ["Adam", "Adam", "Adamson"],
+        )
+
+    def test_unknown_output(self):
+        self.assertEqual(self.client.get(self.url, {"output": "xml"}).status_code, 400)
+
+
+@override_settings(COMPANY_RESPONSE_CACHE={"ENABLED": True})
+class ResponseCacheTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department()
+        cls.employee = make_employee(cls.department)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        response_cache.stats.clear()
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_repeated_reads_are_served_from_cache(self):
+        url = reverse("departments-list")
+        self.assertEqual(self.get(url)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(url)["X-Cache"], "HIT")
+        self.assertEqual(self.get(url, {"x": 1})["X-Cache"], "MISS")
+        self.assertEqual(response_cache.stats, {"hits": 1, "misses": 2})
+
+    @override_settings(ALLOWED_HOSTS=["internal.svc", "api.example.com"])
+    def test_hosts_do_not_share_pagination_links(self):
+        make_employee(self.department)
+        url = reverse("employees-list")
+        for host in ["internal.svc", "api.example.com"]:
+            with self.subTest(host):
+                response = self.client.get(url, {"page_size": 1}, HTTP_HOST=host)
+                self.assertEqual(response["X-Cache"], "MISS")
+                self.assertTrue(response.data["next"].startswith(f"http://{host}/"))
+
+    def test_department_rename_invalidates_employee_payloads(self):
+        url = reverse("employees-detail", args=[self.employee.pk])
+        self.get(url)
+        self.client.put(
+            reverse("departments-detail", args=[self.department.pk]),
+            {"name": "Renamed"},
+        )
+        response = self.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["department"], "Renamed")
+
+    def test_new_dependent_invalidates_employee_and_dependent_payloads(self):
+        employee_url = reverse("employees-detail", args=[self.employee.pk])
+        dependents_url = reverse("employee-dependents-list", args=[self.employee.pk])
+        self.get(employee_url)
+        self.get(dependents_url)
+        self.client.post(
+            dependents_url,
+            {"name": "Son", "birth_date": "2010-01-01", "relationship": "son"},
+        )
+        self.assertEqual(self.get(employee_url).data["dependents_count"], 1)
+        self.assertEqual(len(self.get(dependents_url).data), 1)
+
+    def test_bulk_writes_invalidate_employee_list(self):
+        url = reverse("employees-list")
+        self.assertEqual(self.get(url).data["count"], 1)
+        row = {
+            "first_name": "Bulk",
+            "last_name": "Row",
+            "gender": "f",
+            "birth_date": "1990-01-01",
+            "email": "bulk@example.com",
+            "salary": 1000,
+            "department": self.department.name,
+        }
+        self.client.post(reverse("employees-bulk"), [row], format="json")
+        self.assertEqual(self.get(url).data["count"], 2)
+
+    @override_settings(COMPANY_RESPONSE_CACHE={"ENABLED": False})
+    def test_can_be_disabled(self):
+        url = reverse("departments-list")
+        self.get(url)
+        self.assertNotIn("X-Cache", self.get(url))
+
+
+class ConditionalGetTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department()
+        cls.employee = make_employee(cls.department)
+        cls.other = make_employee(cls.department, "Jane", "Doe")
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_list_returns_304_for_matching_etag_without_queries(self):
+        url = reverse("employees-list")
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        for header in [etag[:-2], '"x"', "garbage", ""]:
+            with self.subTest(header):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_changes_with_data(self):
+        url = reverse("departments-list")
+        etag = self.client.get(url)["ETag"]
+        make_department("Sales")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_write_during_render_does_not_validate_the_old_body(self):
+        url = reverse("departments-list")
+        list_departments = CachedResponseMixin.list
+
+        def list_then_write(viewset, request, *args, **kwargs):
+            response = list_departments(viewset, request, *args, **kwargs)
+            make_department("Sales")
+            return response
+
+        with patch.object(CachedResponseMixin, "list", list_then_write):
+            stale = self.client.get(url)
+        self.assertNotIn("Sales", str(stale.data))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=stale["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Sales", str(response.data))
+
+    def test_retrieve_etag_follows_the_row(self):
+        url = reverse("employees-detail", args=[self.employee.pk])
+        etag = self.client.get(url)["ETag"]
+
+        self.other.salary = 5000
+        self.other.save()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.employee.salary = 5000
+        self.employee.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_retrieve_etag_follows_dependents(self):
+        url = reverse("employees-detail", args=[self.employee.pk])
+        etag = self.client.get(url)["ETag"]
+        Dependent.objects.create(
+            employee=self.employee,
+            name="Son",
+            gender="m",
+            birth_date=date(2010, 1, 1),
+            relationship="son",
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        url = reverse("departments-detail", args=[self.department.pk])
+        last_modified = self.client.get(url)["Last-Modified"]
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE="Thu, 01 Jan 1970 00:00:00 GMT"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_object_is_still_404(self):
+        url = reverse("employees-detail", args=[0])
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH='"x"').status_code, 404
+        )
+
+
+# Responses are compared uncached, so both paths render them.
+@override_settings(COMPANY_RESPONSE_CACHE={"ENABLED": False})
+class AsyncReadTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department()
+        cls.other_department = make_department("Sales")
+        cls.department.manager = make_employee(cls.department, "Eve", "Adams")
+        cls.department.save()
+        for first_name in ["Adam", "Carl", "Bob", "Dana"]:
+            make_employee(cls.department, first_name=first_name)
+        make_employee(cls.other_department, "Jane", "Doe")
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def async_get(self, path, data=None, **kwargs):
+        request = AsyncRequestFactory().get(path, data, **kwargs)
+        match = resolve(request.path)
+        view = AsyncReadView.wrap(match.func)
+        return async_to_sync(view)(request, *match.args, **match.kwargs)
+
+    def assertSameResponse(self, path, data=None):
+        expected = self.client.get(path, data)
+        with patch.object(AsyncReadView, "sync_fallback") as sync_fallback:
+            response = self.async_get(path, data)
+        sync_fallback.assert_not_called()
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+    def test_employee_list_matches_sync_view(self):
+        url = reverse("employees-list")
+        for params in [
+            {},
+            {"page": 2, "page_size": 2},
+            {"count": "false", "page_size": 2},
+            {"pagination": "cursor", "ordering": "first_name", "page_size": 2},
+            {"department": self.other_department.pk},
+            {"gender": "m", "search": "ada"},
+            {"page": 9},
+        ]:
+            with self.subTest(params=params):
+                self.assertSameResponse(url, params)
+
+    def test_department_reads_match_sync_view(self):
+        self.assertSameResponse(reverse("departments-list"))
+        self.assertSameResponse(
+            reverse("departments-detail", args=[self.department.pk])
+        )
+        self.assertSameResponse(reverse("departments-detail", args=[0]))
+
+    def test_employee_retrieve_matches_sync_view(self):
+        employee = self.department.manager
+        url = reverse("employees-detail", args=[employee.pk])
+        self.assertSameResponse(url)
+        self.assertSameResponse(reverse("employees-detail", args=[0]))
+
+    @override_settings(COMPANY_RESPONSE_CACHE={"ENABLED": True})
+    def test_cache_is_not_called_from_the_event_loop(self):
+        backend = response_cache.get_cache()
+
+        def off_the_loop(method):
+            def call(*args, **kwargs):
+                with self.assertRaises(RuntimeError, msg=method.__name__):
+                    asyncio.get_running_loop()
+                return method(*args, **kwargs)
+
+            return call
+
+        url = reverse("departments-detail", args=[self.department.pk])
+        for name in ["get", "get_many", "set", "add"]:
+            method = off_the_loop(getattr(backend, name))
+            patcher = patch.object(backend, name, method)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        response = self.async_get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(self.async_get(url)["X-Cache"], "HIT")
+        etag = response["ETag"]
+        response = self.async_get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_retrieve_queries(self):
+        url = reverse("departments-detail", args=[self.department.pk])
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        with self.assertNumQueries(1):
+            self.async_get(url)
+
+    def test_not_modified(self):
+        url = reverse("employees-list")
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.async_get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_other_requests_use_sync_view(self):
+        url = reverse("departments-list")
+        request = AsyncRequestFactory().post(
+            url, {"name": "Support"}, content_type="application/json"
+        )
+        view = AsyncReadView.wrap(resolve(url).func)
+        response = async_to_sync(view)(request)
+        self.assertEqual(response.status_code, 201)
+
+        response = self.async_get(url, {"format": "api"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/html", response["Content-Type"])
+
+    def test_routed_patterns_keep_their_api_endpoints(self):
+        def endpoints(patterns):
+            return {
+                (path, method)
+                for path, method, _ in EndpointEnumerator(patterns).get_api_endpoints()
+            }
+
+        routed = async_read_patterns(router_urls)
+        self.assertEqual(endpoints(routed), endpoints(router_urls))
+
+    def test_only_list_and_retrieve_patterns_are_routed(self):
+        routed = {
+            pattern.name
+            for pattern in async_read_patterns(router_urls)
+            if getattr(pattern.callback, "view_class", None) is AsyncReadView
+        }
+        self.assertEqual(
+            routed,
+            {
+                "employees-list",
+                "employees-detail",
+                "departments-list",
+                "departments-detail",
+            },
+        )
+
+
+class StatsTests(CompanyTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.research = make_department("Research")
+        self.sales = make_department("Sales")
+        self.empty = make_department("Support")
+        make_employee(self.research, salary="1000.00")
+        make_employee(
+            self.research,
+            "Jane",
+            salary="2000.50",
+            gender=Employee.GENDER_CHOICE_FEMALE,
+        )
+        make_employee(self.sales, "Jack", salary="3000.00")
+
+    def test_department_stats(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("departments-stats"))
+        self.assertEqual(response.status_code, 200)
+        research, sales, empty = response.json()["departments"]
+        self.assertEqual(
+            research,
+            {
+                "id": self.research.pk,
+                "name": "Research",
+                "headcount": 2,
+                "payroll": 3000.5,
+                "average_salary": 1500.25,
+                "min_salary": 1000.0,
+                "max_salary": 2000.5,
+                "male_count": 1,
+                "female_count": 1,
+            },
+        )
+        self.assertEqual(sales["payroll"], 3000.0)
+        self.assertEqual(empty["headcount"], 0)
+        self.assertIsNone(empty["average_salary"])
+        self.assertEqual(
+            response.json()["total"],
+            {
+                "headcount": 3,
+                "payroll": 6000.5,
+                "average_salary": 2000.17,
+                "min_salary": 1000.0,
+                "max_salary": 3000.0,
+                "male_count": 2,
+                "female_count": 1,
+            },
+        )
+
+    def test_employee_stats_respect_filters(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("employees-stats"), {"gender": "m", "ordering": "first_name"}
+            )
+        departments = response.json()["departments"]
+        self.assertEqual([row["name"] for row in departments], ["Research", "Sales"])
+        self.assertEqual([row["headcount"] for row in departments], [1, 1])
+        self.assertEqual(response.json()["total"]["payroll"], 4000.0)
+
+    @override_settings(COMPANY_RESPONSE_CACHE={"ENABLED": True})
+    def test_stats_are_cached_until_employees_change(self):
+        url = reverse("employees-stats")
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+        make_employee(self.sales, "Jill", salary="500.00")
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["total"]["min_salary"], 500.0)
+
+
+class DepartmentSummaryTests(CompanyTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.research = make_department("Research")
+        self.sales = make_department("Sales")
+        self.employee = make_employee(self.research, salary="1000.00")
+        make_employee(self.research, "Jane", salary="2000.00")
+        Dependent.objects.create(
+            employee=self.employee,
+            name="Son",
+            gender="m",
+            birth_date=date(2010, 1, 1),
+            relationship="son",
+        )
+
+    def summary(self, department):
+        summary = DepartmentSummary.objects.get(department=department)
+        return summary.headcount, summary.salary_sum, summary.dependents_total
+
+    def test_summary_follows_employees_and_dependents(self):
+        self.assertEqual(self.summary(self.research), (2, Decimal("3000.00"), 1))
+        self.assertEqual(self.summary(self.sales), (0, 0, 0))
+
+        employee = Employee.objects.get(pk=self.employee.pk)
+        employee.department = self.sales
+        employee.salary = Decimal("1500.00")
+        employee.save()
+        self.assertEqual(self.summary(self.research), (1, Decimal("2000.00"), 0))
+        self.assertEqual(self.summary(self.sales), (1, Decimal("1500.00"), 1))
+
+        employee.dependents.get().delete()
+        self.assertEqual(self.summary(self.sales), (1, Decimal("1500.00"), 0))
+        Employee.objects.get(pk=self.employee.pk).delete()
+        self.assertEqual(self.summary(self.sales), (0, 0, 0))
+
+    def test_employee_delete_removes_its_dependents(self):
+        Employee.objects.get(pk=self.employee.pk).delete()
+        self.assertEqual(self.summary(self.research), (1, Decimal("2000.00"), 0))
+
+    def test_bulk_writes_update_summaries(self):
+        url = reverse("employees-bulk")
+        row = {
+            "first_name": "Jack",
+            "last_name": "Black",
+            "gender": "m",
+            "birth_date": "1990-01-01",
+            "email": "jack@example.com",
+            "salary": "700.00",
+            "department": "Sales",
+        }
+        self.client.post(url, [row], format="json")
+        self.assertEqual(self.summary(self.sales), (1, Decimal("700.00"), 0))
+
+        row["id"] = Employee.objects.get(email="jack@example.com").pk
+        row["department"] = "Research"
+        self.client.put(url, [row], format="json")
+        self.assertEqual(self.summary(self.sales), (0, 0, 0))
+        self.assertEqual(self.summary(self.research), (3, Decimal("3700.00"), 1))
+
+        # Deleted rows are summarized together, once per department.
+        self.client.delete(url, [row["id"], self.employee.pk], format="json")
+        self.assertEqual(self.summary(self.research), (1, Decimal("2000.00"), 0))
+
+    def test_list_embeds_summary_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("departments-list"))
+        self.assertEqual(
+            response.json()[0],
+            {
+                "id": self.research.pk,
+                "name": "Research",
+                "headcount": 2,
+                "salary_sum": 3000.0,
+                "dependents_total": 1,
+            },
+        )
+
+    def test_reconcile_command(self):
+        DepartmentSummary.objects.filter(department=self.research).update(headcount=7)
+        DepartmentSummary.objects.filter(department=self.sales).delete()
+        with self.assertRaises(CommandError):
+            call_command(
+                "reconcile_department_summaries", verify=True, stdout=StringIO()
+            )
+
+        call_command("reconcile_department_summaries", stdout=StringIO())
+        self.assertEqual(self.summary(self.research), (2, Decimal("3000.00"), 1))
+        self.assertEqual(self.summary(self.sales), (0, 0, 0))
+        call_command("reconcile_department_summaries", verify=True, stdout=StringIO())
+
+
+@override_settings(COMPANY_SCHEMA={"DIRECTORY": "/nonexistent/openapi"})
+@override_settings(COMPANY_RESPONSE_CACHE={"ENABLED": False})
+class QueryPlanTests(CompanyTestCase):
+    """
+    Explains every SELECT of the hot read paths and fails on full table
+    scans and on sorts that no index serves.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department()
+        for first_name in ["Eve", "Adam", "Carl"]:
+            cls.employee = make_employee(cls.department, first_name=first_name)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        # Department choices are loaded once per process, not per request.
+        department_choices()
+
+    def assertIndexedPlans(self, url, params=None, allow=()):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        for sql, plan, problems in explain_queries(context.captured_queries):
+            unexpected = [problem for problem in problems if problem not in allow]
+            self.assertFalse(unexpected, f"{sql}\n{plan}")
+
+    def test_employee_list(self):
+        url = reverse("employees-list")
+        # Unordered pages stop scanning after the page.
+        self.assertIndexedPlans(url, allow=[("scan", "company_employee")])
+        for ordering in ["first_name", "-first_name", "last_name", "-last_name"]:
+            for params in [
+                {},
+                {"gender": "m"},
+                {"department": self.department.pk},
+                {"count": "false"},
+                {"pagination": "cursor"},
+            ]:
+                params = {**params, "ordering": ordering}
+                with self.subTest(params=params):
+                    self.assertIndexedPlans(url, params)
+
+    def test_employee_list_next_cursor(self):
+        url = reverse("employees-list")
+        params = {"pagination": "cursor", "ordering": "-last_name", "page_size": 1}
+        next_url = self.client.get(url, params).data["next"]
+        self.assertIndexedPlans(next_url)
+
+    def test_employee_search(self):
+        # Matches are ranked by relevance, which no index can provide.
+        self.assertIndexedPlans(
+            reverse("employees-list"), {"search": "ad"}, allow=[("sort", None)]
+        )
+
+    def test_retrieves(self):
+        self.assertIndexedPlans(reverse("employees-detail", args=[self.employee.pk]))
+        self.assertIndexedPlans(
+            reverse("departments-detail", args=[self.department.pk])
+        )
+        self.assertIndexedPlans(
+            reverse("employee-dependents-list", args=[self.employee.pk])
+        )
+
+    def test_department_list(self):
+        # Departments are listed whole, unpaginated.
+        self.assertIndexedPlans(
+            reverse("departments-list"), allow=[("scan", "company_department")]
+        )
+
+
+@override_settings(COMPANY_RESPONSE_CACHE={"ENABLED": False})
+class QueryScalingTests(CompanyTestCase):
+    """
+    Runs every action of the company API against N and 10N rows and fails
+    when it runs more queries the second time, listing the queries that
+    grew and where they came from.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department()
+        cls.employee = make_employee(cls.department)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def assertConstantQueries(self, seed, action, n=3):
+        """
+        Call `seed(n)` and then `seed(9 * n)` and, after each, `action()`
+        with what `seed` returned. Seeds may add to the rows of earlier
+        calls, so reads see N and then 10N rows.
+        """
+        logs = []
+        for count in (n, 9 * n):
+            rows = seed(count)
+            with log_queries() as log:
+                action(rows)
+            logs.append(log)
+        small, large = logs
+        self.assertFalse(scaling_queries(small, large), describe_scaling(small, large))
+
+    def add_employees(self, count):
+        """Employees in departments of their own, with a dependent each."""
+        employees = []
+        for _ in range(count):
+            department = make_department(f"Team {Department.objects.count()}")
+            employee = make_employee(department)
+            self.add_dependents(employee, 1)
+            employees.append(employee)
+        return employees
+
+    def add_dependents(self, employee, count):
+        return [
+            Dependent.objects.create(
+                employee=employee,
+                name=f"Child {index}",
+                gender=Dependent.GENDER_CHOICE_MALE,
+                birth_date=date(2015, 1, 1),
+                relationship=Dependent.RELATIONSHIP_CHOICE_SON,
+            )
+            for index in range(count)
+        ]
+
+    def add_colleagues(self, count):
+        return [make_employee(self.department) for _ in range(count)]
+
+    def new_employee(self, count):
+        employee = make_employee(self.department)
+        self.add_dependents(employee, count)
+        return employee
+
+    def bulk_rows(self, count):
+        start = Employee.objects.count()
+        return [
+            {
+                "first_name": f"First{index}",
+                "last_name": "Bulk",
+                "gender": "m",
+                "birth_date": "1990-01-01",
+                "email": f"bulk{start + index}@example.com",
+                "salary": 1000,
+                "department": self.department.name,
+            }
+            for index in range(count)
+        ]
+
+    def dependent_rows(self, count):
+        return [
+            {
+                "name": f"Child {index}",
+                "birth_date": "2015-01-01",
+                "relationship": "son",
+            }
+            for index in range(count)
+        ]
+
+    def colleague_dependent_rows(self, count):
+        return [
+            {**row, "employee": colleague.pk}
+            for row, colleague in zip(
+                self.dependent_rows(count), self.add_colleagues(count)
+            )
+        ]
+
+    def request(self, method, url, data=None, expected=200, **params):
+        if params:
+            url = f"{url}?{urlencode(params)}"
+        response = getattr(self.client, method)(url, data, format="json")
+        self.assertEqual(response.status_code, expected, response)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    def employee_url(self, employee=None):
+        return reverse("employees-detail", args=[(employee or self.employee).pk])
+
+    def dependents_url(self):
+        return reverse("employee-dependents-list", args=[self.employee.pk])
+
+    def dependent_url(self, dependent):
+        return reverse(
+            "employee-dependents-detail", args=[self.employee.pk, dependent.pk]
+        )
+
+    def list_employees(self, rows):
+        url = reverse("employees-list")
+        for params in [
+            {},
+            {"count": "false"},
+            {"pagination": "cursor"},
+            {"search": "john"},
+            {"gender": "m", "ordering": "-last_name"},
+            {"department": self.department.pk},
+        ]:
+            self.request("get", url, page_size=100, **params)
+
+    def bulk_employees(self, rows):
+        url = reverse("employees-bulk")
+        created = self.request("post", url, rows, expected=201).data["succeeded"]
+        ids = [row["id"] for row in created]
+        updated = [{**row, "id": pk, "salary": 2000} for row, pk in zip(rows, ids)]
+        self.request("put", url, updated)
+        self.request("delete", url, ids)
+
+    def employee_payload(self, rows):
+        return {
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "gender": "f",
+            "birth_date": "1990-01-01",
+            "email": f"jane{Employee.objects.count()}@example.com",
+            "salary": 1000,
+            "department": self.department.name,
+        }
+
+    def cases(self):
+        """`METHOD ViewSet.action`: (seed, action) for the whole API."""
+        employees = reverse("employees-list")
+        departments = reverse("departments-list")
+        department = reverse("departments-detail", args=[self.department.pk])
+        return {
+            "GET EmployeeViewSet.list": (self.add_employees, self.list_employees),
+            "GET EmployeeViewSet.retrieve": (
+                lambda count: self.add_dependents(self.employee, count),
+                lambda rows: self.request("get", self.employee_url()),
+            ),
+            "POST EmployeeViewSet.create": (
+                self.add_employees,
+                lambda rows: self.request(
+                    "post", employees, self.employee_payload(rows), expected=201
+                ),
+            ),
+            "PUT EmployeeViewSet.update": (
+                lambda count: self.add_dependents(self.employee, count),
+                lambda rows: self.request(
+                    "put", self.employee_url(), self.employee_payload(rows)
+                ),
+            ),
+            "DELETE EmployeeViewSet.destroy": (
+                self.new_employee,
+                lambda employee: self.request(
+                    "delete", self.employee_url(employee), expected=204
+                ),
+            ),
+            "GET EmployeeViewSet.export": (
+                self.add_employees,
+                lambda rows: self.request("get", reverse("employees-export")),
+            ),
+            "GET EmployeeViewSet.stats": (
+                self.add_employees,
+                lambda rows: self.request("get", reverse("employees-stats")),
+            ),
+            "POST EmployeeViewSet.bulk": (self.bulk_rows, self.bulk_employees),
+            "PUT EmployeeViewSet.bulk": (self.bulk_rows, self.bulk_employees),
+            "DELETE EmployeeViewSet.bulk": (self.bulk_rows, self.bulk_employees),
+            "GET DepartmentViewSet.list": (
+                self.add_employees,
+                lambda rows: self.request("get", departments),
+            ),
+            "GET DepartmentViewSet.retrieve": (
+                self.add_colleagues,
+                lambda rows: self.request("get", department),
+            ),
+            "POST DepartmentViewSet.create": (
+                self.add_employees,
+                lambda rows: self.request(
+                    "post",
+                    departments,
+                    {"name": f"New {Department.objects.count()}"},
+                    expected=201,
+                ),
+            ),
+            "PUT DepartmentViewSet.update": (
+                self.add_colleagues,
+                lambda rows: self.request(
+                    "put", department, {"name": "Research", "manager": rows[-1].pk}
+                ),
+            ),
+            "DELETE DepartmentViewSet.destroy": (
+                self.add_employees,
+                lambda rows: self.request(
+                    "delete",
+                    reverse("departments-detail", args=[make_department("Empty").pk]),
+                    expected=204,
+                ),
+            ),
+            "GET DepartmentViewSet.stats": (
+                self.add_employees,
+                lambda rows: self.request("get", reverse("departments-stats")),
+            ),
+            "GET DependentViewSet.list": (
+                lambda count: self.add_dependents(self.employee, count),
+                lambda rows: self.request("get", self.dependents_url()),
+            ),
+            "GET DependentViewSet.retrieve": (
+                lambda count: self.add_dependents(self.employee, count),
+                lambda rows: self.request("get", self.dependent_url(rows[-1])),
+            ),
+            "POST DependentViewSet.create": (
+                lambda count: self.add_dependents(self.employee, count),
+                lambda rows: self.request(
+                    "post",
+                    self.dependents_url(),
+                    {"name": "Tom", "birth_date": "2015-01-01", "relationship": "son"},
+                    expected=201,
+                ),
+            ),
+            "POST DependentViewSet.bulk": (
+                self.dependent_rows,
+                lambda rows: self.request(
+                    "post",
+                    reverse("employee-dependents-bulk", args=[self.employee.pk]),
+                    rows,
+                    expected=201,
+                ),
+            ),
+            "POST DependentBulkViewSet.bulk": (
+                self.colleague_dependent_rows,
+                lambda rows: self.request(
+                    "post", reverse("dependents-bulk"), rows, expected=201
+                ),
+            ),
+            "PATCH DependentViewSet.partial_update": (
+                lambda count: self.add_dependents(self.employee, count),
+                lambda rows: self.request(
+                    "patch", self.dependent_url(rows[-1]), {"relationship": "wife"}
+                ),
+            ),
+            "DELETE DependentViewSet.destroy": (
+                lambda count: self.add_dependents(self.employee, count),
+                lambda rows: self.request(
+                    "delete", self.dependent_url(rows[-1]), expected=204
+                ),
+            ),
+        }
+
+    def test_cases_cover_the_api(self):
+        self.assertEqual(set(self.cases()), routed_actions())
+
+    def test_queries_do_not_scale_with_rows(self):
+        for name, (seed, action) in self.cases().items():
+            with self.subTest(name), transaction.atomic():
+                self.assertConstantQueries(seed, action)
+                transaction.set_rollback(True)
+
+    def test_reports_scaling_queries(self):
+        def action(rows):
+            for employee in Employee.objects.all():
+                employee.department.name
+
+        with self.assertRaises(AssertionError) as context:
+            self.assertConstantQueries(self.add_employees, action)
+        message = str(context.exception)
+        self.assertIn(f"SELECT {quoted('company_department')}", message)
+        self.assertIn("employee.department.name", message)
+
+    def test_savepoints_share_a_shape(self):
+        for savepoint in ['"s1_x1"', '"s2_x7"', "`s1_x1`", "`s2_x7`"]:
+            with self.subTest(savepoint):
+                self.assertEqual(
+                    query_shape(f"RELEASE SAVEPOINT {savepoint}"),
+                    "RELEASE SAVEPOINT ...",
+                )
+
+
+class SyntheticDataTests(CompanyTestCase):
+    def generate(self, *args):
+        output = StringIO()
+        call_command("generate_company_data", *args, stdout=output)
+        return output.getvalue()
+
+    def test_generated_data_is_consistent(self):
+        output = self.generate(
+            "--departments=3", "--employees=60", "--max-dependents=6"
+        )
+        self.assertIn("Generated 60 employees", output)
+        self.assertEqual(Department.objects.count(), 3)
+        self.assertTrue(Dependent.objects.exists())
+        for gender, relationship in [("m", "husband"), ("f", "wife")]:
+            self.assertFalse(
+                Dependent.objects.filter(
+                    employee__gender=gender, relationship=relationship
+                ).exists()
+            )
+        self.assertFalse(Employee.objects.filter(wives_count__gt=4).exists())
+        self.assertFalse(Employee.objects.filter(husbands_count__gt=1).exists())
+        # Bulk inserts skip the signals that keep these in step.
+        call_command("rebuild_dependent_counters", "--verify", stdout=StringIO())
+        call_command("reconcile_department_summaries", "--verify", stdout=StringIO())
+        employee = Employee.objects.first()
+        response = APIClient().get(
+            reverse("employees-list"), {"search": employee.last_name}
+        )
+        self.assertIn(employee.pk, [row["id"] for row in response.data["results"]])
+
+    def test_seed_repeats_the_data(self):
+        self.generate("--employees=20", "--prefix=First", "--seed=7")
+        self.generate("--employees=20", "--prefix=Second", "--seed=7")
+        rows = [
+            list(
+                Employee.objects.filter(department__name__startswith=prefix)
+                .order_by("pk")
+                .values_list("first_name", "birth_date", "salary", "dependents_count")
+            )
+            for prefix in ["First", "Second"]
+        ]
+        self.assertEqual(rows[0], rows[1])
+
+
+@skipUnless(orjson, "orjson is not installed")
+class FastJSONTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department("R\u00e9search")
+        cls.employee = make_employee(
+            cls.department, "Line\u2028Break", salary="1234.50"
+        )
+        Dependent.objects.create(
+            employee=cls.employee,
+            name="J\u00fcrgen",
+            gender="m",
+            birth_date=date(2015, 3, 4),
+            relationship="son",
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def test_renders_the_same_bytes(self):
+        urls = [
+            reverse("employees-list"),
+            reverse("employees-detail", args=[self.employee.pk]),
+            reverse("employees-detail", args=[0]),
+            reverse("employees-stats"),
+            reverse("departments-list"),
+            reverse("departments-detail", args=[self.department.pk]),
+            reverse("employee-dependents-list", args=[self.employee.pk]),
+        ]
+        for url in urls:
+            with self.subTest(url):
+                with override_settings(COMPANY_FAST_JSON=False):
+                    expected = self.client.get(url).content
+                cache.clear()
+                with patch(
+                    "company.renderers.orjson.dumps", wraps=orjson.dumps
+                ) as dumps:
+                    self.assertEqual(self.client.get(url).content, expected)
+                dumps.assert_called_once()
+
+    def test_encodes_like_drf(self):
+        data = {
+            "salary": Decimal("1000.10"),
+            "at": datetime(2024, 1, 2, 3, 4, 5, 6000, tzinfo=dt_timezone.utc),
+            "day": date(2024, 1, 2),
+            "ids": (1, 2),
+            "name": "a\u2029b",
+        }
+        # Integers beyond 64 bits are left to the stdlib.
+        for value in [data, {"huge": 2**70}]:
+            self.assertEqual(
+                FastJSONRenderer().render(value), JSONRenderer().render(value)
+            )
+
+    def test_parses_like_drf(self):
+        for body in [b'{"salary": 1000.5, "name": "J\\u00fcrgen"}', b"[1, 2]"]:
+            self.assertEqual(
+                FastJSONParser().parse(BytesIO(body)),
+                JSONParser().parse(BytesIO(body)),
+            )
+        for body in [b'{"salary": NaN}', b'{"a": }']:
+            with self.assertRaises(ParseError) as fast:
+                FastJSONParser().parse(BytesIO(body))
+            with self.assertRaises(ParseError) as stdlib:
+                JSONParser().parse(BytesIO(body))
+            self.assertEqual(str(fast.exception), str(stdlib.exception))
+
+
+class SparseFieldsTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department()
+        cls.department.manager = make_employee(cls.department, "Eve", "Adams")
+        cls.department.save()
+        for first_name in ["Adam", "Bob", "Carl"]:
+            employee = make_employee(cls.department, first_name=first_name)
+            for name in ["Ann", "Ben"]:
+                Dependent.objects.create(
+                    employee=employee,
+                    name=name,
+                    gender="m",
+                    birth_date=date(2015, 1, 1),
+                    relationship="son",
+                )
+        cls.employee = employee
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        return response, [query["sql"] for query in context.captured_queries]
+
+    def test_fields_select_columns(self):
+        response, (count, page) = self.get(reverse("employees-list"), fields="id,email")
+        self.assertEqual(list(response.data["results"][0]), ["id", "email"])
+        self.assertNotIn(quoted("company_employee", "first_name"), page)
+        self.assertNotIn("company_department", page)
+
+        url = reverse("employees-detail", args=[self.employee.pk])
+        response, (query,) = self.get(url, fields="salary")
+        self.assertEqual(response.data, {"salary": Decimal("1000.00")})
+        self.assertNotIn(quoted("company_employee", "email"), query)
+        self.assertNotIn("company_department", query)
+
+    def test_expand_dependents_in_constant_queries(self):
+        url = reverse("employees-list")
+        response, queries = self.get(url, expand="dependents")
+        # The count, the page and one prefetch of every page's dependents.
+        self.assertEqual(len(queries), 3)
+        rows = {row["id"]: row for row in response.data["results"]}
+        row = rows[self.employee.pk]
+        self.assertEqual(
+            [dependent["name"] for dependent in row["dependents"]], ["Ann", "Ben"]
+        )
+        self.assertEqual(row["department"], "Research")
+        self.assertEqual(rows[self.department.manager_id]["dependents"], [])
+
+        detail = reverse("employees-detail", args=[self.employee.pk])
+        response, queries = self.get(detail, fields="id", expand="dependents")
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(list(response.data), ["id", "dependents"])
+
+    def test_expand_replaces_the_field(self):
+        url = reverse("employees-detail", args=[self.employee.pk])
+        response, (query,) = self.get(url, fields="email", expand="department")
+        self.assertEqual(
+            response.data,
+            {
+                "email": self.employee.email,
+                "department": {"id": self.department.pk, "name": "Research"},
+            },
+        )
+
+        url = reverse("departments-list")
+        response, (query,) = self.get(url, fields="name", expand="manager")
+        self.assertEqual(response.data[0]["manager"]["full_name"], "Eve Adams")
+        self.assertNotIn("company_departmentsummary", query)
+
+    def test_unknown_names_are_rejected(self):
+        url = reverse("employees-list")
+        for params, key in [
+            ({"fields": "id,password"}, "fields"),
+            ({"expand": "manager"}, "expand"),
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(key, response.data)
+
+    def test_expansions_follow_their_models(self):
+        # Listed employees do not otherwise depend on dependents.
+        url = reverse("employees-list")
+        params = {"expand": "dependents"}
+        etag = self.client.get(url, params)["ETag"]
+        Dependent.objects.filter(employee=self.employee).update(name="Cid")
+        response_cache.bump_generation(Dependent)
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        rows = {row["id"]: row for row in response.data["results"]}
+        self.assertEqual(rows[self.employee.pk]["dependents"][0]["name"], "Cid")
+
+    def test_async_view_matches_sync_view(self):
+        url = reverse("employees-list")
+        params = {"fields": "first_name", "expand": "dependents"}
+        expected = self.client.get(url, params)
+        request = AsyncRequestFactory().get(url, params)
+        match = resolve(request.path)
+        view = AsyncReadView.wrap(match.func)
+        response = async_to_sync(view)(request, *match.args, **match.kwargs)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+
+class ValuesReadTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department("R\u00e9search")
+        cls.department.manager = make_employee(cls.department, "Eve", "Adams")
+        cls.department.management_start_date = date(2020, 5, 1)
+        cls.department.save()
+        make_department("Empty")
+        for index, first_name in enumerate(["Adam", "Bob", "Carl", "Dana"]):
+            employee = make_employee(
+                cls.department,
+                first_name=first_name,
+                gender=Employee.GENDER_CHOICE_FEMALE,
+                salary=f"{1000 + index}.5",
+            )
+            Dependent.objects.create(
+                employee=employee,
+                name="Ann",
+                gender="f",
+                birth_date=date(2015, 1, 1),
+                relationship="daughter",
+            )
+        cls.employee = employee
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def get(self, url, params):
+        cache.clear()
+        return self.client.get(url, params)
+
+    def test_output_matches_model_serializers(self):
+        employee = reverse("employees-detail", args=[self.employee.pk])
+        department = reverse("departments-detail", args=[self.department.pk])
+        empty = Department.objects.get(name="Empty")
+        cases = [
+            (reverse("employees-list"), {}),
+            (reverse("employees-list"), {"page": 2, "page_size": 2}),
+            (reverse("employees-list"), {"count": "false", "fields": "id,salary"}),
+            (
+                reverse("employees-list"),
+                {"pagination": "cursor", "ordering": "-first_name", "page_size": 2},
+            ),
+            (reverse("employees-list"), {"expand": "department"}),
+            (employee, {}),
+            (employee, {"fields": "birth_date,department"}),
+            (reverse("employees-detail", args=[0]), {}),
+            (reverse("departments-list"), {}),
+            (reverse("departments-list"), {"expand": "manager"}),
+            (department, {}),
+            (department, {"fields": "manager"}),
+            (reverse("departments-detail", args=[empty.pk]), {}),
+        ]
+        for url, params in cases:
+            with self.subTest(url=url, params=params):
+                with override_settings(COMPANY_VALUES_READS=False):
+                    expected = self.get(url, params)
+                with patch.object(
+                    Employee, "from_db", wraps=Employee.from_db
+                ) as employees, patch.object(
+                    Department, "from_db", wraps=Department.from_db
+                ) as departments:
+                    response = self.get(url, params)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+                employees.assert_not_called()
+                departments.assert_not_called()
+
+    def test_next_cursor_reads_rows(self):
+        url = reverse("employees-list")
+        params = {"pagination": "cursor", "ordering": "first_name", "page_size": 2}
+        names = []
+        while url:
+            data = self.get(url, params).json()
+            names += [row["first_name"] for row in data["results"]]
+            url, params = data["next"], None
+        self.assertEqual(names, ["Adam", "Bob", "Carl", "Dana", "Eve"])
+
+    def test_nested_lists_use_model_serializers(self):
+        url = reverse("employees-list")
+        with patch.object(Employee, "from_db", wraps=Employee.from_db) as from_db:
+            response = self.get(url, {"expand": "dependents"})
+        self.assertEqual(response.status_code, 200)
+        from_db.assert_called()
+
+
+@override_settings(REQUEST_METRICS={"SAMPLE_RATE": 1.0})
+class RequestMetricsTests(CompanyTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = make_department()
+        make_employee(cls.department)
+
+    def setUp(self):
+        super().setUp()
+        metrics_registry.clear()
+        self.addCleanup(metrics_registry.clear)
+        self.client = APIClient()
+
+    def test_records_costs_per_route(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse("employees-list"))
+        route = "EmployeeViewSet.list"
+        self.assertEqual(metrics_registry.get_request_count(route), 1)
+        queries = metrics_registry.get_histogram("http_request_db_queries", route)
+        self.assertEqual(queries.sum, len(context.captured_queries))
+        for name in [
+            "http_request_duration_seconds",
+            "http_request_db_duration_seconds",
+            "http_request_serializer_duration_seconds",
+        ]:
+            histogram = metrics_registry.get_histogram(name, route)
+            self.assertEqual(histogram.count, 1)
+            self.assertGreater(histogram.sum, 0)
+
+    def test_unsampled_requests_are_only_counted(self):
+        with override_settings(REQUEST_METRICS={"SAMPLE_RATE": 0}):
+            client = APIClient()
+            client.get(reverse("departments-list"))
+        route = "DepartmentViewSet.list"
+        self.assertEqual(metrics_registry.get_request_count(route), 1)
+        self.assertIsNone(
+            metrics_registry.get_histogram("http_request_duration_seconds", route)
+        )
+
+    def test_prometheus_endpoint(self):
+        url = reverse("employees-detail", args=[0])
+        self.client.get(url)
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn(
+            'http_requests_total{route="EmployeeViewSet.retrieve",'
+            'method="GET",status="404"} 1',
+            body,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{route="EmployeeViewSet.retrieve",'
+            'method="GET",le="+Inf"} 1',
+            body,
+        )
+        self.assertIn("# TYPE company_response_cache_requests_total counter", body)
+        self.assertIn("http_request_metrics_sample_rate 1.0", body)
+
+    def test_metrics_endpoints_are_internal(self):
+        for name in ["metrics", "db-pool-metrics"]:
+            with self.subTest(name):
+                url = reverse(name)
+                self.assertEqual(self.client.get(url).status_code, 200)
+                response = self.client.get(url, REMOTE_ADDR="203.0.113.7")
+                self.assertEqual(response.status_code, 403)
+
+    def test_streamed_queries_are_recorded(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("employees-export"))
+            route = "EmployeeViewSet.export"
+            self.assertIsNone(
+                metrics_registry.get_histogram("http_request_db_queries", route)
+            )
+            b"".join(response.streaming_content)
+        queries = metrics_registry.get_histogram("http_request_db_queries", route)
+        self.assertEqual(queries.count, 1)
+        self.assertEqual(queries.sum, len(context.captured_queries))
+
+
+class SchemaTests(CompanyTestCase):
+    def setUp(self):
+        super().setUp()
+        schema_store.clear()
+        self.addCleanup(schema_store.clear)
+        self.client = APIClient()
+
+    def test_served_schema_matches_a_fresh_generation(self):
+        response = self.client.get(reverse("schema-swagger"), {"format": "openapi"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, generate_schema())
+        self.assertIn("/employees/", json.loads(response.content)["paths"])
+
+    def test_schema_is_generated_once(self):
+        url = reverse("schema-json", kwargs={"format": ".json"})
+        with patch("company.schema.generate_schema", wraps=generate_schema) as spy:
+            first = self.client.get(url)
+            second = self.client.get(url)
+        self.assertEqual(spy.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertIn("max-age=300", first["Cache-Control"])
+
+    def test_etag(self):
+        url = reverse("schema-json", kwargs={"format": ".yaml"})
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        for header in [etag[:-2], '"x"', "garbage", ""]:
+            with self.subTest(header):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, 200)
+
+    def test_schema_is_loaded_from_artifact(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(COMPANY_SCHEMA={"DIRECTORY": directory}):
+                call_command("generate_schema", stdout=StringIO())
+                with patch("company.schema.generate_schema") as generate:
+                    response = self.client.get(
+                        reverse("schema-json", kwargs={"format": ".json"})
+                    )
+        generate.assert_not_called()
+        self.assertEqual(response.content, generate_schema())
+
+    def test_stale_artifact_is_regenerated_and_fails_the_check(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(COMPANY_SCHEMA={"DIRECTORY": directory}):
+                call_command("generate_schema", stdout=StringIO())
+                call_command("generate_schema", "--check", stdout=StringIO())
+                path = artifact_path()
+                path.write_bytes(b"{}")
+                os.utime(path, (0, 0))
+                with self.assertRaises(CommandError):
+                    call_command("generate_schema", "--check", stdout=StringIO())
+                response = self.client.get(
+                    reverse("schema-json", kwargs={"format": ".json"})
+                )
+        self.assertEqual(response.content, generate_schema())
+
+    def test_request_bodies_are_documented(self):
+        schema = json.loads(generate_schema())
+        self.assertNotIn("host", schema)
+        parameters = schema["paths"]["/departments/"]["post"]["parameters"]
+        self.assertEqual(parameters[0]["schema"], {"$ref": "#/definitions/Department"})
+
+    def test_department_ids_are_not_part_of_the_schema(self):
+        make_department("Sales")
+        schema = json.loads(generate_schema())
+        parameters = schema["paths"]["/employees/"]["get"]["parameters"]
+        department = next(p for p in parameters if p["name"] == "department")
+        self.assertNotIn("enum", department.get("items", {}))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_connections_are_reused(self):
+        pool = ConnectionPool(max_size=2)
+        first, reused = pool.acquire(FakeConnection)
+        self.assertFalse(reused)
+        pool.release(first)
+        second, reused = pool.acquire(FakeConnection)
+        self.assertTrue(reused)
+        self.assertIs(second, first)
+        self.assertEqual(pool.stats()["created"], 1)
+        self.assertEqual(pool.stats()["in_use"], 1)
+
+    def test_pool_is_bounded(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.acquire(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["timeouts"]), (1, 1))
+
+    def test_waiting_for_a_release(self):
+        pool = ConnectionPool(max_size=1, timeout=5)
+        held, _ = pool.acquire(FakeConnection)
+        with ThreadPoolExecutor(1) as executor:
+            waiting = executor.submit(pool.acquire, FakeConnection)
+            time.sleep(0.05)
+            pool.release(held)
+            self.assertEqual(waiting.result(), (held, True))
+        stats = pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertGreater(stats["wait_seconds_max"], 0)
+
+    def test_unhealthy_and_discarded_connections_are_replaced(self):
+        pool = ConnectionPool(max_size=1, check=lambda connection: False)
+        first, _ = pool.acquire(FakeConnection)
+        pool.release(first)
+        second, reused = pool.acquire(FakeConnection)
+        self.assertFalse(reused)
+        self.assertTrue(first.closed)
+        pool.release(second, discard=True)
+        self.assertTrue(second.closed)
+        self.assertEqual(pool.stats()["size"], 0)
+        self.assertEqual(pool.stats()["discarded"], 2)
+
+    def test_pooled_database_wrapper(self):
+        wrapper_class = type(
+            "DatabaseWrapper",
+            (PooledDatabaseWrapperMixin, type(connections["default"])),
+            {},
+        )
+        settings_dict = {**connection.settings_dict, "POOL": {"MAX_SIZE": 1}}
+        if connection.vendor == "sqlite":
+            # A database file of its own, away from the test database's locks.
+            directory = tempfile.TemporaryDirectory()
+            self.addCleanup(directory.cleanup)
+            settings_dict["NAME"] = f"{directory.name}/pooled.sqlite3"
+        self.addCleanup(close_pools)
+        wrapper = wrapper_class(settings_dict, alias="pooled")
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        self.assertEqual(pool_stats()["pooled"]["idle"], 1)
+
+        other = wrapper_class(settings_dict, alias="pooled")
+        with other.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.assertIs(other.connection, raw)
+        self.assertEqual(pool_stats()["pooled"]["in_use"], 1)
+        other.close()
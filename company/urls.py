@@ -1,19 +1,9 @@
-from django.urls import path
-from rest_framework import permissions
+from django.conf import settings
+from django.urls import path, re_path
 from rest_framework_nested import routers
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
 from . import views
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Company Database API Documentation",
-        default_version="v1.1",
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from .async_views import async_read_patterns
+from .schema import schema_view
 
 # ----------------------------------------------------------------------------- #
 # Routers
@@ -21,6 +11,7 @@ schema_view = get_schema_view(
 router = routers.DefaultRouter()
 router.register("employees", views.EmployeeViewSet, basename="employees")
 router.register("departments", views.DepartmentViewSet, basename="departments")
+router.register("dependents", views.DependentBulkViewSet, basename="dependents")
 # ----------------------------------------------------------------------------- #
 # Nested_Routers
 # ----------------------------------------------------------------------------- #
@@ -29,19 +20,24 @@ employees_router.register(
     "dependents", views.DependentViewSet, basename="employee-dependents"
 )
 # ----------------------------------------------------------------------------- #
-urlpatterns = (
-    router.urls
-    + employees_router.urls
-    + [
-        path(
-            "swagger/",
-            schema_view.with_ui("swagger", cache_timeout=0),
-            name="schema-swagger",
-        ),
-        path(
-            "redoc/",
-            schema_view.with_ui("redoc", cache_timeout=0),
-            name="schema-redoc",
-        ),
-    ]
-)
+router_urls = router.urls + employees_router.urls
+if settings.COMPANY_ASYNC_READS:
+    router_urls = async_read_patterns(router_urls)
+
+urlpatterns = router_urls + [
+    re_path(
+        r"^swagger(?P<format>\.json|\.yaml)$",
+        schema_view.without_ui(cache_timeout=0),
+        name="schema-json",
+    ),
+    path(
+        "swagger/",
+        schema_view.with_ui("swagger", cache_timeout=0),
+        name="schema-swagger",
+    ),
+    path(
+        "redoc/",
+        schema_view.with_ui("redoc", cache_timeout=0),
+        name="schema-redoc",
+    ),
+]
@@ -0,0 +1,176 @@
+"""
+Read-only serialization straight from `values_list()` rows.
+
+`compile_serializer()` turns the fields of a serializer into a list of
+lookups and one converter per field, once per field selection. Rows then
+go from database tuples to dicts without model instances or per-row field
+binding, rendering what the serializer itself would.
+"""
+
+from types import SimpleNamespace
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.relations import RelatedField
+
+# `{(serializer class, fields, expansions): CompiledSerializer or None}`
+compiled = {}
+
+
+class NotCompilable(Exception):
+    pass
+
+
+def values_enabled():
+    return getattr(settings, "COMPANY_VALUES_READS", True)
+
+
+class CompiledSerializer:
+    def __init__(self, lookups, converters):
+        # The `values_list()` lookups each row must hold, in that order.
+        self.lookups = lookups
+        self.converters = converters
+
+    def to_representation(self, row):
+        return {name: convert(row) for name, convert in self.converters}
+
+
+def field_converter(field, index):
+    represent = field.to_representation
+
+    def convert(row):
+        value = row[index]
+        return None if value is None else represent(value)
+
+    return convert
+
+
+def method_converter(method, names, indexes):
+    def convert(row):
+        return method(SimpleNamespace(**{n: row[i] for n, i in zip(names, indexes)}))
+
+    return convert
+
+
+def nested_converter(nested, index):
+    def convert(row):
+        return None if row[index] is None else nested.to_representation(row)
+
+    return convert
+
+
+def compile_fields(serializer, lookups, prefix=""):
+    """
+    Return `[(name, convert(row))]` for the readable fields of `serializer`,
+    appending the lookups they read to `lookups`.
+
+    Fields that cannot be derived from their `source` read the lookups the
+    serializer lists for them in `values_lookups`: a method field is called
+    with an object carrying them as attributes, any other field is given
+    the value of its single lookup.
+    """
+
+    def index_of(lookup):
+        lookup = prefix + lookup
+        if lookup not in lookups:
+            lookups.append(lookup)
+        return lookups.index(lookup)
+
+    declared = getattr(serializer, "values_lookups", {})
+    converters = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        source = field.source.replace(".", "__")
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in declared:
+                raise NotCompilable(name)
+            names = declared[name]
+            method = getattr(serializer, field.method_name)
+            indexes = [index_of(lookup) for lookup in names]
+            converters.append((name, method_converter(method, names, indexes)))
+        elif isinstance(field, serializers.ListSerializer) or field.source == "*":
+            raise NotCompilable(name)
+        elif isinstance(field, serializers.BaseSerializer):
+            nested = CompiledSerializer(
+                lookups, compile_fields(field, lookups, f"{prefix}{source}__")
+            )
+            converters.append((name, nested_converter(nested, index_of(source))))
+        elif name in declared:
+            (lookup,) = declared[name]
+            converters.append((name, field_converter(field, index_of(lookup))))
+        elif isinstance(field, RelatedField):
+            raise NotCompilable(name)
+        else:
+            converters.append((name, field_converter(field, index_of(source))))
+    return converters
+
+
+def compile_serializer(serializer):
+    """
+    Return a `CompiledSerializer` rendering the fields of `serializer`, or
+    None when one of them needs model instances, such as a nested list.
+    """
+    lookups = []
+    try:
+        converters = compile_fields(serializer, lookups)
+    except NotCompilable:
+        return None
+    return CompiledSerializer(lookups, converters)
+
+
+class ValuesSerializer(serializers.BaseSerializer):
+    """Renders `values_list()` rows with a `CompiledSerializer`."""
+
+    def __init__(self, *args, compiled, **kwargs):
+        self.compiled = compiled
+        super().__init__(*args, **kwargs)
+
+    def to_representation(self, instance):
+        return self.compiled.to_representation(instance)
+
+
+class ValuesReadMixin:
+    """
+    Serves the JSON `list` and `retrieve` of a `SparseFieldsMixin` viewset
+    from `values_list()` rows when the serializer compiles, and from model
+    instances otherwise. `COMPANY_VALUES_READS=False` turns it off.
+
+    Rows are named tuples, so pagination cursors and `ConditionalGetMixin`
+    read them like instances.
+    """
+
+    def get_compiled_serializer(self):
+        if (
+            self.action not in self.sparse_actions
+            or not values_enabled()
+            or getattr(self.request, "accepted_renderer", None) is None
+            or self.request.accepted_renderer.format != "json"
+        ):
+            return None
+        fields, expand = self.get_sparse_params()
+        # Serializers render their fields in their own order.
+        key = (
+            self.get_serializer_class(),
+            fields if fields is None else frozenset(fields),
+            frozenset(expand),
+        )
+        if key not in compiled:
+            compiled[key] = compile_serializer(self.get_serializer())
+        return compiled[key]
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer = self.get_compiled_serializer()
+        if serializer is None:
+            return queryset
+        lookups = dict.fromkeys([*serializer.lookups, *self.get_read_columns()])
+        rows = queryset.values_list(*lookups, named=True)
+        # Counting the rows would keep the joins of the lookups.
+        rows.count = queryset.count
+        return rows
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = self.get_compiled_serializer() if args else None
+        if serializer is None:
+            return super().get_serializer(*args, **kwargs)
+        return ValuesSerializer(*args, compiled=serializer, **kwargs)
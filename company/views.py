@@ -1,13 +1,32 @@
-from django.db.models.aggregates import Count
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import _positive_int
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from rest_framework.filters import OrderingFilter
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from mysite.metrics.mixins import SerializerTimingMixin
+from .async_views import AsyncReadMixin
+from .bulk import (
+    DependentBulkRowSerializer,
+    DependentBulkWriter,
+    EmployeeBulkRowSerializer,
+    EmployeeBulkWriter,
+)
+from .cache import CachedResponseMixin
+from .conditional import ConditionalGetMixin
+from .export import EMPLOYEE_EXPORT_COLUMNS, RENDERERS, iter_keyset
 from .models import Employee, Dependent, Department
+from .parsers import FastJSONParser, NDJSONParser
+from .stats import StatsSerializer, department_stats, employee_stats, stats_data
 from .serializers import (
+    SimpleDepartmentSerializer,
+    SimpleEmployeeSerializer,
     EmployeeSerializer,
     EmployeeCreateUpdateSerializer,
     EmployeeRetrieveSerializer,
@@ -17,13 +36,132 @@ from .serializers import (
     DependentSerializer,
     DependentUpdateSerializer,
 )
-from .filters import EmployeeFilter, EmployeeSearchFilter
-from .pagination import EmployeePagination
+from .filters import EmployeeFilter, EmployeeSearchFilter, department_choices
+from .pagination import EmployeePagination, EmployeeKeysetPagination
+from .sparse import Reads, SparseFieldsMixin
+from .values import ValuesReadMixin
+
+bulk_description = (
+    "Accepts a JSON array or an NDJSON (application/x-ndjson) body. "
+    "Rows are validated together and written in chunks inside one transaction; "
+    "invalid rows are reported by index without aborting the batch unless "
+    "`atomic` is set."
+)
+sparse_parameters = [
+    openapi.Parameter(
+        name="fields",
+        in_=openapi.IN_QUERY,
+        description="Comma-separated fields to render; all by default.",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        name="expand",
+        in_=openapi.IN_QUERY,
+        description="Comma-separated related objects to embed.",
+        type=openapi.TYPE_STRING,
+    ),
+]
+count_parameter = openapi.Parameter(
+    name="count",
+    in_=openapi.IN_QUERY,
+    description=(
+        "`estimate` (default), `exact` or `false`. The `X-Count-Exact` "
+        "response header tells whether `count` is exact."
+    ),
+    type=openapi.TYPE_STRING,
+)
+dependents_bulk_description = (
+    "Accepts a JSON array or an NDJSON (application/x-ndjson) body. "
+    "The employees are loaded and locked once, rows are checked against "
+    "the relationship rules in order, so they count against each other, and "
+    "the valid ones are inserted together; invalid rows are reported by index "
+    "without aborting the batch unless `atomic` is set."
+)
+bulk_parameters = [
+    openapi.Parameter(
+        name="atomic",
+        in_=openapi.IN_QUERY,
+        description="Write nothing if any row is invalid.",
+        type=openapi.TYPE_BOOLEAN,
+    ),
+    openapi.Parameter(
+        name="chunk_size",
+        in_=openapi.IN_QUERY,
+        description="Number of rows written per statement (at most 5000).",
+        type=openapi.TYPE_INTEGER,
+    ),
+]
+
+
+class BulkWriteMixin:
+    bulk_chunk_size = 500
+    bulk_max_chunk_size = 5000
+
+    def get_bulk_options(self):
+        params = self.request.query_params
+        try:
+            chunk_size = _positive_int(
+                params["chunk_size"], strict=True, cutoff=self.bulk_max_chunk_size
+            )
+        except (KeyError, ValueError):
+            chunk_size = self.bulk_chunk_size
+        atomic = params.get("atomic", "").lower() in ("1", "true", "yes")
+        return {"chunk_size": chunk_size, "atomic": atomic}
+
+    def bulk_response(self, result, success):
+        if not result["errors"]:
+            return Response(result, status=success)
+        elif result["succeeded"]:
+            return Response(result, status=status.HTTP_207_MULTI_STATUS)
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
 
 
-class DepartmentViewSet(ModelViewSet):
+class DepartmentViewSet(
+    AsyncReadMixin,
+    ValuesReadMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    SerializerTimingMixin,
+    ModelViewSet,
+):
     http_method_names = ["get", "post", "put", "delete"]
     queryset = Department.objects.all()
+    # Listed departments embed their summary, which follows employees and
+    # dependents.
+    cache_dependencies = {
+        "list": [Department, Employee, Dependent],
+        "retrieve": [Department, Employee],
+        "stats": [Department, Employee],
+    }
+    field_reads = {
+        "name": Reads(["name"]),
+        "headcount": Reads(["summary__headcount"], ["summary"]),
+        "salary_sum": Reads(["summary__salary_sum"], ["summary"]),
+        "dependents_total": Reads(["summary__dependents_total"], ["summary"]),
+        "manager": Reads(
+            ["manager__first_name", "manager__last_name", "manager__email"],
+            ["manager"],
+        ),
+        "management_start_date": Reads(["management_start_date"]),
+    }
+    expansions = {
+        "manager": (
+            lambda: SimpleEmployeeSerializer(read_only=True),
+            Reads(
+                ["manager__first_name", "manager__last_name", "manager__email"],
+                ["manager"],
+                models=[Employee],
+            ),
+        ),
+    }
+    always_read = {"retrieve": ["updated_at"]}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.sparse_actions:
+            return self.select_fields(queryset)
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method == "PUT":
@@ -33,7 +171,22 @@ class DepartmentViewSet(ModelViewSet):
         else:
             return DepartmentSerializer
 
-    @swagger_auto_schema(operation_summary="Retrieve a list of departments.")
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        department_choices.invalidate()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        department_choices.invalidate()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        department_choices.invalidate()
+
+    @swagger_auto_schema(
+        operation_summary="Retrieve a list of departments.",
+        manual_parameters=sparse_parameters,
+    )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
@@ -43,6 +196,7 @@ class DepartmentViewSet(ModelViewSet):
 
     @swagger_auto_schema(
         operation_summary="Retrieve details of an existing department.",
+        manual_parameters=sparse_parameters,
         responses={200: DepartmentRetrieveSerializer, 404: "Not found."},
     )
     def retrieve(self, request, *args, **kwargs):
@@ -70,19 +224,99 @@ class DepartmentViewSet(ModelViewSet):
             )
         return super().destroy(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        operation_summary="Retrieve salary and gender statistics per department.",
+        responses={200: StatsSerializer},
+    )
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def stats(self, request, *args, **kwargs):
+        return self.cached_response(
+            request,
+            lambda: Response(stats_data(department_stats(self.get_queryset()))),
+        )
+
 
-class EmployeeViewSet(ModelViewSet):
+class EmployeeViewSet(
+    BulkWriteMixin,
+    AsyncReadMixin,
+    ValuesReadMixin,
+    SparseFieldsMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    SerializerTimingMixin,
+    ModelViewSet,
+):
     http_method_names = ["get", "post", "put", "delete"]
-    queryset = (
-        Employee.objects.select_related("department")
-        .annotate(dependents_count=Count("dependents"))
-        .all()
-    )
+    queryset = Employee.objects.all()
+    # Employee payloads embed the department name and the dependents count.
+    cache_dependencies = {
+        "list": [Employee, Department],
+        "retrieve": [Employee, Department, Dependent],
+        "stats": [Employee, Department],
+    }
     filter_backends = [DjangoFilterBackend, EmployeeSearchFilter, OrderingFilter]
     filterset_class = EmployeeFilter
+    # Validating department choices may load them from the database.
+    db_filter_params = ["department"]
     search_fields = ["first_name", "last_name"]
     pagination_class = EmployeePagination
+    # Filters cheap and common enough to reuse a cached estimate of the count.
+    estimate_count_params = ["gender", "department"]
     ordering_fields = ["first_name", "last_name"]
+    export_chunk_size = 2000
+    field_reads = {
+        "first_name": Reads(["first_name"]),
+        "last_name": Reads(["last_name"]),
+        "gender": Reads(["gender"]),
+        "birth_date": Reads(["birth_date"]),
+        "email": Reads(["email"]),
+        "salary": Reads(["salary"]),
+        "department": Reads(["department__name"], ["department"]),
+        "dependents_count": Reads(["dependents_count"]),
+    }
+    expansions = {
+        "department": (
+            lambda: SimpleDepartmentSerializer(read_only=True),
+            Reads(["department__name"], ["department"]),
+        ),
+        "dependents": (
+            lambda: DependentSerializer(many=True, read_only=True),
+            Reads(
+                prefetch_related=[
+                    Prefetch("dependents", queryset=Dependent.objects.order_by("pk"))
+                ],
+                models=[Dependent],
+            ),
+        ),
+    }
+    always_read = {"retrieve": ["updated_at"]}
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.pagination_class is None:
+                self._paginator = None
+            elif self.request.query_params.get("pagination") == "cursor":
+                # Keyset pages follow the ordering fields, which would drop
+                # the rank that search results are sorted by.
+                if self.request.query_params.get(EmployeeSearchFilter.search_param):
+                    raise ValidationError(
+                        {
+                            "pagination": [
+                                "Cursor pagination cannot be used with search."
+                            ]
+                        }
+                    )
+                self._paginator = EmployeeKeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.sparse_actions:
+            return self.select_fields(queryset)
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method in ["POST", "PUT"]:
@@ -92,7 +326,10 @@ class EmployeeViewSet(ModelViewSet):
         else:
             return EmployeeSerializer
 
-    @swagger_auto_schema(operation_summary="Retrieve a list of employees.")
+    @swagger_auto_schema(
+        operation_summary="Retrieve a list of employees.",
+        manual_parameters=[*sparse_parameters, count_parameter],
+    )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
@@ -102,6 +339,7 @@ class EmployeeViewSet(ModelViewSet):
 
     @swagger_auto_schema(
         operation_summary="Retrive details of an existing employee.",
+        manual_parameters=sparse_parameters,
         responses={200: EmployeeRetrieveSerializer, 404: "Not found."},
     )
     def retrieve(self, request, *args, **kwargs):
@@ -123,9 +361,117 @@ class EmployeeViewSet(ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        operation_summary="Export employees.",
+        operation_description=(
+            "Stream every employee matching the filters, search and ordering "
+            "as NDJSON or CSV without pagination."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                name="output",
+                in_=openapi.IN_QUERY,
+                description="Export format.",
+                type=openapi.TYPE_STRING,
+                enum=[*RENDERERS],
+                default="ndjson",
+            ),
+        ],
+        responses={200: "Streamed employees."},
+    )
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def export(self, request, *args, **kwargs):
+        output = request.query_params.get("output", "ndjson")
+        if output not in RENDERERS:
+            raise ValidationError(
+                {"output": [f"Choose one of: {', '.join(RENDERERS)}."]}
+            )
+        content_type, render = RENDERERS[output]
 
-class DependentViewSet(ModelViewSet):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = iter_keyset(
+            queryset, EMPLOYEE_EXPORT_COLUMNS.values(), self.export_chunk_size
+        )
+        response = StreamingHttpResponse(
+            render(rows, list(EMPLOYEE_EXPORT_COLUMNS)), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="employees.{output}"'
+        return response
+
+    @swagger_auto_schema(
+        operation_summary="Retrieve salary and gender statistics of employees.",
+        operation_description=(
+            "Aggregate the employees matching the filters and search per "
+            "department in a single grouped query."
+        ),
+        responses={200: StatsSerializer},
+    )
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def stats(self, request, *args, **kwargs):
+        return self.cached_response(
+            request,
+            lambda: Response(
+                stats_data(employee_stats(self.filter_queryset(self.get_queryset())))
+            ),
+        )
+
+    def get_bulk_writer(self):
+        return EmployeeBulkWriter(**self.get_bulk_options())
+
+    @swagger_auto_schema(
+        method="post",
+        operation_summary="Add many employees.",
+        operation_description=bulk_description,
+        request_body=EmployeeBulkRowSerializer(many=True),
+        manual_parameters=bulk_parameters,
+        responses={201: "Created.", 207: "Partially created.", 400: "Bad request."},
+    )
+    @swagger_auto_schema(
+        method="put",
+        operation_summary="Update many existing employees.",
+        operation_description=bulk_description,
+        request_body=EmployeeBulkRowSerializer(many=True),
+        manual_parameters=bulk_parameters,
+        responses={200: "Updated.", 207: "Partially updated.", 400: "Bad request."},
+    )
+    @swagger_auto_schema(
+        method="delete",
+        operation_summary="Delete many existing employees.",
+        operation_description=bulk_description,
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)
+        ),
+        manual_parameters=bulk_parameters,
+        responses={200: "Deleted.", 207: "Partially deleted.", 400: "Bad request."},
+    )
+    @action(
+        detail=False,
+        methods=["post", "put", "delete"],
+        parser_classes=[FastJSONParser, NDJSONParser],
+    )
+    def bulk(self, request, *args, **kwargs):
+        writer = self.get_bulk_writer()
+        if request.method == "POST":
+            result, success = writer.create(request.data), status.HTTP_201_CREATED
+        elif request.method == "PUT":
+            result, success = writer.update(request.data), status.HTTP_200_OK
+        else:
+            result, success = writer.delete(request.data), status.HTTP_200_OK
+        return self.bulk_response(result, success)
+
+
+class DependentViewSet(
+    BulkWriteMixin,
+    ConditionalGetMixin,
+    CachedResponseMixin,
+    SerializerTimingMixin,
+    ModelViewSet,
+):
     http_method_names = ["get", "post", "patch", "delete"]
+    cache_dependencies = {
+        "list": [Dependent],
+        "retrieve": [Dependent],
+    }
 
     def get_serializer_class(self):
         if self.request.method == "PATCH":
@@ -134,9 +480,11 @@ class DependentViewSet(ModelViewSet):
             return DependentSerializer
 
     def get_serializer_context(self):
-        return {"employee_id": self.kwargs["employee_pk"]}
+        return {"employee_id": self.kwargs.get("employee_pk")}
 
     def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Dependent.objects.none()
         return Dependent.objects.filter(employee_id=self.kwargs["employee_pk"])
 
     @swagger_auto_schema(
@@ -257,3 +605,53 @@ class DependentViewSet(ModelViewSet):
     )
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_summary="Add many dependents to an employee.",
+        operation_description=dependents_bulk_description,
+        request_body=DependentBulkRowSerializer(many=True),
+        manual_parameters=[
+            openapi.Parameter(
+                name="employee_pk",
+                in_=openapi.IN_PATH,
+                description="A unique integer value identifying the employee that a dependent associated with.",
+                required=True,
+                type=openapi.TYPE_INTEGER,
+            ),
+            *bulk_parameters,
+        ],
+        responses={
+            201: "Created.",
+            207: "Partially created.",
+            400: "Bad request.",
+            404: "Employee not found.",
+        },
+    )
+    @action(
+        detail=False, methods=["post"], parser_classes=[FastJSONParser, NDJSONParser]
+    )
+    def bulk(self, request, *args, **kwargs):
+        try:
+            employee_id = int(kwargs["employee_pk"])
+        except ValueError:
+            raise NotFound("Employee not found.")
+        writer = DependentBulkWriter(employee_id=employee_id, **self.get_bulk_options())
+        return self.bulk_response(writer.create(request.data), status.HTTP_201_CREATED)
+
+
+class DependentBulkViewSet(BulkWriteMixin, GenericViewSet):
+    """Dependents of many employees at once; each row names its employee."""
+
+    @swagger_auto_schema(
+        operation_summary="Add many dependents to many employees.",
+        operation_description=dependents_bulk_description,
+        request_body=DependentBulkRowSerializer(many=True),
+        manual_parameters=bulk_parameters,
+        responses={201: "Created.", 207: "Partially created.", 400: "Bad request."},
+    )
+    @action(
+        detail=False, methods=["post"], parser_classes=[FastJSONParser, NDJSONParser]
+    )
+    def bulk(self, request, *args, **kwargs):
+        writer = DependentBulkWriter(**self.get_bulk_options())
+        return self.bulk_response(writer.create(request.data), status.HTTP_201_CREATED)
@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+# Async requests do not stick to one thread, so connections kept per thread
+# would pile up. Close them after each request; set DB_POOL_SIZE to reuse
+# connections through the pool instead.
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+# Serve the company API reads without a thread hop per request.
+os.environ.setdefault('COMPANY_ASYNC_READS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,13 @@
+from django.db.backends.mysql import base
+from mysite.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """The MySQL backend with connections borrowed from a process-wide pool."""
+
+    def check_pooled_connection(self, connection):
+        try:
+            connection.ping()
+        except base.Database.Error:
+            return False
+        return True
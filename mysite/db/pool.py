@@ -0,0 +1,230 @@
+"""
+A bounded, thread-safe pool of DB-API connections shared by every thread of
+the process.
+
+Django opens one connection per thread. Under WSGI worker threads and under
+ASGI (where the ORM runs in `sync_to_async` threads) that means one
+connection per thread at best and one per request at worst. Backends built
+with `PooledDatabaseWrapperMixin` borrow a connection from the pool in
+`connect()` and hand it back in `close()` instead, so with `CONN_MAX_AGE = 0`
+each request holds a connection only while it runs and the total number of
+server connections never exceeds the pool size.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from django.db import OperationalError
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Hands out at most `max_size` connections, made by the `connect` callable
+    passed to `acquire`. Idle connections are reused most recently released
+    first; connections older than `recycle` seconds, or that fail `check`,
+    are closed instead of being reused.
+    """
+
+    def __init__(self, max_size=10, timeout=10.0, recycle=None, check=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.check = check
+        self.size = 0
+        self.in_use = 0
+        self.closed = False
+        self.counters = Counter()
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._idle = deque()
+        self._created_at = {}
+        self._available = threading.Condition()
+
+    def acquire(self, connect):
+        """Return `(connection, reused)`, waiting up to `timeout` for one."""
+        start = time.monotonic()
+        while True:
+            connection = self._checkout(start)
+            if connection is None:
+                return self._connect(connect), False
+            if self._expired(connection) or not self._healthy(connection):
+                self._discard(connection)
+                continue
+            self.counters["reused"] += 1
+            return connection, True
+
+    def release(self, connection, discard=False):
+        if discard or self.closed or self._expired(connection):
+            self._discard(connection)
+            return
+        with self._available:
+            self.in_use -= 1
+            self._idle.append(connection)
+            self._available.notify()
+
+    def close(self):
+        """Close the idle connections; in-use ones are closed on release."""
+        with self._available:
+            self.closed = True
+            idle, self._idle = list(self._idle), deque()
+            self.size -= len(idle)
+        for connection in idle:
+            self._created_at.pop(id(connection), None)
+            self._close(connection)
+
+    def stats(self):
+        with self._available:
+            return {
+                "max_size": self.max_size,
+                "size": self.size,
+                "in_use": self.in_use,
+                "idle": len(self._idle),
+                "created": self.counters["created"],
+                "reused": self.counters["reused"],
+                "discarded": self.counters["discarded"],
+                "waits": self.counters["waits"],
+                "timeouts": self.counters["timeouts"],
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_max": self.wait_seconds_max,
+            }
+
+    def _checkout(self, start):
+        """Reserve a slot and return an idle connection, or None to connect."""
+        with self._available:
+            waited = False
+            while not self._idle and self.size >= self.max_size:
+                remaining = start + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self.counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No database connection became available within "
+                        f"{self.timeout} seconds ({self.max_size} in use)."
+                    )
+                waited = True
+                self._available.wait(remaining)
+
+            if waited:
+                self.counters["waits"] += 1
+                elapsed = time.monotonic() - start
+                self.wait_seconds_total += elapsed
+                self.wait_seconds_max = max(self.wait_seconds_max, elapsed)
+            self.in_use += 1
+            if self._idle:
+                return self._idle.pop()
+            self.size += 1
+            return None
+
+    def _connect(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self._available:
+                self.size -= 1
+                self.in_use -= 1
+                self._available.notify()
+            raise
+        self._created_at[id(connection)] = time.monotonic()
+        self.counters["created"] += 1
+        return connection
+
+    def _expired(self, connection):
+        if self.recycle is None:
+            return False
+        created_at = self._created_at.get(id(connection), 0)
+        return time.monotonic() - created_at >= self.recycle
+
+    def _healthy(self, connection):
+        return self.check is None or self.check(connection)
+
+    def _discard(self, connection):
+        self._created_at.pop(id(connection), None)
+        self.counters["discarded"] += 1
+        with self._available:
+            self.size -= 1
+            self.in_use -= 1
+            self._available.notify()
+        self._close(connection)
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def get_pool(alias, settings_dict, check=None):
+    with pools_lock:
+        if alias not in pools:
+            options = settings_dict.get("POOL", {})
+            pools[alias] = ConnectionPool(
+                max_size=options.get("MAX_SIZE", 10),
+                timeout=options.get("TIMEOUT", 10.0),
+                recycle=options.get("RECYCLE"),
+                check=check if settings_dict["CONN_HEALTH_CHECKS"] else None,
+            )
+        return pools[alias]
+
+
+def close_pools():
+    with pools_lock:
+        for pool in pools.values():
+            pool.close()
+        pools.clear()
+
+
+def pool_stats():
+    with pools_lock:
+        return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Makes a backend's `DatabaseWrapper` borrow connections from the pool of
+    its alias, configured by the `POOL` entry of the database settings
+    (`MAX_SIZE`, `TIMEOUT` and `RECYCLE` in seconds).
+    """
+
+    def check_pooled_connection(self, connection):
+        try:
+            connection.cursor().execute("SELECT 1")
+        except Exception:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        # Keep hold of the pool so the connection goes back where it came
+        # from even if the pools are reset in between.
+        self.pool = get_pool(
+            self.alias, self.settings_dict, self.check_pooled_connection
+        )
+        connection, self.pool_reused = self.pool.acquire(
+            lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(
+                conn_params
+            )
+        )
+        return connection
+
+    def init_connection_state(self):
+        # Session state survives the round trip through the pool.
+        if not self.pool_reused:
+            super().init_connection_state()
+
+    def _close(self):
+        if self.connection is not None:
+            # A connection closed mid-transaction or after an error is not
+            # worth cleaning up for the next borrower.
+            self.pool.release(
+                self.connection,
+                discard=(
+                    self.in_atomic_block
+                    or self.errors_occurred
+                    or self.autocommit != self.settings_dict["AUTOCOMMIT"]
+                ),
+            )
@@ -0,0 +1,9 @@
+from django.http import JsonResponse
+from mysite.db.pool import pool_stats
+from mysite.metrics.views import internal
+
+
+@internal
+def pool_metrics(request):
+    """Connection pool usage of this process, per database alias."""
+    return JsonResponse(pool_stats())
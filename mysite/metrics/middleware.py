@@ -0,0 +1,189 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from .registry import get_config, registry
+
+current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """The SQL and serializer costs of one sampled request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def install_query_timing(connection, **kwargs):
+    """
+    Time the queries of `connection` for whichever request is being sampled.
+
+    Connections belong to a thread, and under ASGI the ORM runs in other
+    threads than the middleware, so every connection carries the wrapper and
+    finds the request through the `current` context variable instead.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def serializer_timing():
+    """
+    Count the time spent in the block as serializer time of the sampled
+    request, less the SQL it runs, such as a lazy queryset. Nested blocks
+    are not counted twice.
+    """
+    metrics = current.get()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    start, db_time = time.perf_counter(), metrics.db_time
+    try:
+        yield
+    finally:
+        metrics.serializing = False
+        elapsed = time.perf_counter() - start
+        metrics.serializer_time += elapsed - (metrics.db_time - db_time)
+
+
+def timed_stream(chunks, metrics, finished):
+    """
+    Yield `chunks` with their queries recorded against `metrics`, and call
+    `finished()` once the stream ends or is closed.
+    """
+    chunks = iter(chunks)
+    try:
+        while True:
+            # The stream is sent after the middleware returned, possibly from
+            # another thread or context, so the metrics are set per chunk.
+            token = current.set(metrics)
+            try:
+                chunk = next(chunks, None)
+            finally:
+                current.reset(token)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        finished()
+
+
+async def atimed_stream(chunks, metrics, finished):
+    """`timed_stream` for async streaming content."""
+    chunks = aiter(chunks)
+    try:
+        while True:
+            token = current.set(metrics)
+            try:
+                chunk = await anext(chunks, None)
+            finally:
+                current.reset(token)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        finished()
+
+
+def route_name(request):
+    """`ViewSet.action` for viewsets, the URL name or view path otherwise."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    actions = getattr(match.func, "actions", None)
+    if actions:
+        method = request.method.lower()
+        return f"{match.func.cls.__name__}.{actions.get(method, method)}"
+    return match.view_name or match._func_path
+
+
+class RequestMetricsMiddleware:
+    """
+    Counts every request and, for a `SAMPLE_RATE` share of them, records the
+    latency, SQL queries, SQL time and serializer time per route.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = get_config()["SAMPLE_RATE"]
+        connection_created.connect(install_query_timing)
+        for connection in connections.all(initialized_only=True):
+            install_query_timing(connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with self.recording() as metrics:
+            response = self.get_response(request)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with self.recording() as metrics:
+            response = await self.get_response(request)
+        return self.finish(request, response, metrics, start)
+
+    def finish(self, request, response, metrics, start):
+        route, method = route_name(request), request.method
+        registry.count_request(route, method, response.status_code)
+        if metrics is None:
+            return response
+        if not response.streaming:
+            self.record(route, method, metrics, time.perf_counter() - start)
+            return response
+
+        # Streamed responses, such as exports, query while they are sent.
+        def finished():
+            self.record(route, method, metrics, time.perf_counter() - start)
+
+        stream = atimed_stream if response.is_async else timed_stream
+        response.streaming_content = stream(
+            response.streaming_content, metrics, finished
+        )
+        return response
+
+    @contextmanager
+    def recording(self):
+        if random.random() >= self.sample_rate:
+            yield None
+            return
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            yield metrics
+        finally:
+            current.reset(token)
+
+    def record(self, route, method, metrics, duration):
+        for name, value in [
+            ("http_request_duration_seconds", duration),
+            ("http_request_db_queries", metrics.queries),
+            ("http_request_db_duration_seconds", metrics.db_time),
+            ("http_request_serializer_duration_seconds", metrics.serializer_time),
+        ]:
+            registry.observe(name, route, method, value)
@@ -0,0 +1,26 @@
+from rest_framework.response import Response
+from .middleware import serializer_timing
+
+
+class SerializerTimingMixin:
+    """
+    `list` and `retrieve` of DRF's model mixins, with the time spent turning
+    rows into response data recorded as the request's serializer time.
+    """
+
+    def serialize(self, serializer):
+        with serializer_timing():
+            return serializer.data
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(self.serialize(serializer))
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(self.serialize(serializer))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return Response(self.serialize(self.get_serializer(instance)))
@@ -0,0 +1,194 @@
+"""
+Process-local request metrics, rendered in the Prometheus text format.
+
+Each process keeps its own registry, so scrape every worker. Apps can add
+their own series with `registry.register_collector()`.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import Counter
+from django.conf import settings
+from mysite.db.pool import pool_stats
+
+DEFAULTS = {
+    # Share of requests whose queries and serializers are timed.
+    "SAMPLE_RATE": 1.0,
+    # Client addresses allowed to read the metrics endpoints.
+    "ALLOWED_IPS": ["127.0.0.1", "::1"],
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    "http_request_duration_seconds": (
+        "Latency of sampled requests.",
+        LATENCY_BUCKETS,
+    ),
+    "http_request_db_queries": (
+        "SQL queries run by sampled requests.",
+        QUERY_BUCKETS,
+    ),
+    "http_request_db_duration_seconds": (
+        "Time sampled requests spent in SQL.",
+        LATENCY_BUCKETS,
+    ),
+    "http_request_serializer_duration_seconds": (
+        "Time sampled requests spent serializing.",
+        LATENCY_BUCKETS,
+    ),
+}
+
+POOL_METRICS = {
+    "max_size": ("gauge", "Most connections the pool opens."),
+    "size": ("gauge", "Connections open."),
+    "in_use": ("gauge", "Connections lent out."),
+    "idle": ("gauge", "Connections waiting to be reused."),
+    "created": ("counter", "Connections opened."),
+    "reused": ("counter", "Connections reused."),
+    "discarded": ("counter", "Connections closed instead of reused."),
+    "waits": ("counter", "Requests for a connection that had to wait."),
+    "timeouts": ("counter", "Requests for a connection that timed out."),
+    "wait_seconds_total": ("counter", "Time spent waiting for a connection."),
+    "wait_seconds_max": ("gauge", "Longest wait for a connection."),
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "REQUEST_METRICS", {})}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            cumulative += count
+            yield f"{name}_bucket", {**labels, "le": str(bound)}, cumulative
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, self.count
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_sample(name, labels, value):
+    if labels:
+        pairs = ",".join(f'{key}="{escape(value)}"' for key, value in labels.items())
+        name = f"{name}{{{pairs}}}"
+    return f"{name} {value}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = Counter()
+        self._histograms = {}
+        self._collectors = []
+
+    def count_request(self, route, method, status):
+        with self._lock:
+            self._requests[route, method, status] += 1
+
+    def observe(self, name, route, method, value):
+        with self._lock:
+            key = (name, route, method)
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(HISTOGRAMS[name][1])
+            self._histograms[key].observe(value)
+
+    def register_collector(self, collect):
+        """
+        Add `collect()` to every rendering. It returns `(name, type, help,
+        samples)` tuples, with samples as `(name, labels, value)`.
+        """
+        if collect not in self._collectors:
+            self._collectors.append(collect)
+
+    def get_histogram(self, name, route, method="GET"):
+        return self._histograms.get((name, route, method))
+
+    def get_request_count(self, route, method="GET", status=200):
+        return self._requests[route, method, status]
+
+    def clear(self):
+        with self._lock:
+            self._requests.clear()
+            self._histograms.clear()
+
+    def collect(self):
+        with self._lock:
+            requests = sorted(self._requests.items())
+            histograms = [
+                (key[0], histogram.samples(key[0], {"route": key[1], "method": key[2]}))
+                for key, histogram in sorted(self._histograms.items())
+            ]
+            histograms = [(name, list(samples)) for name, samples in histograms]
+
+        yield (
+            "http_requests_total",
+            "counter",
+            "Requests served, sampled or not.",
+            [
+                (
+                    "http_requests_total",
+                    {"route": route, "method": method, "status": status},
+                    count,
+                )
+                for (route, method, status), count in requests
+            ],
+        )
+        for name, (description, _) in HISTOGRAMS.items():
+            yield name, "histogram", description, [
+                sample
+                for histogram_name, samples in histograms
+                if histogram_name == name
+                for sample in samples
+            ]
+        for collect in self._collectors:
+            yield from collect()
+
+    def render(self):
+        lines = []
+        for name, kind, description, samples in self.collect():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines += [format_sample(*sample) for sample in samples]
+        return "\n".join(lines) + "\n"
+
+
+def collect_settings():
+    name = "http_request_metrics_sample_rate"
+    yield (
+        name,
+        "gauge",
+        "Share of requests whose costs are recorded.",
+        [(name, {}, get_config()["SAMPLE_RATE"])],
+    )
+
+
+def collect_pools():
+    stats = pool_stats()
+    for key, (kind, description) in POOL_METRICS.items():
+        name = f"db_pool_{key}"
+        if kind == "counter" and not key.endswith("_total"):
+            name += "_total"
+        samples = [(name, {"alias": alias}, pool[key]) for alias, pool in stats.items()]
+        yield name, kind, description, samples
+
+
+registry = MetricsRegistry()
+registry.register_collector(collect_settings)
+registry.register_collector(collect_pools)
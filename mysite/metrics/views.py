@@ -0,0 +1,24 @@
+from functools import wraps
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from .registry import get_config, registry
+
+
+def internal(view):
+    """Serve `view` to the `ALLOWED_IPS` of `REQUEST_METRICS` only."""
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.META.get("REMOTE_ADDR") not in get_config()["ALLOWED_IPS"]:
+            raise PermissionDenied
+        return view(request, *args, **kwargs)
+
+    return wrapped
+
+
+@internal
+def prometheus_metrics(request):
+    """Request, pool and app metrics of this process for Prometheus to scrape."""
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
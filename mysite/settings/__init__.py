@@ -0,0 +1,20 @@
+"""
+Settings are layered: base.py holds what every environment shares, and the
+module named by the DJANGO_ENV environment variable ("dev" by default, or
+"prod") adjusts it.
+"""
+
+import os
+
+ENVIRONMENT = os.environ.get("DJANGO_ENV", "dev")
+
+if ENVIRONMENT == "prod":
+    from .prod import *  # noqa: F401,F403
+elif ENVIRONMENT == "dev":
+    from .dev import *  # noqa: F401,F403
+else:
+    from django.core.exceptions import ImproperlyConfigured
+
+    raise ImproperlyConfigured(
+        f"DJANGO_ENV must be 'dev' or 'prod', not {ENVIRONMENT!r}."
+    )
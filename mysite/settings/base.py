@@ -0,0 +1,247 @@
+"""
+Django settings for mysite project shared by every environment; dev.py and
+prod.py layer on top of it (see mysite/settings/__init__.py).
+
+Generated by 'django-admin startproject' using Django 5.0.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.0/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.0/ref/settings/
+"""
+
+import os
+from pathlib import Path
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    return default if value is None else value.lower() in ("1", "true", "yes")
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return default if value in (None, "") else int(value)
+
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    return default if value in (None, "") else float(value)
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = "django-insecure-a$v2(sa86nqw@t-o_#o@ym6i87&s%@+qu2k$1ghq5nphx1*9^a"
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = []
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "django_filters",
+    "rest_framework",
+    "drf_yasg",
+    "company",
+]
+
+MIDDLEWARE = [
+    "mysite.metrics.middleware.RequestMetricsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+ROOT_URLCONF = "mysite.urls"
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [],
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.debug",
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = "mysite.wsgi.application"
+
+
+# Database
+# https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+
+# Connections are persistent by default. Setting DB_POOL_SIZE switches to the
+# pooled backend in mysite/db, which shares at most that many connections
+# between all threads of the process; pooled connections go back to the pool
+# at the end of each request instead of staying with their thread.
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 0)
+
+DATABASES = {
+    "default": {
+        "ENGINE": "mysite.db.mysql" if DB_POOL_SIZE else "django.db.backends.mysql",
+        "NAME": os.environ.get("DB_NAME", "company_git"),
+        "USER": os.environ.get("DB_USER", ""),
+        "PASSWORD": os.environ.get("DB_PASSWORD", ""),
+        "HOST": os.environ.get("DB_HOST", "localhost"),
+        "PORT": os.environ.get("DB_PORT", "3306"),
+        "CONN_MAX_AGE": 0 if DB_POOL_SIZE else env_int("DB_CONN_MAX_AGE", 60),
+        "CONN_HEALTH_CHECKS": env_bool("DB_CONN_HEALTH_CHECKS", True),
+        "POOL": {
+            "MAX_SIZE": DB_POOL_SIZE,
+            "TIMEOUT": env_int("DB_POOL_TIMEOUT", 10),
+            "RECYCLE": env_int("DB_POOL_RECYCLE", 3600),
+        },
+    }
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.0/topics/i18n/
+
+LANGUAGE_CODE = "en-us"
+
+TIME_ZONE = "UTC"
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.0/howto/static-files/
+
+STATIC_URL = "static/"
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+REST_FRAMEWORK = {
+    "COERCE_DECIMAL_TO_STRING": False,
+    "DEFAULT_RENDERER_CLASSES": [
+        "company.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "company.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+# JSON is encoded and decoded by orjson when it is installed, with the same
+# output as DRF's own renderer; COMPANY_FAST_JSON=false turns it off.
+COMPANY_FAST_JSON = env_bool("COMPANY_FAST_JSON", True)
+
+SWAGGER_SETTINGS = {
+    "DEFAULT_AUTO_SCHEMA_CLASS": "mysite.swagger.CompoundTagsSchema",
+}
+
+# A cache shared by every process, such as redis://localhost:6379/0. The
+# generations behind cached responses and ETags (company/cache.py) and the
+# department choices version (company/filters.py) only reach other workers
+# through it; without one each process keeps its own, which is only safe
+# with a single process.
+CACHE_URL = os.environ.get("CACHE_URL", "")
+
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Cached GET responses of the company API, see company/cache.py. Off unless
+# the cache is shared, as other workers would not see the generation bumps.
+COMPANY_RESPONSE_CACHE = {
+    "ENABLED": env_bool("COMPANY_RESPONSE_CACHE", bool(CACHE_URL)),
+    "ALIAS": "default",
+    "TIMEOUT": 300,
+}
+
+# Per-route request metrics, served at /metrics/ (see mysite/metrics). Only
+# SAMPLE_RATE of the requests pay for timing their queries and serializers.
+# /metrics/ and /metrics/db-pool/ answer the ALLOWED_IPS only, as seen in
+# REMOTE_ADDR.
+REQUEST_METRICS = {
+    "SAMPLE_RATE": env_float("METRICS_SAMPLE_RATE", 0.1),
+    "ALLOWED_IPS": os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(","),
+}
+
+# Serve the list and retrieve GETs of the company API from async views, see
+# company/async_views.py. Only worth it under ASGI, where asgi.py turns it on.
+COMPANY_ASYNC_READS = env_bool("COMPANY_ASYNC_READS", False)
+
+# Render JSON list and retrieve responses of employees and departments from
+# values_list() rows instead of model instances, see company/values.py.
+COMPANY_VALUES_READS = env_bool("COMPANY_VALUES_READS", True)
+
+# Page sizes and row counts of paginated lists, see company/pagination.py.
+COMPANY_PAGINATION = {
+    "PAGE_SIZE": env_int("COMPANY_PAGE_SIZE", 10),
+    "MAX_PAGE_SIZE": env_int("COMPANY_MAX_PAGE_SIZE", 100),
+    "COUNT_TIMEOUT": 300,
+    "ESTIMATE_ABOVE": 10000,
+}
+
+# Precomputed OpenAPI schema, see company/schema.py. Write the artifact with
+# `manage.py generate_schema`; set REGENERATE to rebuild it on every request.
+COMPANY_SCHEMA = {
+    "DIRECTORY": BASE_DIR / "openapi",
+    # Absolute API URL to publish as the schema host; None leaves it out.
+    "URL": None,
+    "REGENERATE": False,
+    "MAX_AGE": 300,
+}
@@ -0,0 +1,60 @@
+import os
+from django.core.exceptions import ImproperlyConfigured
+from .base import *  # noqa: F401,F403
+from .base import (
+    CACHE_URL,
+    INSTALLED_APPS,
+    MIDDLEWARE,
+    REST_FRAMEWORK,
+    TEMPLATES,
+    env_bool,
+)
+
+DEBUG = False
+
+SECRET_KEY = os.environ["DJANGO_SECRET_KEY"]
+
+ALLOWED_HOSTS = [
+    host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",") if host
+]
+
+# ETags, cached responses and department choices are invalidated through the
+# cache, so every worker must share it.
+if not CACHE_URL:
+    raise ImproperlyConfigured("Set CACHE_URL to a cache shared by all workers.")
+
+# The API is stateless: the admin and the session and message machinery it
+# needs are only installed when DJANGO_ADMIN is set.
+ADMIN_ENABLED = env_bool("DJANGO_ADMIN", False)
+ADMIN_APPS = [
+    "django.contrib.admin",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+]
+ADMIN_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+]
+
+if not ADMIN_ENABLED:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_APPS]
+    MIDDLEWARE = [entry for entry in MIDDLEWARE if entry not in ADMIN_MIDDLEWARE]
+    TEMPLATES = [
+        {
+            **TEMPLATES[0],
+            "OPTIONS": {
+                "context_processors": [
+                    "django.template.context_processors.request",
+                    "django.contrib.auth.context_processors.auth",
+                ],
+            },
+        }
+    ]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    # JSON only: the browsable API renderer stays off the request path.
+    "DEFAULT_RENDERER_CLASSES": ["company.renderers.FastJSONRenderer"],
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+}
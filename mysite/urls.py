@@ -14,11 +14,22 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+
+from django.apps import apps
 from django.urls import path, include
+from mysite.db.views import pool_metrics
+from mysite.metrics.views import prometheus_metrics
 
 urlpatterns = [
-    path("__debug__/", include("debug_toolbar.urls")),
-    path("admin/", admin.site.urls),
     path("company/", include("company.urls")),
+    path("metrics/", prometheus_metrics, name="metrics"),
+    path("metrics/db-pool/", pool_metrics, name="db-pool-metrics"),
 ]
+
+# Both are left out of the production settings unless enabled there.
+if apps.is_installed("debug_toolbar"):
+    urlpatterns.append(path("__debug__/", include("debug_toolbar.urls")))
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns.append(path("admin/", admin.site.urls))